@@ -2,6 +2,11 @@ import uuid
 from django.db import models
 from lookups.models import Bank, AccountType
 from ynab.models import YNABAccount
+from decimal import Decimal
+
+def _milliunits_to_dollars(value):
+    """Convert a YNAB milliunit amount to dollars at the precision the account fields store"""
+    return (Decimal(value) / 1000).quantize(Decimal('0.01'))
 
 class Account(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -44,54 +49,103 @@ class Account(models.Model):
     def sync_from_ynab(self, ynab_account=None):
         """Sync data from the linked YNAB account"""
         from django.utils import timezone
-        from django.contrib.contenttypes.models import ContentType
-        from api.models import Link
+        from api.link_map import link_map
+        from api.links import link_targets
 
         # Get the YNAB account either from parameter or from Link model
         if ynab_account is None:
-            # Try to get YNAB account through Link model
-            content_type = ContentType.objects.get_for_model(self)
-            link = Link.objects.filter(
-                core_content_type=content_type,
-                core_object_id=self.pk
-            ).first()
-
-            if not link or not link.plugin_object:
-                return False
+            # Try to get YNAB account through the link map
+            link = link_map().for_core(self)
+            ynab_account = link_targets([link], 'plugin')[link.pk] if link else None
 
-            ynab_account = link.plugin_object
+            if not ynab_account:
+                return False
         else:
             # Use the provided YNAB account
             ynab_account = ynab_account
 
-        # Convert millicents to dollars (YNAB stores amounts in millicents)
-        self.balance = ynab_account.balance / 1000
-        self.cleared_balance = ynab_account.cleared_balance / 1000
-        self.uncleared_balance = ynab_account.uncleared_balance / 1000
+        self._apply_ynab_values(ynab_account)
 
-        # Copy boolean fields
-        self.on_budget = ynab_account.on_budget
-        self.closed = ynab_account.closed
+        # Update sync timestamp
+        self.last_ynab_sync = timezone.now()
 
-        # Copy datetime fields
-        self.last_reconciled_at = ynab_account.last_reconciled_at
+        self.save()
+        return True
 
-        # Copy debt information
+    def _apply_ynab_values(self, ynab_account):
+        """Copy the YNAB-owned fields onto this account; returns the names of fields that changed"""
+        # Convert millicents to dollars (YNAB stores amounts in millicents)
+        values = {
+            'balance': _milliunits_to_dollars(ynab_account.balance),
+            'cleared_balance': _milliunits_to_dollars(ynab_account.cleared_balance),
+            'uncleared_balance': _milliunits_to_dollars(ynab_account.uncleared_balance),
+            'on_budget': ynab_account.on_budget,
+            'closed': ynab_account.closed,
+            'last_reconciled_at': ynab_account.last_reconciled_at,
+            'debt_interest_rates': ynab_account.debt_interest_rates,
+            'debt_minimum_payments': ynab_account.debt_minimum_payments,
+            'debt_escrow_amounts': ynab_account.debt_escrow_amounts,
+        }
         if ynab_account.debt_original_balance is not None:
-            self.debt_original_balance = ynab_account.debt_original_balance / 1000
-        self.debt_interest_rates = ynab_account.debt_interest_rates
-        self.debt_minimum_payments = ynab_account.debt_minimum_payments
-        self.debt_escrow_amounts = ynab_account.debt_escrow_amounts
-
-        # Update sync timestamp
-        self.last_ynab_sync = timezone.now()
+            values['debt_original_balance'] = _milliunits_to_dollars(ynab_account.debt_original_balance)
 
         # Update notes if YNAB has a note and we don't have one
         if ynab_account.note and not self.notes:
-            self.notes = ynab_account.note
-
-        self.save()
-        return True
+            values['notes'] = ynab_account.note
+
+        changed = []
+        for field, value in values.items():
+            if getattr(self, field) != value:
+                setattr(self, field, value)
+                changed.append(field)
+        return changed
+
+    @classmethod
+    def bulk_sync_from_ynab(cls, ynab_account_ids=None, force=False):
+        """
+        Propagate linked YNAB account values to core accounts in bulk.
+
+        Links come from the link map, the linked YNAB accounts are loaded in
+        one query and the core accounts in another; only accounts whose values
+        changed (or every linked account with ``force``) are written, with a
+        single ``bulk_update``. Returns the number of accounts updated.
+        """
+        from django.utils import timezone
+        from django.contrib.contenttypes.models import ContentType
+        from api.link_map import link_map
+
+        # YNAB account id -> linked core account id
+        account_type = ContentType.objects.get_for_model(cls)
+        core_ids = {
+            link.plugin_object_id: link.core_object_id
+            for link in link_map().plugin_links(YNABAccount)
+            if link.core_content_type_id == account_type.pk
+        }
+        if ynab_account_ids is not None:
+            wanted = {str(pk) for pk in ynab_account_ids}
+            core_ids = {pk: core_id for pk, core_id in core_ids.items() if pk in wanted}
+        if not core_ids:
+            return 0
+
+        ynab_accounts = list(YNABAccount.objects.filter(pk__in=list(core_ids)))
+        accounts = cls.objects.in_bulk(list(core_ids.values()))
+        now = timezone.now()
+        to_update = []
+        update_fields = {'last_ynab_sync', 'updated_at'}
+        for ynab_account in ynab_accounts:
+            account = accounts.get(core_ids[ynab_account.pk])
+            if account is None:
+                continue
+            changed = account._apply_ynab_values(ynab_account)
+            if changed or force:
+                account.last_ynab_sync = now
+                account.updated_at = now
+                update_fields.update(changed)
+                to_update.append(account)
+
+        if to_update:
+            cls.objects.bulk_update(to_update, sorted(update_fields))
+        return len(to_update)
 
     class Meta:
         verbose_name = "Account"
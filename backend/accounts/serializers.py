@@ -1,8 +1,8 @@
 from rest_framework import serializers
-from django.contrib.contenttypes.models import ContentType
 from .models import Account
 from lookups.models import Bank, AccountType
 from api.models import Link
+from api.links import BatchedLinksMixin
 
 class LinkSerializer(serializers.ModelSerializer):
     plugin_record = serializers.SerializerMethodField()
@@ -16,7 +16,7 @@ class LinkSerializer(serializers.ModelSerializer):
         model = Link
         fields = ['id', 'plugin_record']
 
-class AccountSerializer(serializers.ModelSerializer):
+class AccountSerializer(BatchedLinksMixin, serializers.ModelSerializer):
     bank_name = serializers.CharField(source='bank.name', read_only=True)
     account_type_name = serializers.CharField(source='account_type.name', read_only=True)
     bank = serializers.PrimaryKeyRelatedField(queryset=Bank.objects.all(), required=False, allow_null=True)
@@ -24,10 +24,13 @@ class AccountSerializer(serializers.ModelSerializer):
     link_data = serializers.SerializerMethodField()
 
     def get_link_data(self, obj):
-        content_type = ContentType.objects.get_for_model(obj)
-        link = Link.objects.filter(core_content_type=content_type, core_object_id=obj.pk).first()
-        if link:
-            return LinkSerializer(link, context=self.context).data
+        resolved = self.resolved_link(obj)
+        if resolved:
+            link, plugin_object = resolved
+            return {
+                'id': str(link.id),
+                'plugin_record': {'id': str(plugin_object.id), 'name': plugin_object.name, 'model': plugin_object.__class__.__name__.lower()},
+            }
         return None
 
     class Meta:
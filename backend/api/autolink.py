@@ -0,0 +1,163 @@
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from .link_map import invalidate, link_key, link_map
+from .models import Link
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('payees', 'categories', 'accounts')
+
+# Candidates scored exactly per plugin record, after the shared-gram prefilter
+CANDIDATES = 5
+
+
+def _pairs():
+    """kind -> (plugin queryset, core model) of the records auto-linking pairs up"""
+    from accounts.models import Account
+    from fa_budget.models import BudgetCategory, BudgetPayee
+    from ynab.models import Category, Payee, YNABAccount
+    return {
+        'payees': (Payee.objects.filter(deleted=False), BudgetPayee),
+        'categories': (Category.objects.filter(deleted=False), BudgetCategory),
+        'accounts': (YNABAccount.objects.filter(deleted=False, closed=False), Account),
+    }
+
+
+def normalise(name):
+    """Lower-case a name and reduce punctuation and runs of spaces to one space"""
+    return ' '.join(re.sub(r'[^\w]+', ' ', (name or '').lower()).split())
+
+
+def trigrams(name):
+    """Character trigrams of a normalised name, padded so short names still have some"""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(a, b):
+    """Dice coefficient of two gram sets"""
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+class NameIndex:
+    """
+    Trigram index over record names. A lookup only touches the records that
+    share a gram with the query, and skips grams so common that they would
+    make it quadratic; the few records sharing the most grams are then
+    scored exactly with the Dice coefficient.
+    """
+
+    def __init__(self, records):
+        self.exact = defaultdict(list)
+        self.grams = {}
+        self.postings = defaultdict(list)
+        for record in records:
+            name = normalise(record.name)
+            if not name:
+                continue
+            self.exact[name].append(record)
+            self.grams[record.pk] = trigrams(name)
+            for gram in self.grams[record.pk]:
+                self.postings[gram].append(record)
+        # Grams carried by more records than this say little about identity
+        self.common = max(50, int(len(self.grams) ** 0.5))
+
+    def candidates(self, name):
+        """Up to ``CANDIDATES`` ``(record, score)`` pairs for the closest records, best first"""
+        name = normalise(name)
+        grams = trigrams(name)
+        exact = self.exact.get(name, [])
+        scored = [(record, 1.0) for record in exact[:CANDIDATES]]
+        if len(scored) == CANDIDATES:
+            return scored
+
+        shared = Counter()
+        records = {}
+        exact_pks = {record.pk for record in exact}
+        for gram in grams:
+            posting = self.postings.get(gram, ())
+            if len(posting) > self.common:
+                continue
+            for record in posting:
+                if record.pk not in exact_pks:
+                    shared[record.pk] += 1
+                    records[record.pk] = record
+
+        others = [(records[pk], dice(grams, self.grams[pk])) for pk, _ in shared.most_common(CANDIDATES)]
+        others.sort(key=lambda candidate: -candidate[1])
+        return (scored + others)[:CANDIDATES]
+
+
+def propose(kind, min_score=None, budget_id=None):
+    """
+    Pair unlinked plugin records of ``kind`` with unlinked core records by
+    name. Each record is used at most once; higher scores win. Returns a list
+    of ``(plugin_record, core_record, score)`` sorted by plugin name.
+    """
+    min_score = settings.AUTO_LINK_MIN_SCORE if min_score is None else min_score
+    plugin_records, core_model = _pairs()[kind]
+    links = link_map()
+
+    if budget_id:
+        plugin_records = plugin_records.filter(budget_id=budget_id)
+    plugin_records = plugin_records.exclude(pk__in=links.linked_plugin_pks(plugin_records.model))
+    core_records = core_model.objects.exclude(pk__in=links.linked_core_pks(core_model))
+
+    index = NameIndex(core_records)
+    matches = []
+    for plugin_record in plugin_records:
+        for core_record, score in index.candidates(plugin_record.name):
+            if score >= min_score:
+                matches.append((plugin_record, core_record, score))
+
+    # Greedy one-to-one assignment over every candidate pair, best scores
+    # first, so a record that loses its top candidate can take its next one
+    accepted = []
+    taken_plugins, taken_cores = set(), set()
+    for plugin_record, core_record, score in sorted(matches, key=lambda match: -match[2]):
+        if plugin_record.pk in taken_plugins or core_record.pk in taken_cores:
+            continue
+        taken_plugins.add(plugin_record.pk)
+        taken_cores.add(core_record.pk)
+        accepted.append((plugin_record, core_record, score))
+    accepted.sort(key=lambda match: match[0].name.lower())
+    return accepted
+
+
+def create_links(matches):
+    """
+    Create the links for ``propose`` results in one transaction. Records
+    linked since the proposal was made are skipped. Returns the new links.
+    """
+    from ynab.upsert import write_transaction
+
+    if not matches:
+        return []
+    with write_transaction():
+        # Read the table, not the link map: another worker may have just linked them
+        taken_plugins = set(Link.objects.values_list('plugin_content_type_id', 'plugin_object_id'))
+        taken_cores = set(Link.objects.values_list('core_content_type_id', 'core_object_id'))
+        new_links = []
+        for plugin_record, core_record, _ in matches:
+            plugin_type = ContentType.objects.get_for_model(plugin_record)
+            core_type = ContentType.objects.get_for_model(core_record)
+            plugin_key = (plugin_type.pk, str(plugin_record.pk))
+            core_key = (core_type.pk, link_key(core_record.pk))
+            if plugin_key in taken_plugins or core_key in taken_cores:
+                continue
+            taken_plugins.add(plugin_key)
+            taken_cores.add(core_key)
+            new_links.append(Link(
+                core_content_type=core_type,
+                core_object_id=core_key[1],
+                plugin_content_type=plugin_type,
+                plugin_object_id=plugin_key[1],
+            ))
+        Link.objects.bulk_create(new_links)
+        # bulk_create sends no post_save, so bump the link map here
+        invalidate()
+    logger.info(f"Auto-linked {len(new_links)} records")
+    return new_links
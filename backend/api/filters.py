@@ -1,7 +1,6 @@
 from django_filters import rest_framework as filters
-from .models import Link
+from .links import filter_core_linked
 from ynab.models import YNABAccount, Category as YNABCategory, Payee as YNABPayee
-from django.contrib.contenttypes.models import ContentType
 from accounts.models import Account
 from .models import CreditCard, Asset, Liability
 
@@ -11,17 +10,7 @@ class LinkedFilter(filters.FilterSet):
     bank_name = filters.CharFilter(method='filter_bank_name')
 
     def filter_linked(self, queryset, name, value):
-        model = queryset.model
-        content_type = ContentType.objects.get_for_model(model)
-
-        linked_ids = Link.objects.filter(
-            core_content_type=content_type
-        ).values_list('core_object_id', flat=True)
-
-        if value:
-            return queryset.filter(pk__in=linked_ids)
-        else:
-            return queryset.exclude(pk__in=linked_ids)
+        return filter_core_linked(queryset, value)
 
     def filter_bank_name(self, queryset, name, value):
         """Filter by bank name instead of bank ID"""
@@ -0,0 +1,94 @@
+from collections import defaultdict
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from ynab.config_cache import ConfigCache
+from .models import Link
+import logging
+
+logger = logging.getLogger(__name__)
+
+_core_object_id = Link._meta.get_field('core_object_id')
+
+
+def link_key(pk):
+    """Normalise a core primary key the way Link.core_object_id stores it"""
+    return _core_object_id.to_python(pk)
+
+
+def core_pk(model_class, key):
+    """Turn a Link.core_object_id back into ``model_class``'s primary key"""
+    if model_class._meta.pk.get_internal_type() == 'UUIDField':
+        return key
+    # Integer keys are stored as UUID(int=pk)
+    return key.int
+
+
+class LinkMap:
+    """
+    Every Link row, indexed both ways by ``(content type id, object id)``.
+    Core ids are UUIDs (see ``link_key``), plugin ids are strings. The Link
+    instances are shared between requests; callers must not modify them.
+    """
+
+    def __init__(self, links):
+        self.by_core = {}
+        self.by_plugin = {}
+        self.core_ids = defaultdict(set)
+        self.plugin_ids = defaultdict(set)
+        for link in links:
+            self.by_core[(link.core_content_type_id, link.core_object_id)] = link
+            self.by_plugin[(link.plugin_content_type_id, link.plugin_object_id)] = link
+            self.core_ids[link.core_content_type_id].add(link.core_object_id)
+            self.plugin_ids[link.plugin_content_type_id].add(link.plugin_object_id)
+
+    def __len__(self):
+        return len(self.by_core)
+
+    def for_core(self, obj):
+        """The link of a core record, or None"""
+        content_type = ContentType.objects.get_for_model(obj)
+        return self.by_core.get((content_type.pk, link_key(obj.pk)))
+
+    def for_plugin(self, obj):
+        """The link of a plugin record, or None"""
+        content_type = ContentType.objects.get_for_model(obj)
+        return self.by_plugin.get((content_type.pk, str(obj.pk)))
+
+    def core_links(self, model_class):
+        """Every link whose core record is a ``model_class`` row"""
+        content_type = ContentType.objects.get_for_model(model_class)
+        return [self.by_core[(content_type.pk, key)] for key in self.core_ids.get(content_type.pk, ())]
+
+    def plugin_links(self, model_class):
+        """Every link whose plugin record is a ``model_class`` row"""
+        content_type = ContentType.objects.get_for_model(model_class)
+        return [self.by_plugin[(content_type.pk, pk)] for pk in self.plugin_ids.get(content_type.pk, ())]
+
+    def linked_core_pks(self, model_class):
+        """Primary keys of the ``model_class`` rows that have a link"""
+        content_type = ContentType.objects.get_for_model(model_class)
+        return [core_pk(model_class, key) for key in self.core_ids.get(content_type.pk, ())]
+
+    def linked_plugin_pks(self, model_class):
+        """Primary keys of the ``model_class`` plugin rows that have a link"""
+        content_type = ContentType.objects.get_for_model(model_class)
+        return list(self.plugin_ids.get(content_type.pk, ()))
+
+
+link_cache = ConfigCache(settings.LINK_VERSION_PATH)
+
+
+def link_map():
+    """The process-wide LinkMap, reloaded after any worker changes a Link"""
+    return link_cache.get('links', lambda: LinkMap(Link.objects.all()))
+
+
+def invalidate(**kwargs):
+    """Signal receiver: bump the version stamp once the change is committed"""
+    transaction.on_commit(link_cache.bump)
+
+
+post_save.connect(invalidate, sender=Link, dispatch_uid='link-map-save')
+post_delete.connect(invalidate, sender=Link, dispatch_uid='link-map-delete')
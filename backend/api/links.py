@@ -0,0 +1,175 @@
+from collections import defaultdict
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db.models import Exists, OuterRef
+from rest_framework import serializers
+from .link_map import core_pk, link_key, link_map
+from .models import Link
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Map model names to frontend paths
+MODEL_TO_PATH = {
+    'account': 'accounts',
+    'creditcard': 'credit-cards',
+    'asset': 'assets',
+    'liability': 'liabilities',
+    'category': 'categories',
+    'payee': 'payees',
+    'bank': 'banks',
+}
+
+
+def link_targets(links, side):
+    """
+    The record on ``side`` ('core' or 'plugin') of each link, keyed by link
+    pk, with one query per content type. Links to deleted records map to
+    None; sweep_orphaned_links removes them.
+    """
+    wanted = defaultdict(set)
+    for link in links:
+        wanted[getattr(link, f"{side}_content_type_id")].add(getattr(link, f"{side}_object_id"))
+
+    records = {}
+    for content_type_id, object_ids in wanted.items():
+        model_class = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model_class is None:
+            continue
+        if side == 'core':
+            pks, normalise = [core_pk(model_class, key) for key in object_ids], link_key
+        else:
+            pks, normalise = list(object_ids), str
+        for pk, record in model_class._default_manager.in_bulk(pks).items():
+            records[(content_type_id, normalise(pk))] = record
+
+    return {
+        link.pk: records.get((getattr(link, f"{side}_content_type_id"), getattr(link, f"{side}_object_id")))
+        for link in links
+    }
+
+
+def _resolve(objects, find, side):
+    links = {}
+    for obj in objects:
+        link = find(obj)
+        if link is not None:
+            links[obj.pk] = link
+    targets = link_targets(links.values(), side)
+    return {
+        pk: (link, targets[link.pk])
+        for pk, link in links.items()
+        if targets[link.pk] is not None
+    }
+
+
+def resolve_links(objects):
+    """
+    ``{pk: (link, plugin_object)}`` for the linked ones among a batch of core
+    objects. Links come from the link map; the plugin records cost one query
+    per plugin content type, however many objects are passed.
+    """
+    return _resolve(objects, link_map().for_core, 'plugin')
+
+
+def resolve_plugin_links(objects):
+    """``{pk: (link, core_object)}`` for the linked ones among a batch of plugin objects"""
+    return _resolve(objects, link_map().for_plugin, 'core')
+
+
+def _live(links, side):
+    """The links whose record on ``side`` still exists; orphans count as unlinked"""
+    targets = link_targets(links, side)
+    return [link for link in links if targets[link.pk] is not None]
+
+
+def filter_core_linked(queryset, linked):
+    """Keep only the core rows that are (or are not) linked to a plugin record"""
+    model_class = queryset.model
+    pks = [core_pk(model_class, link.core_object_id) for link in _live(link_map().core_links(model_class), 'plugin')]
+    return queryset.filter(pk__in=pks) if linked else queryset.exclude(pk__in=pks)
+
+
+def filter_plugin_linked(queryset, linked):
+    """Keep only the plugin rows that are (or are not) linked to a core record"""
+    pks = [link.plugin_object_id for link in _live(link_map().plugin_links(queryset.model), 'core')]
+    return queryset.filter(pk__in=pks) if linked else queryset.exclude(pk__in=pks)
+
+
+class BatchedLinksMixin:
+    """
+    For serializers with per-row link data. When the serializer is the child
+    of a list, the links for the whole list are resolved on the first row, so
+    a page costs a fixed number of queries instead of several per row.
+    ``link_resolver`` is ``resolve_links`` or ``resolve_plugin_links``.
+    """
+    link_resolver = staticmethod(resolve_links)
+
+    def resolved_link(self, obj):
+        """``(link, linked record)`` for ``obj``, or None"""
+        if not isinstance(self.parent, serializers.ListSerializer):
+            return self.link_resolver([obj]).get(obj.pk)
+        if obj.pk not in getattr(self, '_link_map_keys', ()):
+            instances = self.parent.instance
+            if isinstance(instances, models.Manager):
+                instances = instances.all()
+            instances = list(instances) if instances is not None else [obj]
+            self._link_map = self.link_resolver(instances)
+            self._link_map_keys = {instance.pk for instance in instances} | {obj.pk}
+        return self._link_map.get(obj.pk)
+
+
+def _orphans(side, content_type):
+    """
+    Links on one side of ``content_type`` whose target row is gone. An SQL
+    anti-join when the link column stores the target key as is, otherwise
+    a set difference against the target's primary keys (integer keys are
+    stored as UUIDs in Link.core_object_id).
+    """
+    links = Link.objects.filter(**{f"{side}_content_type": content_type})
+    model_class = content_type.model_class()
+    object_id = f"{side}_object_id"
+    column = Link._meta.get_field(object_id)
+    pk_field = model_class._meta.pk
+    if pk_field.get_internal_type() == column.get_internal_type():
+        return links.filter(~Exists(model_class._default_manager.filter(pk=OuterRef(object_id))))
+
+    existing = {column.to_python(pk) for pk in model_class._default_manager.values_list('pk', flat=True)}
+    orphaned = [
+        link_id for link_id, target in links.values_list('id', object_id)
+        if column.to_python(target) not in existing
+    ]
+    return Link.objects.filter(pk__in=orphaned)
+
+
+def sweep_orphaned_links(dry_run=False):
+    """
+    Delete links whose core or plugin record no longer exists, one bulk
+    delete per content type. Content types whose model is not installed are
+    skipped. Returns ``{'<side>:<app_label>.<model>': count}`` for the
+    content types that had orphans.
+    """
+    swept = {}
+    counted = set()
+    for side in ('core', 'plugin'):
+        content_type_ids = Link.objects.values_list(f"{side}_content_type", flat=True).distinct()
+        for content_type_id in list(content_type_ids):
+            content_type = ContentType.objects.get_for_id(content_type_id)
+            if content_type.model_class() is None:
+                # The app may only be disabled; its rows cannot be checked, so
+                # its links are left alone
+                logger.info(f"Skipping links to {content_type.app_label}.{content_type.model}: model not installed")
+                continue
+            orphans = _orphans(side, content_type)
+            if dry_run:
+                # A link dangling on both sides is only counted once
+                ids = set(orphans.values_list('pk', flat=True)) - counted
+                counted |= ids
+                count = len(ids)
+            else:
+                count = orphans.delete()[0]
+            if count:
+                swept[f"{side}:{content_type.app_label}.{content_type.model}"] = count
+    if swept and not dry_run:
+        logger.info(f"Removed orphaned links: {swept}")
+    return swept
@@ -0,0 +1 @@
+# Management package for API app
\ No newline at end of file
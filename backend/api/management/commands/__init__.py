@@ -0,0 +1 @@
+# Commands package for API app
\ No newline at end of file
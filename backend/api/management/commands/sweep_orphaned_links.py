@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from api.links import sweep_orphaned_links
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Delete links whose core or plugin record no longer exists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the orphaned links without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        swept = sweep_orphaned_links(dry_run=options['dry_run'])
+        if not swept:
+            self.stdout.write("No orphaned links found.")
+            return
+
+        for content_type, count in swept.items():
+            self.stdout.write(f"  {content_type}: {count}")
+        verb = 'Found' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {sum(swept.values())} orphaned links"))
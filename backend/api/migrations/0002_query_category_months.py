@@ -0,0 +1,33 @@
+# Generated manually for Finance Assistant
+
+from django.db import migrations, models
+
+
+QUERY_TYPES = [
+    ('TRANSACTIONS', 'Transactions'),
+    ('ACCOUNTS', 'Accounts'),
+    ('CATEGORIES', 'Categories'),
+    ('PAYEES', 'Payees'),
+    ('CATEGORY_MONTHS', 'Category Months'),
+    ('CUSTOM', 'Custom SQL'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='query',
+            name='query_type',
+            field=models.CharField(choices=QUERY_TYPES, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='querytemplate',
+            name='query_type',
+            field=models.CharField(choices=QUERY_TYPES, max_length=50),
+        ),
+    ]
@@ -230,6 +230,7 @@ class Query(models.Model):
         ('ACCOUNTS', 'Accounts'),
         ('CATEGORIES', 'Categories'),
         ('PAYEES', 'Payees'),
+        ('CATEGORY_MONTHS', 'Category Months'),
         ('CUSTOM', 'Custom SQL'),
     ])
 
@@ -327,6 +328,7 @@ class QueryTemplate(models.Model):
         ('ACCOUNTS', 'Accounts'),
         ('CATEGORIES', 'Categories'),
         ('PAYEES', 'Payees'),
+        ('CATEGORY_MONTHS', 'Category Months'),
         ('CUSTOM', 'Custom SQL'),
     ])
 
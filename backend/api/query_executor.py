@@ -1,6 +1,6 @@
 import time
 from django.db import connection
-from django.db.models import Q, Sum, Count, Avg, Min, Max
+from django.db.models import Q, Sum, Count, Avg, Min, Max, OuterRef, Subquery
 from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -77,6 +77,8 @@ class QueryExecutor:
             return self._query_categories(parameters)
         elif query_type == 'PAYEES':
             return self._query_payees(parameters)
+        elif query_type == 'CATEGORY_MONTHS':
+            return self._query_category_months(parameters)
         else:
             raise ValueError(f"Unknown query type: {query_type}")
 
@@ -314,6 +316,52 @@ class QueryExecutor:
 
         return results
 
+    def _query_category_months(self, parameters):
+        """Query per-category month figures from the synced YNAB budget history"""
+        from ynab.models import Category as YNABCategory, CategoryMonth
+
+        # The category foreign key has no constraint and month rows can name a
+        # category that is not synced, so read its name with a subquery rather
+        # than a join that would drop those rows
+        category_name = YNABCategory.objects.filter(pk=OuterRef('category_id')).values('name')[:1]
+        queryset = CategoryMonth.objects.filter(deleted=False).annotate(
+            category_name=Subquery(category_name),
+        ).values('month', 'category_id', 'category_name', 'budgeted', 'activity', 'balance')
+
+        # Apply filters
+        if 'budget_id' in parameters:
+            queryset = queryset.filter(budget_id=parameters['budget_id'])
+        if 'month_from' in parameters:
+            queryset = queryset.filter(month__gte=parameters['month_from'])
+        if 'month_to' in parameters:
+            queryset = queryset.filter(month__lte=parameters['month_to'])
+        if 'category_id' in parameters:
+            queryset = queryset.filter(category_id=parameters['category_id'])
+
+        # Apply ordering
+        if 'order_by' in parameters:
+            queryset = queryset.order_by(parameters['order_by'])
+        else:
+            queryset = queryset.order_by('-month', 'category_id')
+
+        # Apply limit
+        if 'limit' in parameters:
+            queryset = queryset[:parameters['limit']]
+
+        # Serialize results; amounts are YNAB milliunits
+        results = []
+        for row in queryset:
+            results.append({
+                'month': row['month'].isoformat(),
+                'category_id': row['category_id'],
+                'category': row['category_name'],
+                'budgeted': row['budgeted'] / 1000,
+                'activity': row['activity'] / 1000,
+                'balance': row['balance'] / 1000,
+            })
+
+        return results
+
 class QueryTemplateManager:
     """Manages predefined query templates"""
 
@@ -1,6 +1,7 @@
 import uuid
 from rest_framework import serializers
 from django.contrib.contenttypes.models import ContentType
+from .links import MODEL_TO_PATH, BatchedLinksMixin
 from .models import (
     CreditCard, Asset, Liability, Transaction,
     Link, QueryResult, QueryTemplate, Query
@@ -116,62 +117,33 @@ class LinkSerializer(serializers.ModelSerializer):
         return link
 
 # Base serializer for core models to include link information
-class LinkedCoreModelSerializer(serializers.ModelSerializer):
+class LinkedCoreModelSerializer(BatchedLinksMixin, serializers.ModelSerializer):
     link_data = serializers.SerializerMethodField()
 
     def get_link_data(self, obj):
         """Get detailed link information including plugin record data"""
-        from django.contrib.contenttypes.models import ContentType
-        from .models import Link
-
-        content_type = ContentType.objects.get_for_model(obj)
-        link = Link.objects.filter(
-            core_content_type=content_type,
-            core_object_id=obj.pk
-        ).first()
-
-        if link:
-            # Check if plugin object still exists
-            try:
-                plugin_object = link.plugin_object
-                if plugin_object is None:
-                    # Plugin object was deleted but link wasn't cleaned up
-                    link.delete()
-                    return None
-            except Exception as e:
-                # Plugin object doesn't exist, clean up orphaned link
-                link.delete()
-                return None
-
-            # Map model names to frontend paths
-            model_to_path = {
-                'account': 'accounts',
-                'creditcard': 'credit-cards',
-                'asset': 'assets',
-                'liability': 'liabilities',
-                'category': 'categories',
-                'payee': 'payees',
-                'bank': 'banks',
+        resolved = self.resolved_link(obj)
+        if resolved is None:
+            return None
+
+        link, plugin_object = resolved
+        plugin_model_name = plugin_object.__class__.__name__.lower()
+        core_model_name = obj.__class__.__name__.lower()
+
+        return {
+            'id': str(link.id),
+            'core_record': {
+                'id': str(obj.pk),
+                'name': obj.name,
+                'model': core_model_name,
+                'path': MODEL_TO_PATH.get(core_model_name, core_model_name)
+            },
+            'plugin_record': {
+                'id': str(plugin_object.id),
+                'name': plugin_object.name,
+                'model': plugin_model_name
             }
-
-            plugin_model_name = plugin_object.__class__.__name__.lower()
-            core_model_name = obj.__class__.__name__.lower()
-
-            return {
-                'id': str(link.id),
-                'core_record': {
-                    'id': str(obj.pk),
-                    'name': obj.name,
-                    'model': core_model_name,
-                    'path': model_to_path.get(core_model_name, core_model_name)
-                },
-                'plugin_record': {
-                    'id': str(plugin_object.id),
-                    'name': plugin_object.name,
-                    'model': plugin_model_name
-                }
-            }
-        return None
+        }
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -10,6 +10,7 @@ from fa_budget.models import BudgetCategory as Category, BudgetPayee as Payee
 from lookups.models import AssetType, LiabilityType, CreditCardType
 from .serializers import BankSerializer, AccountSerializer, CreditCardSerializer, AssetSerializer, LiabilitySerializer, CategorySerializer, PayeeSerializer, LinkSerializer, AccountTypeSerializer, AssetTypeSerializer, LiabilityTypeSerializer, CreditCardTypeSerializer
 from .filters import LinkedFilter
+from .autolink import KINDS, create_links, propose
 from accounts.models import Account
 import logging
 logger = logging.getLogger(__name__)
@@ -67,6 +68,54 @@ class LinkViewSet(viewsets.ModelViewSet):
     serializer_class = LinkSerializer
     pagination_class = None
 
+    @action(detail=False, methods=['post'], url_path='auto-link')
+    def auto_link(self, request):
+        """
+        Link unlinked YNAB payees, categories and accounts to the core records
+        with the most similar names. ``dry_run`` only returns the proposals.
+        """
+        kinds = request.data.get('kinds') or list(KINDS)
+        if not isinstance(kinds, list) or not all(isinstance(kind, str) for kind in kinds):
+            return Response(
+                {'error': f"kinds must be a list containing some of {list(KINDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        unknown = [kind for kind in kinds if kind not in KINDS]
+        if unknown:
+            return Response(
+                {'error': f"Unknown kinds {unknown}; expected some of {list(KINDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        min_score = request.data.get('min_score')
+        if min_score is not None:
+            try:
+                min_score = float(min_score)
+            except (TypeError, ValueError):
+                min_score = None
+            # The comparison is False for NaN as well
+            if min_score is None or not 0 <= min_score <= 1:
+                return Response({'error': 'min_score must be a number between 0 and 1'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', False)).lower() == 'true'
+
+        proposals = {kind: propose(kind, min_score=min_score, budget_id=request.data.get('budget_id')) for kind in kinds}
+        created = [] if dry_run else create_links([match for matches in proposals.values() for match in matches])
+
+        return Response({
+            'dry_run': dry_run,
+            'created': len(created),
+            'matches': {
+                kind: [
+                    {
+                        'plugin_record': {'id': str(plugin_record.pk), 'name': plugin_record.name, 'model': plugin_record.__class__.__name__.lower()},
+                        'core_record': {'id': str(core_record.pk), 'name': core_record.name, 'model': core_record.__class__.__name__.lower()},
+                        'score': round(score, 3),
+                    }
+                    for plugin_record, core_record, score in matches
+                ]
+                for kind, matches in proposals.items()
+            },
+        })
+
     @action(detail=True, methods=['post'])
     def sync(self, request, pk=None):
         """Sync data from the linked plugin record to the core record"""
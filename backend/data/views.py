@@ -1,7 +1,6 @@
 from django.shortcuts import render
 from rest_framework import viewsets
 from rest_framework.response import Response
-from django.contrib.contenttypes.models import ContentType
 from .models import Bank, AccountType, AssetType, LiabilityType, Account, Transaction
 from .serializers import (
     BankSerializer,
@@ -11,7 +10,8 @@ from .serializers import (
     AccountSerializer,
     TransactionSerializer,
 )
-from api.models import Link
+from api.link_map import link_map
+from api.links import link_targets
 
 # Create your views here.
 
@@ -60,48 +60,35 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 from ynab.serializers import TransactionSerializer as YNABTransactionSerializer
 
                 # Get YNAB transactions with linked information
-                ynab_transactions = YNABTransaction.objects.filter(deleted=False).order_by('-date')
+                ynab_transactions = list(
+                    YNABTransaction.objects.filter(deleted=False)
+                    .select_related('account', 'payee', 'category')
+                    .order_by('-date')
+                )
+
+                # Links come from the link map; the linked core records are
+                # loaded with one query per core model
+                links = link_map()
+                tx_links = {
+                    ynab_tx.pk: [
+                        links.for_plugin(record) if record is not None else None
+                        for record in (ynab_tx.account, ynab_tx.category, ynab_tx.payee)
+                    ]
+                    for ynab_tx in ynab_transactions
+                }
+                core_records = link_targets(
+                    {link for found in tx_links.values() for link in found if link is not None},
+                    'core',
+                )
 
                 # Convert to the format expected by the frontend
                 transactions_data = []
                 for ynab_tx in ynab_transactions:
                     # Get linked information
-                    linked_account = None
-                    linked_category = None
-                    linked_payee = None
-
-                    # Check for linked account
-                    try:
-                        account_link = Link.objects.filter(
-                            plugin_content_type=ContentType.objects.get_for_model(ynab_tx.account),
-                            plugin_object_id=ynab_tx.account.id
-                        ).first()
-                        if account_link:
-                            linked_account = account_link.core_object.name
-                    except:
-                        pass
-
-                    # Check for linked category
-                    try:
-                        category_link = Link.objects.filter(
-                            plugin_content_type=ContentType.objects.get_for_model(ynab_tx.category),
-                            plugin_object_id=ynab_tx.category.id
-                        ).first()
-                        if category_link:
-                            linked_category = category_link.core_object.name
-                    except:
-                        pass
-
-                    # Check for linked payee
-                    try:
-                        payee_link = Link.objects.filter(
-                            plugin_content_type=ContentType.objects.get_for_model(ynab_tx.payee),
-                            plugin_object_id=ynab_tx.payee.id
-                        ).first()
-                        if payee_link:
-                            linked_payee = payee_link.core_object.name
-                    except:
-                        pass
+                    linked_account, linked_category, linked_payee = (
+                        core_records[link.pk].name if link is not None and core_records[link.pk] is not None else None
+                        for link in tx_links[ynab_tx.pk]
+                    )
 
                     # Convert YNAB transaction to our format
                     transaction_data = {
@@ -17,6 +17,6 @@ python3 manage.py populate_defaults
 echo "Populating lookup tables..."
 python3 populate_data.py
 
-# Start the Gunicorn server
+# Start the Gunicorn server with ASGI workers so YNAB proxy calls run async
 echo "Starting Gunicorn server..."
-gunicorn finance_assistant.wsgi:application --bind 0.0.0.0:8000 --workers 3
\ No newline at end of file
+gunicorn finance_assistant.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000 --workers 3
\ No newline at end of file
@@ -1,15 +1,73 @@
 import os
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from ynab.models import Category, CategoryGroup, Payee, YNABAccount
+from ynab.ratelimit import RateLimitExceeded
+from ynab.telemetry import SyncMetrics
+from ynab.upsert import FINGERPRINT_FIELD, fingerprint_item, supports_upsert, upsert_rows, write_transaction
+from ynab.ynab_client import YNABClient
+import logging
+
+logger = logging.getLogger(__name__)
+
+# YNAB endpoint -> key of the list in its response
+ENDPOINTS = {
+    'categories': 'category_groups',
+    'payees': 'payees',
+    'accounts': 'accounts',
+}
+
+
+def fetch_endpoint(client, budget_id, endpoint):
+    """Download one endpoint on a worker thread, returning its rows and fetch time"""
+    started = time.perf_counter()
+    try:
+        response = client.request("GET", f"budgets/{budget_id}/{endpoint}")
+        response.raise_for_status()
+        rows = response.json()["data"][ENDPOINTS[endpoint]]
+    finally:
+        # The rate limiter touched the database from this thread
+        close_old_connections()
+    return rows, (time.perf_counter() - started) * 1000
+
+
+def bulk_upsert(model_class, rows):
+    """Write rows in chunks; returns ``(created, updated)``"""
+    chunk_size = settings.YNAB_SYNC_BATCH_SIZE
+    if supports_upsert():
+        return upsert_rows(model_class, rows, chunk_size=chunk_size)
+
+    existing = set(model_class.objects.filter(pk__in=[row['id'] for row in rows]).values_list('pk', flat=True))
+    for row in rows:
+        row[FINGERPRINT_FIELD] = fingerprint_item(model_class, row)
+    fields = [f for f in model_class._meta.concrete_fields if not f.primary_key]
+    objects = [
+        model_class(pk=row['id'], **{f.attname: row.get(f.attname, row.get(f.name, f.get_default())) for f in fields})
+        for row in rows
+    ]
+    model_class.objects.bulk_create(
+        objects,
+        batch_size=chunk_size,
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=[f.name for f in fields],
+    )
+    updated = sum(1 for row in rows if row['id'] in existing)
+    return len(rows) - updated, updated
 
-# Create your views here.
 
 class SyncView(APIView):
     """
     A view to trigger the YNAB synchronization process.
+
+    Categories, payees and accounts are fetched concurrently and written with
+    chunked bulk upserts inside a single transaction.
     """
     def post(self, request, *args, **kwargs):
         api_key = os.getenv("YNAB_API_KEY")
@@ -21,111 +79,63 @@ class SyncView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        headers = {"Authorization": f"Bearer {api_key}"}
+        client = YNABClient(api_key)
+        metrics = SyncMetrics()
+        started = time.perf_counter()
 
         try:
-            # Sync Categories
-            categories_url = f"https://api.youneedabudget.com/v1/budgets/{budget_id}/categories"
-            categories_response = requests.get(categories_url, headers=headers)
-            categories_response.raise_for_status()
-
-            category_groups_data = categories_response.json()["data"]["category_groups"]
-
-            for group_data in category_groups_data:
-                group, created = CategoryGroup.objects.update_or_create(
-                    id=group_data['id'],
-                    defaults={
-                        'name': group_data['name'],
-                        'hidden': group_data['hidden'],
-                        'deleted': group_data['deleted'],
-                    }
-                )
-
-                for category_data in group_data['categories']:
-                    Category.objects.update_or_create(
-                        id=category_data['id'],
-                        defaults={
-                            'category_group': group,
-                            'category_group_name': category_data['category_group_name'],
-                            'name': category_data['name'],
-                            'hidden': category_data['hidden'],
-                            'original_category_group_id': category_data.get('original_category_group_id'),
-                            'note': category_data.get('note'),
-                            'budgeted': category_data['budgeted'],
-                            'activity': category_data['activity'],
-                            'balance': category_data['balance'],
-                            'goal_type': category_data.get('goal_type'),
-                            'goal_day': category_data.get('goal_day'),
-                            'goal_cadence': category_data.get('goal_cadence'),
-                            'goal_cadence_frequency': category_data.get('goal_cadence_frequency'),
-                            'goal_creation_month': category_data.get('goal_creation_month'),
-                            'goal_target': category_data.get('goal_target'),
-                            'goal_target_month': category_data.get('goal_target_month'),
-                            'goal_percentage_complete': category_data.get('goal_percentage_complete'),
-                            'goal_months_to_budget': category_data.get('goal_months_to_budget'),
-                            'goal_under_funded': category_data.get('goal_under_funded'),
-                            'goal_overall_funded': category_data.get('goal_overall_funded'),
-                            'goal_overall_left': category_data.get('goal_overall_left'),
-                            'deleted': category_data['deleted'],
-                        }
-                    )
-
-            # Sync Payees
-            payees_url = f"https://api.youneedabudget.com/v1/budgets/{budget_id}/payees"
-            payees_response = requests.get(payees_url, headers=headers)
-            payees_response.raise_for_status()
-
-            payees_data = payees_response.json()["data"]["payees"]
-
-            for payee_data in payees_data:
-                Payee.objects.update_or_create(
-                    id=payee_data['id'],
-                    defaults={
-                        'name': payee_data['name'],
-                        'transfer_account_id': payee_data.get('transfer_account_id'),
-                        'deleted': payee_data['deleted']
-                    }
-                )
-
-            # Sync Accounts
-            accounts_url = f"https://api.youneedabudget.com/v1/budgets/{budget_id}/accounts"
-            accounts_response = requests.get(accounts_url, headers=headers)
-            accounts_response.raise_for_status()
-
-            accounts_data = accounts_response.json()["data"]["accounts"]
-
-            for account_data in accounts_data:
-                if not account_data['closed']:
-                    YNABAccount.objects.update_or_create(
-                        id=account_data['id'],
-                        defaults={
-                            'name': account_data['name'],
-                            'type': account_data['type'],
-                            'on_budget': account_data['on_budget'],
-                            'closed': account_data['closed'],
-                            'note': account_data.get('note'),
-                            'balance': account_data['balance'],
-                            'cleared_balance': account_data['cleared_balance'],
-                            'uncleared_balance': account_data['uncleared_balance'],
-                            'transfer_payee_id': account_data['transfer_payee_id'],
-                            'direct_import_linked': account_data.get('direct_import_linked', False),
-                            'direct_import_in_error': account_data.get('direct_import_in_error', False),
-                            'last_reconciled_at': account_data.get('last_reconciled_at'),
-                            'debt_original_balance': account_data.get('debt_original_balance'),
-                            'debt_interest_rates': account_data.get('debt_interest_rates', {}),
-                            'debt_minimum_payments': account_data.get('debt_minimum_payments', {}),
-                            'debt_escrow_amounts': account_data.get('debt_escrow_amounts', {}),
-                            'deleted': account_data['deleted']
-                        }
-                    )
-
+            with ThreadPoolExecutor(max_workers=len(ENDPOINTS), thread_name_prefix='fa-ynab-fetch') as executor:
+                futures = {
+                    endpoint: executor.submit(fetch_endpoint, client, budget_id, endpoint)
+                    for endpoint in ENDPOINTS
+                }
+                fetched = {endpoint: future.result() for endpoint, future in futures.items()}
+        except RateLimitExceeded as e:
             return Response(
-                {"message": "YNAB data synchronized successfully."},
-                status=status.HTTP_200_OK,
+                {"error": str(e), "retry_after": int(e.retry_after)},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
             )
-
         except requests.exceptions.RequestException as e:
             return Response(
                 {"error": f"Failed to connect to YNAB API: {e}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+        category_groups = fetched['categories'][0]
+        writes = (
+            # (entity, model, rows, endpoint it came from)
+            ('category_groups', CategoryGroup, category_groups, 'categories'),
+            ('categories', Category, [c for group in category_groups for c in group.get('categories', [])], 'categories'),
+            ('payees', Payee, fetched['payees'][0], 'payees'),
+            # Closed accounts are not mirrored
+            ('accounts', YNABAccount, [a for a in fetched['accounts'][0] if not a['closed']], 'accounts'),
+        )
+        with write_transaction():
+            for entity, model_class, rows, _ in writes:
+                for row in rows:
+                    row['budget_id'] = budget_id
+                with metrics.measure_write(entity, len(rows)) as counts:
+                    created, updated = bulk_upsert(model_class, rows)
+                    counts.update(created=created, updated=updated)
+
+        # Bulk writes skip YNABAccount's post_save signal, so propagate balances here
+        from accounts.models import Account
+        with metrics.measure('propagation_ms'):
+            Account.bulk_sync_from_ynab()
+
+        entities = metrics.as_fields()['entities']
+        for entity, _, _, endpoint in writes:
+            entities[entity]['fetch_ms'] = round(fetched[endpoint][1], 1)
+        duration_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"YNAB sync finished in {duration_ms:.0f} ms: {entities}")
+
+        return Response(
+            {
+                "message": "YNAB data synchronized successfully.",
+                "duration_ms": round(duration_ms, 1),
+                "write_ms": round(metrics.write_ms, 1),
+                "propagation_ms": round(metrics.propagation_ms, 1),
+                "entities": entities,
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -0,0 +1,31 @@
+"""
+ASGI config for finance_assistant project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Serving through it lets the async YNAB proxy views wait on the YNAB API
+without occupying a worker; run it with e.g.
+``gunicorn finance_assistant.asgi:application -k uvicorn_worker.UvicornWorker``
+(the worker class ships in the ``uvicorn-worker`` package).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+"""
+
+import os
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_assistant.settings')
+
+application = get_asgi_application()
+
+# Each worker runs one long-lived loop, so YNAB calls can share a pooled
+# client; it is closed on lifespan shutdown
+from ynab.async_client import serve_shared_clients
+application = serve_shared_clients(application)
+
+# Keep local YNAB data warm without relying on the sync button
+if settings.YNAB_SYNC_SCHEDULER == 'thread':
+    from ynab.scheduler import start_scheduler_thread
+    start_scheduler_thread()
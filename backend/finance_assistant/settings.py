@@ -68,12 +68,17 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'finance_assistant.wsgi.application'
+ASGI_APPLICATION = 'finance_assistant.asgi.application'
 
 # Database
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.environ.get('DATABASE_PATH', '/data/finance_assistant.db'),
+        'OPTIONS': {
+            # Seconds a writer waits for another process (e.g. a sync in another worker) to commit
+            'timeout': int(os.environ.get('DATABASE_TIMEOUT', '20')),
+        },
     }
 }
 
@@ -132,4 +137,67 @@ X_FRAME_OPTIONS = 'SAMEORIGIN'
 # Environment variables
 YNAB_API_KEY = os.environ.get('YNAB_API_KEY', '')
 YNAB_BUDGET_ID = os.environ.get('YNAB_BUDGET_ID', '')
+
+# YNAB sync tuning
+YNAB_SYNC_MODE = os.environ.get('YNAB_SYNC_MODE', 'stream')  # 'stream', 'full' or 'entities'
+YNAB_SYNC_BATCH_SIZE = int(os.environ.get('YNAB_SYNC_BATCH_SIZE', '500'))
+YNAB_SYNC_WRITER = os.environ.get('YNAB_SYNC_WRITER', 'upsert')  # 'upsert' or 'orm'
+YNAB_SYNC_STAGING_THRESHOLD = int(os.environ.get('YNAB_SYNC_STAGING_THRESHOLD', '5000'))  # Transactions in one write that switch to the staging-table merge; 0 disables it
+YNAB_SYNC_FETCH_WORKERS = int(os.environ.get('YNAB_SYNC_FETCH_WORKERS', '4'))  # Concurrent requests in 'entities' mode
+YNAB_SYNC_MONTH_DETAIL_LIMIT = int(os.environ.get('YNAB_SYNC_MONTH_DETAIL_LIMIT', '24'))  # Changed months whose categories are fetched per 'entities' sync
+YNAB_SYNC_SWEEP_LINKS = os.environ.get('YNAB_SYNC_SWEEP_LINKS', 'true').lower() == 'true'  # Delete links to removed records after each successful sync
+YNAB_SYNC_MAX_PARALLEL_BUDGETS = int(os.environ.get('YNAB_SYNC_MAX_PARALLEL_BUDGETS', '2'))  # Budgets synced at the same time
+YNAB_SYNC_WAIT_SECONDS = int(os.environ.get('YNAB_SYNC_WAIT_SECONDS', '30'))  # How long POST /api/ynab/sync/?wait=true waits for the job
+YNAB_SYNC_JOB_STALE_SECONDS = int(os.environ.get('YNAB_SYNC_JOB_STALE_SECONDS', '600'))  # Running jobs without a heartbeat this long are abandoned
+YNAB_SYNC_SCHEDULER = os.environ.get('YNAB_SYNC_SCHEDULER', 'off')  # 'off' or 'thread' (run the scheduler inside each web worker)
+YNAB_SYNC_INTERVAL_MIN = int(os.environ.get('YNAB_SYNC_INTERVAL_MIN', '60'))  # Seconds between delta syncs while changes are flowing
+YNAB_SYNC_INTERVAL_MAX = int(os.environ.get('YNAB_SYNC_INTERVAL_MAX', '1800'))  # Upper bound the cadence backs off to when deltas are empty
+YNAB_SYNC_BACKOFF_FACTOR = float(os.environ.get('YNAB_SYNC_BACKOFF_FACTOR', '2'))
+YNAB_SYNC_JOB_RETENTION = int(os.environ.get('YNAB_SYNC_JOB_RETENTION', '200'))  # Finished sync jobs kept for history
+# Gzip copies of every sync's raw YNAB responses, for manage.py replay_ynab_deltas; empty disables
+YNAB_DELTA_ARCHIVE_DIR = os.environ.get(
+    'YNAB_DELTA_ARCHIVE_DIR', os.path.join(os.path.dirname(DATABASES['default']['NAME']), 'ynab-deltas')
+)
+YNAB_DELTA_ARCHIVE_RETENTION_DAYS = int(os.environ.get('YNAB_DELTA_ARCHIVE_RETENTION_DAYS', '14'))
+YNAB_DELTA_ARCHIVE_MAX_SYNCS = int(os.environ.get('YNAB_DELTA_ARCHIVE_MAX_SYNCS', '500'))  # Per budget; the newest full download is always kept
+YNAB_DELTA_ARCHIVE_COMPRESSLEVEL = int(os.environ.get('YNAB_DELTA_ARCHIVE_COMPRESSLEVEL', '6'))
+
+# YNAB API rate limiting, shared by all workers through the database
+YNAB_RATE_LIMIT_PER_HOUR = int(os.environ.get('YNAB_RATE_LIMIT_PER_HOUR', '200'))  # YNAB's quota per access token
+YNAB_RATE_LIMIT_MAX_WAIT = int(os.environ.get('YNAB_RATE_LIMIT_MAX_WAIT', '30'))  # Longest a request waits for quota before failing
+YNAB_REQUEST_RETRIES = int(os.environ.get('YNAB_REQUEST_RETRIES', '3'))  # Retries after a 429, 5xx or connection error
+
+# Pooled HTTP session for YNAB calls (one per worker process)
+YNAB_HTTP_CONNECT_TIMEOUT = float(os.environ.get('YNAB_HTTP_CONNECT_TIMEOUT', '5'))
+YNAB_HTTP_READ_TIMEOUT = float(os.environ.get('YNAB_HTTP_READ_TIMEOUT', '60'))  # Between bytes, not for the whole download
+YNAB_HTTP_POOL_CONNECTIONS = int(os.environ.get('YNAB_HTTP_POOL_CONNECTIONS', '4'))  # Distinct hosts kept in the pool
+YNAB_HTTP_POOL_SIZE = int(os.environ.get('YNAB_HTTP_POOL_SIZE', '10'))  # Keep-alive connections per host; covers concurrent entity fetches
+
+# Per-worker cache of the YNAB metadata proxy views (seconds; 0 disables)
+YNAB_PROXY_CACHE_TTL = {
+    'user': int(os.environ.get('YNAB_CACHE_TTL_USER', '3600')),
+    'budgets': int(os.environ.get('YNAB_CACHE_TTL_BUDGETS', '600')),
+    'budget': int(os.environ.get('YNAB_CACHE_TTL_BUDGET', '120')),
+    'months': int(os.environ.get('YNAB_CACHE_TTL_MONTHS', '120')),
+}
+YNAB_PROXY_CACHE_MAX_ENTRIES = int(os.environ.get('YNAB_PROXY_CACHE_MAX_ENTRIES', '64'))
+YNAB_EXPLORER_CACHE_TTL = int(os.environ.get('YNAB_EXPLORER_CACHE_TTL', '30'))  # For explorer GETs that ask for caching
+YNAB_EXPLORER_CACHE_MAX_ENTRIES = int(os.environ.get('YNAB_EXPLORER_CACHE_MAX_ENTRIES', '16'))
+YNAB_EXPLORER_CACHE_MAX_BYTES = int(os.environ.get('YNAB_EXPLORER_CACHE_MAX_BYTES', str(2 * 1024 * 1024)))  # Larger bodies are only streamed
+
+# Replaced whenever cached configuration rows change, so every worker reloads them
+CONFIG_VERSION_PATH = os.environ.get(
+    'CONFIG_VERSION_PATH', os.path.join(os.path.dirname(DATABASES['default']['NAME']), 'config.version')
+)
+# Replaced whenever a sync completes, so every worker retires its cached YNAB responses
+SYNC_VERSION_PATH = os.environ.get(
+    'SYNC_VERSION_PATH', os.path.join(os.path.dirname(DATABASES['default']['NAME']), 'sync.version')
+)
+# Lowest name similarity (0-1, trigram Dice coefficient) at which auto-linking pairs two records
+AUTO_LINK_MIN_SCORE = float(os.environ.get('AUTO_LINK_MIN_SCORE', '0.8'))
+
+# Replaced whenever a Link row changes, so every worker reloads its link map
+LINK_VERSION_PATH = os.environ.get(
+    'LINK_VERSION_PATH', os.path.join(os.path.dirname(DATABASES['default']['NAME']), 'links.version')
+)
 API_KEY = os.environ.get('API_KEY', 'your-api-key-for-home-assistant')
\ No newline at end of file
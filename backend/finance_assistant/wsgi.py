@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_assistant.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Keep local YNAB data warm without relying on the sync button
+if settings.YNAB_SYNC_SCHEDULER == 'thread':
+    from ynab.scheduler import start_scheduler_thread
+    start_scheduler_thread()
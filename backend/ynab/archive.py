@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.utils import timezone
+import datetime
+import gzip
+import os
+import shutil
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Name of the archived /budgets/{budget_id} document; 'entities' syncs store
+# one file per delta endpoint instead, plus one per month detail.
+BUDGET_DOCUMENT = 'budget'
+MONTH_DETAIL_PREFIX = 'month-'
+SUFFIX = '.json.gz'
+
+
+class ArchivingReader:
+    """Copies everything read from a stream into an open archive file"""
+
+    def __init__(self, raw, archive_file):
+        self.raw = raw
+        self.archive_file = archive_file
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        if self.archive_file is not None:
+            try:
+                self.archive_file.write(chunk)
+            except OSError as e:
+                # Archiving is a safety net; keep syncing without it
+                logger.warning(f"Stopped archiving YNAB response: {e}")
+                self.archive_file = None
+        return chunk
+
+
+class DeltaArchive:
+    """
+    Gzip copies of the raw YNAB responses one sync downloaded, so the sync
+    can be replayed locally with ``manage.py replay_ynab_deltas``.
+
+    Each sync gets its own directory, ``<root>/<budget_id>/<started>-<base>``,
+    where ``base`` is ``full`` for a download from scratch and ``k<knowledge>``
+    for a delta. Files are written as the bytes arrive, so a sync that fails
+    halfway still leaves what it had downloaded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def start(cls, budget_id, last_knowledge, root=None):
+        """Archive for a new sync, or None when archiving is disabled"""
+        root = settings.YNAB_DELTA_ARCHIVE_DIR if root is None else root
+        if not root:
+            return None
+        base = f"k{last_knowledge}" if last_knowledge else 'full'
+        return cls(os.path.join(root, budget_id, f"{timezone.now():%Y%m%dT%H%M%S%f}-{base}"))
+
+    @property
+    def is_full(self):
+        return self.path.endswith('-full')
+
+    def writer(self, name):
+        """Binary gzip file for one response body"""
+        os.makedirs(self.path, exist_ok=True)
+        return gzip.open(os.path.join(self.path, name + SUFFIX), 'wb', compresslevel=settings.YNAB_DELTA_ARCHIVE_COMPRESSLEVEL)
+
+    def write(self, name, body):
+        """Archive one response body; returns whether it was stored"""
+        try:
+            with self.writer(name) as archive_file:
+                archive_file.write(body)
+        except OSError as e:
+            # Archiving is a safety net; never fail the sync over it
+            logger.warning(f"Could not archive YNAB {name} response in {self.path}: {e}")
+            return False
+        return True
+
+    def copy(self, source, name):
+        """Copy one response archived by another sync; returns whether it was stored"""
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            shutil.copyfile(os.path.join(source.path, name + SUFFIX), os.path.join(self.path, name + SUFFIX))
+        except OSError as e:
+            logger.warning(f"Could not copy archived YNAB {name} response into {self.path}: {e}")
+            return False
+        return True
+
+    def open(self, name):
+        return gzip.open(os.path.join(self.path, name + SUFFIX), 'rb')
+
+    def names(self):
+        return sorted(f[:-len(SUFFIX)] for f in os.listdir(self.path) if f.endswith(SUFFIX))
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(self.path, f)) for f in os.listdir(self.path))
+
+
+def archived_syncs(budget_id, root=None, since=None):
+    """A budget's archived syncs, oldest first; ``since`` is a date or datetime"""
+    root = settings.YNAB_DELTA_ARCHIVE_DIR if root is None else root
+    directory = os.path.join(root, budget_id)
+    if not root or not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+    if since is not None:
+        names = [name for name in names if name >= f"{since:%Y%m%d}"]
+    return [DeltaArchive(os.path.join(directory, name)) for name in names]
+
+
+def prune(budget_id, root=None, now=None):
+    """
+    Apply the retention policy to a budget's archive: drop syncs older than
+    YNAB_DELTA_ARCHIVE_RETENTION_DAYS and all but the newest
+    YNAB_DELTA_ARCHIVE_MAX_SYNCS. The newest full download is always kept
+    so there is a base to replay deltas onto.
+    """
+    archives = archived_syncs(budget_id, root=root)
+    if not archives:
+        return 0
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=settings.YNAB_DELTA_ARCHIVE_RETENTION_DAYS)
+    newest_full = next((a for a in reversed(archives) if a.is_full), None)
+    keep_from = len(archives) - settings.YNAB_DELTA_ARCHIVE_MAX_SYNCS
+
+    removed = 0
+    for index, archive in enumerate(archives):
+        if archive is newest_full:
+            continue
+        if index < keep_from or os.path.basename(archive.path) < f"{cutoff:%Y%m%dT%H%M%S%f}":
+            shutil.rmtree(archive.path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info(f"Pruned {removed} archived YNAB syncs for budget {budget_id}")
+    return removed
@@ -0,0 +1,186 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from . import cache, ratelimit
+from .ratelimit import RateLimitExceeded
+from .ynab_client import RETRY_STATUSES, YNABClient
+import asyncio
+import httpx
+import time
+import weakref
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One pooled client per event loop; an AsyncClient cannot outlive its loop.
+# Only used once serve_shared_clients() says the loop is long-lived: under
+# WSGI every async view runs on a fresh loop, so each AsyncYNABClient opens
+# and closes its own pool instead.
+_clients = weakref.WeakKeyDictionary()
+_shared = False
+
+
+def new_async_client():
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.YNAB_HTTP_READ_TIMEOUT, connect=settings.YNAB_HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.YNAB_HTTP_POOL_SIZE,
+            max_keepalive_connections=settings.YNAB_HTTP_POOL_SIZE,
+        ),
+        headers={'Accept-Encoding': 'gzip, deflate'},
+    )
+
+
+def get_async_client():
+    """The keep-alive ``httpx.AsyncClient`` shared by YNAB calls on the running loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = new_async_client()
+        _clients[loop] = client
+    return client
+
+
+async def aclose_clients():
+    """Close the shared client of the running loop"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def serve_shared_clients(application):
+    """
+    Wrap an ASGI application so YNAB calls share one pooled client per
+    worker loop, closed when the server sends the lifespan shutdown.
+    """
+    global _shared
+    _shared = True
+
+    async def app(scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await application(scope, receive, send)
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await aclose_clients()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    return app
+
+
+class AsyncYNABClient:
+    """
+    asyncio counterpart of ``YNABClient`` for the ASGI proxy views. It shares
+    the rate-limit bucket, retry policy and metadata cache with the blocking
+    client, but waits on the event loop so one worker can keep many upstream
+    calls in flight.
+    """
+    BASE_URL = YNABClient.BASE_URL
+
+    def __init__(self, api_key, max_wait=None):
+        self.api_key = api_key
+        self.headers = {"Authorization": f"Bearer {self.api_key}"}
+        self.max_wait = settings.YNAB_RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        self.last_etag = None
+        self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def client(self):
+        if _shared:
+            return get_async_client()
+        if self._client is None or self._client.is_closed:
+            self._client = new_async_client()
+        return self._client
+
+    async def aclose(self):
+        """Close the client's own connection pool; the shared one stays open"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def url(self, endpoint):
+        if endpoint.startswith('http'):
+            return endpoint
+        return f"{self.BASE_URL}/{endpoint.lstrip('/')}"
+
+    async def request(self, method, endpoint, stream=False, **kwargs):
+        """
+        Send a request and return the ``httpx.Response`` without raising for its
+        status. With ``stream=True`` the body is left unread; the caller must
+        ``aclose()`` the response before closing this client.
+        """
+        url = self.url(endpoint)
+        headers = {**self.headers, **kwargs.pop('headers', {})}
+        deadline = time.monotonic() + self.max_wait
+        attempt = 0
+        while True:
+            await ratelimit.aacquire(self.api_key, max_wait=max(deadline - time.monotonic(), 0))
+            try:
+                client = self.client()
+                response = await client.send(client.build_request(method, url, headers=headers, **kwargs), stream=stream)
+            except httpx.TransportError:
+                if attempt >= settings.YNAB_REQUEST_RETRIES:
+                    raise
+                delay = ratelimit.backoff_delay(attempt)
+                logger.warning(f"YNAB request to {url} failed to connect; retrying in {delay:.1f}s")
+            else:
+                await sync_to_async(ratelimit.observe_response)(self.api_key, response)
+                if response.status_code not in RETRY_STATUSES or attempt >= settings.YNAB_REQUEST_RETRIES:
+                    return response
+                if response.status_code == 429:
+                    delay = ratelimit.retry_after_seconds(response) + ratelimit.backoff_delay(0)
+                else:
+                    delay = ratelimit.backoff_delay(attempt)
+                if time.monotonic() + delay > deadline:
+                    if response.status_code == 429:
+                        raise RateLimitExceeded(delay)
+                    return response
+                logger.warning(f"YNAB returned {response.status_code} for {url}; retrying in {delay:.1f}s")
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _cached_get(self, kind, endpoint):
+        async def fetch(validators):
+            headers = {}
+            if 'ETag' in validators:
+                headers['If-None-Match'] = validators['ETag']
+            if 'Last-Modified' in validators:
+                headers['If-Modified-Since'] = validators['Last-Modified']
+            response = await self.request("GET", endpoint, headers=headers)
+            if response.status_code == 304 and headers:
+                return None
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                logger.error(f"YNAB API Error: {e.response.status_code} {e.response.reason_phrase} for URL: {response.url}")
+                raise
+            fresh = {name: response.headers[name] for name in ('ETag', 'Last-Modified') if name in response.headers}
+            return response.json().get('data', {}), fresh
+
+        entry = await cache.acached_get(self.api_key, endpoint, kind, fetch)
+        self.last_etag = entry.etag
+        return entry.data
+
+    async def get_user(self):
+        data = await self._cached_get("user", "user")
+        return data.get('user')
+
+    async def get_budgets(self):
+        data = await self._cached_get("budgets", "budgets")
+        return data.get('budgets', [])
+
+    async def get_budget_by_id(self, budget_id):
+        data = await self._cached_get("budget", f"budgets/{budget_id}")
+        return data.get('budget')
+
+    async def get_months(self, budget_id):
+        data = await self._cached_get("months", f"budgets/{budget_id}/months")
+        return data.get('months', [])
@@ -0,0 +1,624 @@
+"""
+Async versions of the YNAB proxy views. Under the ASGI entry point
+(``finance_assistant.asgi``) these wait on YNAB without holding a worker, so
+slow upstream calls don't starve the local CRUD endpoints.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
+from . import cache, config_cache
+from .async_client import AsyncYNABClient
+from .ratelimit import RateLimitExceeded
+from .models import BudgetMonth
+from .serializers import BudgetMonthSerializer, YNABBudgetSerializer
+from urllib.parse import urlencode
+import httpx
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Endpoints offered by the API explorer page
+YNAB_API_ENDPOINTS = {
+    "user": {
+        "title": "User",
+        "endpoints": [
+            {
+                "method": "GET",
+                "path": "/user",
+                "description": "Returns authenticated user information",
+                "parameters": [],
+                "variables": []
+            }
+        ]
+    },
+    "budgets": {
+        "title": "Budgets",
+        "endpoints": [
+            {
+                "method": "GET",
+                "path": "/budgets",
+                "description": "Returns budgets list with summary information",
+                "parameters": [],
+                "variables": []
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}",
+                "description": "Returns a single budget with all related entities",
+                "parameters": ["last_knowledge_of_server"],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/settings",
+                "description": "Returns settings for a budget",
+                "parameters": [],
+                "variables": ["budget_id"]
+            }
+        ]
+    },
+    "accounts": {
+        "title": "Accounts",
+        "endpoints": [
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/accounts",
+                "description": "Returns all accounts for the specified budget",
+                "parameters": [],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "POST",
+                "path": "/budgets/{budget_id}/accounts",
+                "description": "Creates a new account",
+                "parameters": ["account"],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/accounts/{account_id}",
+                "description": "Returns a single account",
+                "parameters": [],
+                "variables": ["budget_id", "account_id"]
+            }
+        ]
+    },
+    "categories": {
+        "title": "Categories",
+        "endpoints": [
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/categories",
+                "description": "Returns all categories grouped by category group",
+                "parameters": [],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/categories/{category_id}",
+                "description": "Returns a single category",
+                "parameters": [],
+                "variables": ["budget_id", "category_id"]
+            },
+            {
+                "method": "PATCH",
+                "path": "/budgets/{budget_id}/categories/{category_id}",
+                "description": "Updates a category",
+                "parameters": ["category"],
+                "variables": ["budget_id", "category_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/months/{month}/categories/{category_id}",
+                "description": "Returns a specific category for a specific month",
+                "parameters": [],
+                "variables": ["budget_id", "month", "category_id"]
+            },
+            {
+                "method": "PATCH",
+                "path": "/budgets/{budget_id}/months/{month}/categories/{category_id}",
+                "description": "Updates a category for a specific month",
+                "parameters": ["category"],
+                "variables": ["budget_id", "month", "category_id"]
+            }
+        ]
+    },
+    "payees": {
+        "title": "Payees",
+        "endpoints": [
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/payees",
+                "description": "Returns all payees",
+                "parameters": [],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/payees/{payee_id}",
+                "description": "Returns a single payee",
+                "parameters": [],
+                "variables": ["budget_id", "payee_id"]
+            },
+            {
+                "method": "PATCH",
+                "path": "/budgets/{budget_id}/payees/{payee_id}",
+                "description": "Updates a payee",
+                "parameters": ["payee"],
+                "variables": ["budget_id", "payee_id"]
+            }
+        ]
+    },
+    "payee_locations": {
+        "title": "Payee Locations",
+        "endpoints": [
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/payee_locations",
+                "description": "Returns all payee locations",
+                "parameters": [],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/payee_locations/{payee_location_id}",
+                "description": "Returns a single payee location",
+                "parameters": [],
+                "variables": ["budget_id", "payee_location_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/payees/{payee_id}/payee_locations",
+                "description": "Returns all payee locations for a specific payee",
+                "parameters": [],
+                "variables": ["budget_id", "payee_id"]
+            }
+        ]
+    },
+    "months": {
+        "title": "Months",
+        "endpoints": [
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/months",
+                "description": "Returns all budget months",
+                "parameters": [],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/months/{month}",
+                "description": "Returns a single budget month",
+                "parameters": [],
+                "variables": ["budget_id", "month"]
+            }
+        ]
+    },
+    "transactions": {
+        "title": "Transactions",
+        "endpoints": [
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/transactions",
+                "description": "Returns budget transactions",
+                "parameters": ["since_date", "type", "last_knowledge_of_server"],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "POST",
+                "path": "/budgets/{budget_id}/transactions",
+                "description": "Creates a new transaction",
+                "parameters": ["transaction"],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "PATCH",
+                "path": "/budgets/{budget_id}/transactions",
+                "description": "Updates multiple transactions",
+                "parameters": ["transactions"],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "POST",
+                "path": "/budgets/{budget_id}/transactions/import",
+                "description": "Imports transactions from a file",
+                "parameters": ["import_id", "transactions"],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/transactions/{transaction_id}",
+                "description": "Returns a single transaction",
+                "parameters": [],
+                "variables": ["budget_id", "transaction_id"]
+            },
+            {
+                "method": "PUT",
+                "path": "/budgets/{budget_id}/transactions/{transaction_id}",
+                "description": "Updates a single transaction",
+                "parameters": ["transaction"],
+                "variables": ["budget_id", "transaction_id"]
+            },
+            {
+                "method": "DELETE",
+                "path": "/budgets/{budget_id}/transactions/{transaction_id}",
+                "description": "Deletes a transaction",
+                "parameters": [],
+                "variables": ["budget_id", "transaction_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/accounts/{account_id}/transactions",
+                "description": "Returns transactions for a specific account",
+                "parameters": ["since_date", "type", "last_knowledge_of_server"],
+                "variables": ["budget_id", "account_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/categories/{category_id}/transactions",
+                "description": "Returns transactions for a specific category",
+                "parameters": ["since_date", "type", "last_knowledge_of_server"],
+                "variables": ["budget_id", "category_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/payees/{payee_id}/transactions",
+                "description": "Returns transactions for a specific payee",
+                "parameters": ["since_date", "type", "last_knowledge_of_server"],
+                "variables": ["budget_id", "payee_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/months/{month}/transactions",
+                "description": "Returns transactions for a specific month",
+                "parameters": ["since_date", "type", "last_knowledge_of_server"],
+                "variables": ["budget_id", "month"]
+            }
+        ]
+    },
+    "scheduled_transactions": {
+        "title": "Scheduled Transactions",
+        "endpoints": [
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/scheduled_transactions",
+                "description": "Returns all scheduled transactions",
+                "parameters": [],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "POST",
+                "path": "/budgets/{budget_id}/scheduled_transactions",
+                "description": "Creates a new scheduled transaction",
+                "parameters": ["scheduled_transaction"],
+                "variables": ["budget_id"]
+            },
+            {
+                "method": "GET",
+                "path": "/budgets/{budget_id}/scheduled_transactions/{scheduled_transaction_id}",
+                "description": "Returns a single scheduled transaction",
+                "parameters": [],
+                "variables": ["budget_id", "scheduled_transaction_id"]
+            },
+            {
+                "method": "PUT",
+                "path": "/budgets/{budget_id}/scheduled_transactions/{scheduled_transaction_id}",
+                "description": "Updates a scheduled transaction",
+                "parameters": ["scheduled_transaction"],
+                "variables": ["budget_id", "scheduled_transaction_id"]
+            },
+            {
+                "method": "DELETE",
+                "path": "/budgets/{budget_id}/scheduled_transactions/{scheduled_transaction_id}",
+                "description": "Deletes a scheduled transaction",
+                "parameters": [],
+                "variables": ["budget_id", "scheduled_transaction_id"]
+            }
+        ]
+    }
+}
+
+
+def json_response(payload, status=200):
+    # Payloads are lists or dicts straight from YNAB
+    return JsonResponse(payload, status=status, safe=False)
+
+
+def cached_json_response(request, payload, etag):
+    """JSON carrying the cache entry's ETag, or 304 when the client already has it"""
+    if etag and etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        response = json_response(payload)
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+def rate_limited_json_response(error):
+    retry_after = max(round(error.retry_after), 1)
+    response = json_response({"error": str(error), "retry_after": retry_after}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+async def configured_api_key(request):
+    """API key from the X-YNAB-API-Key header, falling back to the stored configuration"""
+    api_key = request.headers.get('X-YNAB-API-Key')
+    if not api_key:
+        config = await config_cache.afirst_configuration()
+        if config and config.api_key:
+            api_key = config.api_key
+    return api_key
+
+
+class YNABBudgetsView(View):
+    async def get(self, request, *args, **kwargs):
+        api_key = await configured_api_key(request)
+        if not api_key:
+            return json_response({"error": "YNAB API key not configured."}, status=400)
+
+        try:
+            async with AsyncYNABClient(api_key) as client:
+                budgets_response = await client.get_budgets()
+            serializer = YNABBudgetSerializer(budgets_response, many=True)
+            return cached_json_response(request, {
+                'data': {
+                    'budgets': serializer.data
+                }
+            }, client.last_etag)
+        except RateLimitExceeded as e:
+            return rate_limited_json_response(e)
+        except Exception as e:
+            logger.error(f"Error fetching YNAB budgets: {e}")
+            return json_response({"error": str(e)}, status=500)
+
+
+def local_months(budget_id):
+    """Month summaries from the synced history, or None before the first sync has filled it"""
+    months = BudgetMonth.objects.filter(budget_id=budget_id, deleted=False).order_by('-month')
+    data = BudgetMonthSerializer(months, many=True).data
+    return data or None
+
+
+class YNABMonthsView(View):
+    """
+    Month summaries for the configured budget, served from the local history
+    the sync maintains. ``?live=true``, or a history that has not been synced
+    yet, proxies ``/budgets/{id}/months`` instead.
+    """
+    async def get(self, request, *args, **kwargs):
+        config = await config_cache.afirst_configuration()
+        budget_id = config.budget_id if config else None
+
+        if budget_id and request.GET.get('live', '').lower() != 'true':
+            months = await sync_to_async(local_months)(budget_id)
+            if months is not None:
+                payload = {'data': {'months': months}}
+                return cached_json_response(request, payload, cache.CacheEntry(payload, {}, None).etag)
+
+        api_key = await configured_api_key(request)
+        if not api_key:
+            return json_response({"error": "YNAB API key not configured."}, status=400)
+
+        if not budget_id:
+            return json_response({"error": "YNAB budget ID not configured."}, status=400)
+
+        try:
+            async with AsyncYNABClient(api_key) as client:
+                months_response = await client.get_months(budget_id)
+            return cached_json_response(request, {
+                'data': {
+                    'months': months_response
+                }
+            }, client.last_etag)
+        except RateLimitExceeded as e:
+            return rate_limited_json_response(e)
+        except Exception as e:
+            logger.error(f"Error fetching YNAB months: {e}")
+            return json_response({"error": str(e)}, status=500)
+
+
+class YNABUserView(View):
+    async def get(self, request, *args, **kwargs):
+        api_key = request.headers.get('X-YNAB-API-Key')
+        if not api_key:
+            config = await config_cache.aprimary_configuration()
+            if config is None:
+                return json_response({"message": "YNAB is not configured."}, status=400)
+            api_key = config.api_key
+
+        if not api_key:
+            return json_response({"message": "API key must be configured."}, status=400)
+
+        try:
+            async with AsyncYNABClient(api_key) as client:
+                user_data = await client.get_user()
+            logger.info(f"YNAB User data retrieved: {user_data}")
+            return cached_json_response(request, user_data, client.last_etag)
+        except httpx.HTTPStatusError as e:
+            logger.error("YNAB API Error during User fetch", exc_info=True)
+            return json_response({"message": f"YNAB API Error: {e.response.reason_phrase}"}, status=e.response.status_code)
+        except RateLimitExceeded as e:
+            return rate_limited_json_response(e)
+        except Exception as e:
+            logger.error("An unexpected error occurred during YNAB User fetch", exc_info=True)
+            return json_response({"message": f"An unexpected error occurred: {str(e)}"}, status=500)
+
+
+class YNABAPIEndpointsView(View):
+    """
+    API endpoint for testing and exploring YNAB API endpoints.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        """Get available endpoints and their metadata"""
+        return json_response(YNAB_API_ENDPOINTS)
+
+    async def post(self, request, *args, **kwargs):
+        """Make a YNAB API call"""
+        config = await config_cache.aprimary_configuration()
+        if config is None:
+            return json_response({"error": "YNAB is not configured."}, status=400)
+        api_key = config.api_key
+
+        if not api_key:
+            return json_response({"error": "API key must be configured."}, status=400)
+
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return json_response({"error": "Request body must be JSON."}, status=400)
+
+        # Get request data
+        method = data.get('method', 'GET').upper()
+        endpoint = data.get('endpoint', '')
+        variables = data.get('variables', {})
+        parameters = data.get('parameters', {})
+        body = data.get('body', {})
+
+        if method not in ('GET', 'POST', 'PUT', 'PATCH', 'DELETE'):
+            return json_response({"error": f"Unsupported HTTP method: {method}"}, status=400)
+
+        # Build the URL
+        url = f"{AsyncYNABClient.BASE_URL}{endpoint}"
+
+        # Replace variables in the URL
+        for var_name, var_value in variables.items():
+            url = url.replace(f"{{{var_name}}}", str(var_value))
+
+        # Add query parameters
+        query = {key: value for key, value in parameters.items() if value is not None and value != ''}
+        if query:
+            url += "?" + urlencode(query)
+
+        # Idempotent GETs may be served from a short-lived per-worker cache
+        use_cache = method == 'GET' and bool(data.get('cache')) and settings.YNAB_EXPLORER_CACHE_TTL > 0
+        envelope = {"status": 200, "url": url, "method": method}
+        if use_cache:
+            key = cache.cache_key(api_key, url)
+            generation = cache.sync_generation()
+            entry = cache.explorer_cache.get(key, generation)
+            if entry is not None and entry.fresh:
+                response = HttpResponse(enveloped(envelope, entry.data), content_type='application/json')
+                response['X-Cache'] = 'HIT'
+                return response
+
+        client = AsyncYNABClient(api_key)
+        try:
+            if method in ('POST', 'PUT', 'PATCH'):
+                response = await client.request(method, url, json=body, stream=True)
+            else:
+                response = await client.request(method, url, stream=True)
+        except RateLimitExceeded as e:
+            await client.aclose()
+            return rate_limited_json_response(e)
+        except Exception as e:
+            await client.aclose()
+            return json_response({"error": f"Request failed: {str(e)}"}, status=500)
+
+        if response.is_error or 'json' not in response.headers.get('Content-Type', ''):
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+                await client.aclose()
+            return buffered_response(response, url, method)
+
+        # Pipe the upstream JSON through inside the usual envelope instead of
+        # parsing and re-serializing it, so large bodies are never held twice
+        envelope["status"] = response.status_code
+        cache_as = (key, generation) if use_cache else None
+        if not hasattr(request, 'scope'):
+            # Under WSGI the body cannot be read after this view's event loop
+            # ends, so it is read here but still not re-serialized
+            try:
+                body = await response.aread()
+            finally:
+                await response.aclose()
+                await client.aclose()
+            if cache_as and len(body) <= settings.YNAB_EXPLORER_CACHE_MAX_BYTES:
+                cache_explorer_body(cache_as, body)
+            buffered = HttpResponse(enveloped(envelope, body), content_type='application/json')
+            if use_cache:
+                buffered['X-Cache'] = 'MISS'
+            return buffered
+
+        streaming = StreamingHttpResponse(
+            stream_enveloped(envelope, response, cache_as=cache_as, client=client),
+            status=200,
+            content_type='application/json',
+        )
+        if use_cache:
+            streaming['X-Cache'] = 'MISS'
+        return streaming
+
+
+def envelope_prefix(envelope):
+    """Opening of the explorer response envelope, up to where the raw body goes"""
+    return json.dumps(envelope)[:-1].encode('utf-8') + b', "data": '
+
+
+def enveloped(envelope, body):
+    return envelope_prefix(envelope) + body + b'}'
+
+
+async def stream_enveloped(envelope, response, cache_as=None, client=None):
+    """
+    Yield the envelope with the upstream body piped through chunk by chunk.
+    With ``cache_as=(key, generation)``, a body that fits the explorer cache
+    is stored once the stream completes. ``client``, the AsyncYNABClient that
+    sent the request, is closed along with the response.
+    """
+    buffered = [] if cache_as else None
+    size = 0
+    try:
+        yield envelope_prefix(envelope)
+        async for chunk in response.aiter_bytes():
+            if buffered is not None:
+                size += len(chunk)
+                if size > settings.YNAB_EXPLORER_CACHE_MAX_BYTES:
+                    buffered = None
+                else:
+                    buffered.append(chunk)
+            yield chunk
+        yield b'}'
+    finally:
+        await response.aclose()
+        if client is not None:
+            await client.aclose()
+    if buffered is not None:
+        cache_explorer_body(cache_as, b''.join(buffered))
+
+
+def cache_explorer_body(cache_as, body):
+    key, generation = cache_as
+    entry = cache.CacheEntry(body, {}, generation)
+    entry.touch(settings.YNAB_EXPLORER_CACHE_TTL)
+    cache.explorer_cache.put(key, entry)
+
+
+def buffered_response(response, url, method):
+    """Explorer response for errors and non-JSON bodies, which are small and read in full"""
+    if response.is_error:
+        error_data = {"error": f"HTTP {response.status_code}: {response.reason_phrase}"}
+        try:
+            error_data["details"] = response.json()
+        except ValueError:
+            error_data["details"] = response.text
+        return json_response(error_data, status=response.status_code)
+
+    # Try to parse JSON response
+    try:
+        response_data = response.json()
+    except ValueError:
+        response_data = {"raw_text": response.text}
+
+    return json_response({
+        "status": response.status_code,
+        "url": url,
+        "method": method,
+        "data": response_data
+    })
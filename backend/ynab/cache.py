@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from django.conf import settings
+from .config_cache import ConfigCache
+import hashlib
+import itertools
+import json
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    def __init__(self, data, validators, generation):
+        self.data = data  # Parsed JSON, or raw bytes for explorer responses
+        self.validators = validators  # Upstream ETag / Last-Modified for revalidation
+        self.generation = generation
+        body = data if isinstance(data, bytes) else json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.expires_at = 0.0
+
+    def touch(self, ttl):
+        self.expires_at = time.monotonic() + ttl
+
+    @property
+    def fresh(self):
+        return time.monotonic() < self.expires_at
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU of YNAB metadata responses for one worker process.
+
+    Entries are keyed by a hash of the access token plus the endpoint, expire
+    after a per-endpoint TTL, and are revalidated with the upstream ETag when
+    YNAB sent one. Every entry remembers the sync generation it was filled
+    in; a finished sync in any worker moves the generation on, which retires
+    the entries in all the others too.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, generation):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry.generation != generation:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+response_cache = ResponseCache(settings.YNAB_PROXY_CACHE_MAX_ENTRIES)
+# Raw bodies of GET calls made from the API explorer with caching requested
+explorer_cache = ResponseCache(settings.YNAB_EXPLORER_CACHE_MAX_ENTRIES)
+
+
+# The generation is a number drawn each time the sync stamp changes; when the
+# stamp cannot be written, every lookup draws a new one and nothing is reused
+sync_stamp = ConfigCache(settings.SYNC_VERSION_PATH)
+_generations = itertools.count()
+
+
+def sync_generation():
+    """Changes whenever a sync completes in any worker; a ``stat`` call, not a query"""
+    return sync_stamp.get('generation', lambda: next(_generations))
+
+
+def cache_key(api_key, endpoint):
+    return hashlib.blake2b((api_key or '').encode('utf-8'), digest_size=16).hexdigest() + ':' + endpoint
+
+
+def _lookup(api_key, endpoint, generation):
+    key = cache_key(api_key, endpoint)
+    return key, response_cache.get(key, generation)
+
+
+def _store(key, entry, result, generation, ttl, endpoint):
+    if result is None and entry is not None:
+        logger.debug(f"YNAB {endpoint} not modified; extending cache entry")
+    else:
+        entry = CacheEntry(*result, generation)
+    entry.touch(ttl)
+    response_cache.put(key, entry)
+    return entry
+
+
+def cached_get(api_key, endpoint, kind, fetch):
+    """
+    Return the cache entry for ``endpoint``, calling ``fetch(validators)`` when it
+    is missing or stale. ``fetch`` returns ``(data, validators)``, or ``None``
+    when YNAB answered 304 Not Modified to the validators it was given.
+    """
+    ttl = settings.YNAB_PROXY_CACHE_TTL.get(kind, 0)
+    if ttl <= 0:
+        return CacheEntry(*fetch({}), None)
+
+    generation = sync_generation()
+    key, entry = _lookup(api_key, endpoint, generation)
+    if entry is not None and entry.fresh:
+        return entry
+    result = fetch(entry.validators if entry is not None else {})
+    return _store(key, entry, result, generation, ttl, endpoint)
+
+
+async def acached_get(api_key, endpoint, kind, fetch):
+    """Async ``cached_get``; ``fetch`` is a coroutine function"""
+    ttl = settings.YNAB_PROXY_CACHE_TTL.get(kind, 0)
+    if ttl <= 0:
+        return CacheEntry(*(await fetch({})), None)
+
+    generation = sync_generation()
+    key, entry = _lookup(api_key, endpoint, generation)
+    if entry is not None and entry.fresh:
+        return entry
+    result = await fetch(entry.validators if entry is not None else {})
+    return _store(key, entry, result, generation, ttl, endpoint)
+
+
+def invalidate():
+    """Drop this worker's cached responses and move every worker to a new sync generation"""
+    response_cache.clear()
+    explorer_cache.clear()
+    sync_stamp.bump()
@@ -0,0 +1,163 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from .models import AccountTypeMapping, ColumnConfiguration, CrossReference, YNABConfiguration
+import os
+import tempfile
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigCache:
+    """
+    Per-process cache of configuration rows that nearly every request reads.
+
+    Cross-worker invalidation uses a version stamp file next to the database:
+    saving or deleting a cached model replaces the file, and every lookup
+    compares the file's identity with the one the cache was filled under.
+    That check is a ``stat`` call, so the steady state does no queries.
+    Cached model instances are shared; callers must not modify them.
+
+    If the stamp cannot be written, other workers would never hear about
+    changes, so the process stops caching and every lookup loads afresh.
+    """
+
+    def __init__(self, stamp_path):
+        self.stamp_path = stamp_path
+        self.values = {}
+        self.stamp = None
+        self.enabled = True
+        self.lock = threading.Lock()
+
+    def _read_stamp(self):
+        try:
+            stat = os.stat(self.stamp_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _disable(self, error):
+        logger.error(f"Cannot write version stamp {self.stamp_path}: {error}; caching disabled in this process")
+        self.enabled = False
+        self.values.clear()
+
+    def _check_stamp(self):
+        if not self.enabled:
+            return
+        stamp = self._read_stamp()
+        if stamp == self.stamp and stamp is not None:
+            return
+        self.values.clear()
+        # About to fill the cache: make sure changes can still be announced
+        directory = os.path.dirname(self.stamp_path) or '.'
+        try:
+            if not os.access(directory, os.W_OK):
+                raise PermissionError(f"{directory} is not writable")
+            if stamp is None:
+                os.close(os.open(self.stamp_path, os.O_CREAT | os.O_WRONLY, 0o644))
+                stamp = self._read_stamp()
+        except OSError as e:
+            self._disable(e)
+            return
+        self.stamp = stamp
+
+    def _lookup(self, name):
+        with self.lock:
+            self._check_stamp()
+            if self.enabled and name in self.values:
+                return True, self.values[name]
+        return False, None
+
+    def get(self, name, loader):
+        found, value = self._lookup(name)
+        if found:
+            return value
+        value = loader()
+        with self.lock:
+            if self.enabled:
+                value = self.values.setdefault(name, value)
+        return value
+
+    async def aget(self, name, loader):
+        """``get`` for async views; only a cache miss leaves the event loop"""
+        found, value = self._lookup(name)
+        if found:
+            return value
+        return await sync_to_async(self.get)(name, loader)
+
+    def bump(self):
+        """Invalidate this process now and every other worker on its next lookup"""
+        with self.lock:
+            self.values.clear()
+            try:
+                directory = os.path.dirname(self.stamp_path) or '.'
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.config-version-')
+                os.close(fd)
+                # A fresh inode per bump, so two bumps in the same tick still differ
+                os.replace(tmp_path, self.stamp_path)
+            except OSError as e:
+                self._disable(e)
+            self.stamp = None
+
+
+config_cache = ConfigCache(settings.CONFIG_VERSION_PATH)
+
+
+def invalidate(**kwargs):
+    """Signal receiver: bump the version stamp once the change is committed"""
+    transaction.on_commit(config_cache.bump)
+
+
+def _load_configurations():
+    return tuple(YNABConfiguration.objects.order_by('pk'))
+
+
+def ynab_configurations():
+    """Every YNABConfiguration row, ordered by pk"""
+    return config_cache.get('ynab_configurations', _load_configurations)
+
+
+def primary_configuration():
+    """The primary configuration (pk=1), or None"""
+    return next((config for config in ynab_configurations() if config.pk == 1), None)
+
+
+def first_configuration():
+    """Equivalent of ``YNABConfiguration.objects.first()``"""
+    configs = ynab_configurations()
+    return configs[0] if configs else None
+
+
+def configuration_for_budget(budget_id):
+    """Lowest-pk configuration for a budget, or None"""
+    return next((config for config in ynab_configurations() if config.budget_id == budget_id), None)
+
+
+def configured_configurations():
+    """Cached equivalent of ``YNABConfiguration.configured()``"""
+    return [config for config in ynab_configurations() if config.enabled and config.api_key and config.budget_id]
+
+
+async def afirst_configuration():
+    configs = await config_cache.aget('ynab_configurations', _load_configurations)
+    return configs[0] if configs else None
+
+
+async def aprimary_configuration():
+    configs = await config_cache.aget('ynab_configurations', _load_configurations)
+    return next((config for config in configs if config.pk == 1), None)
+
+
+def account_type_mappings():
+    return config_cache.get('account_type_mappings', lambda: tuple(AccountTypeMapping.objects.all()))
+
+
+def cross_references(record_type):
+    refs = config_cache.get('cross_references', lambda: tuple(CrossReference.objects.all()))
+    return [ref for ref in refs if ref.record_type == record_type]
+
+
+def column_configurations():
+    return config_cache.get('column_configurations', lambda: tuple(ColumnConfiguration.objects.all()))
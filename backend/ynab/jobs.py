@@ -0,0 +1,194 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from . import cache, config_cache
+from .models import SyncJob, SyncRun
+from .ratelimit import RateLimitExceeded
+from .sync import BudgetSync
+import requests
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_KEY = 'ynab-sync'
+
+
+def lock_key_for(budget_id):
+    """Single-flight lock key for one budget; different budgets may sync at the same time"""
+    return f"{DEFAULT_LOCK_KEY}:{budget_id}" if budget_id else DEFAULT_LOCK_KEY
+
+
+def primary_budget_id():
+    """Budget ID of the primary configuration (pk=1), if set"""
+    config = config_cache.primary_configuration()
+    return config.budget_id if config else None
+
+
+def expire_stale_jobs(lock_key=DEFAULT_LOCK_KEY):
+    """Fail active jobs whose worker stopped sending heartbeats so the lock can be taken again"""
+    cutoff = timezone.now() - timedelta(seconds=settings.YNAB_SYNC_JOB_STALE_SECONDS)
+    stale = SyncJob.objects.filter(lock_key=lock_key, status__in=SyncJob.ACTIVE_STATUSES).exclude(
+        heartbeat_at__gte=cutoff
+    ).filter(created_at__lt=cutoff)
+    expired = stale.update(
+        status=SyncJob.STATUS_FAILED,
+        message="Sync job stopped responding and was abandoned.",
+        finished_at=timezone.now(),
+    )
+    if expired:
+        logger.warning(f"Abandoned {expired} stale sync job(s) for {lock_key}")
+
+
+def _claim_job(mode, budget_id):
+    """
+    Create a pending job for the budget, or return the job already holding its lock.
+
+    The single-flight guarantee comes from a partial unique constraint on
+    ``lock_key`` for pending/running jobs, so it holds across gunicorn workers.
+    Returns ``(job, created)``.
+    """
+    lock_key = lock_key_for(budget_id)
+    expire_stale_jobs(lock_key)
+
+    def create():
+        return SyncJob.objects.create(lock_key=lock_key, budget_id=budget_id, mode=mode, heartbeat_at=timezone.now())
+
+    try:
+        with transaction.atomic():
+            return create(), True
+    except IntegrityError:
+        job = SyncJob.objects.filter(lock_key=lock_key, status__in=SyncJob.ACTIVE_STATUSES).first()
+        if job is not None:
+            return job, False
+        # The running job finished between our insert and lookup; try once more
+        return create(), True
+
+
+def start_sync_job(mode=None, budget_id=None, background=True):
+    """
+    Create a sync job for one budget (the primary budget by default) and run
+    it, or attach to the job already running for that budget.
+    Returns ``(job, created)``.
+    """
+    job, created = _claim_job(mode, budget_id or primary_budget_id())
+    if not created:
+        return job, False
+
+    if background:
+        thread = threading.Thread(target=run_sync_job, args=(job.pk,), name=f"ynab-sync-{job.pk}", daemon=True)
+        thread.start()
+    else:
+        run_sync_job(job.pk)
+        job.refresh_from_db()
+    return job, True
+
+
+def start_budget_sync_jobs(budget_ids, mode=None, background=True):
+    """
+    Sync several budgets, running at most ``YNAB_SYNC_MAX_PARALLEL_BUDGETS``
+    at once. Budgets that already have a job running are attached to rather
+    than queued again. Returns a list of ``(job, created)`` tuples.
+    """
+    claimed = [_claim_job(mode, budget_id) for budget_id in budget_ids]
+    new_job_ids = [job.pk for job, created in claimed if created]
+
+    if new_job_ids:
+        if background:
+            thread = threading.Thread(target=_run_jobs, args=(new_job_ids,), name="ynab-sync-budgets", daemon=True)
+            thread.start()
+        else:
+            _run_jobs(new_job_ids)
+            for job, created in claimed:
+                job.refresh_from_db()
+    return claimed
+
+
+def _run_jobs(job_ids):
+    max_workers = max(1, min(settings.YNAB_SYNC_MAX_PARALLEL_BUDGETS, len(job_ids)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ynab-sync-budget') as executor:
+        list(executor.map(run_sync_job, job_ids))
+
+
+def run_sync_job(job_id):
+    """Execute a sync job to completion, recording progress and the final outcome"""
+    close_old_connections()
+    try:
+        job = SyncJob.objects.get(pk=job_id)
+        job.status = SyncJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.heartbeat_at = job.started_at
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+
+        syncer = None
+        started = time.perf_counter()
+        try:
+            config = config_cache.configuration_for_budget(job.budget_id)
+            if config is None:
+                raise ValueError(f"No YNAB configuration for budget {job.budget_id}")
+            syncer = BudgetSync(config.api_key, config.budget_id, mode=job.mode, progress=job.record_progress)
+            job.message = syncer.run()
+            job.status = SyncJob.STATUS_SUCCEEDED
+            cache.invalidate()
+        except requests.exceptions.HTTPError as e:
+            logger.error("YNAB API Error during sync", exc_info=True)
+            job.message = f"YNAB API Error: {e.response.reason}"
+            job.status = SyncJob.STATUS_FAILED
+        except RateLimitExceeded as e:
+            logger.warning(f"Sync job {job.id} stopped by the YNAB rate limit")
+            job.message = str(e)
+            job.status = SyncJob.STATUS_FAILED
+        except Exception as e:
+            logger.error("An unexpected error occurred during YNAB sync", exc_info=True)
+            job.message = f"An unexpected error occurred: {str(e)}"
+            job.status = SyncJob.STATUS_FAILED
+
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'message', 'finished_at'])
+        record_sync_run(job, syncer, (time.perf_counter() - started) * 1000)
+        logger.info(f"Sync job {job.id} for budget {job.budget_id} finished with status {job.status}")
+    finally:
+        close_old_connections()
+
+
+def record_sync_run(job, syncer, duration_ms):
+    """Persist the telemetry of a finished job; failures here never fail the sync"""
+    try:
+        metrics = syncer.metrics.as_fields() if syncer else {}
+        SyncRun.objects.create(
+            job=job,
+            budget_id=job.budget_id,
+            mode=syncer.mode if syncer else job.mode,
+            status=job.status,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            duration_ms=round(duration_ms, 1),
+            server_knowledge=syncer.server_knowledge if syncer else None,
+            error=job.message if job.status == SyncJob.STATUS_FAILED else None,
+            **metrics,
+        )
+    except Exception:
+        logger.error(f"Could not record telemetry for sync job {job.id}", exc_info=True)
+
+
+def wait_for_sync_job(job, timeout):
+    """Poll a job until it finishes or the timeout elapses, returning the refreshed job"""
+    deadline = time.monotonic() + timeout
+    while job.is_active and time.monotonic() < deadline:
+        time.sleep(0.5)
+        job.refresh_from_db()
+    return job
+
+
+def prune_finished_jobs(keep=None, lock_key=DEFAULT_LOCK_KEY):
+    """Delete finished jobs beyond the most recent ``keep`` so scheduled syncs don't grow the table forever"""
+    keep = settings.YNAB_SYNC_JOB_RETENTION if keep is None else keep
+    finished = SyncJob.objects.filter(lock_key=lock_key).exclude(status__in=SyncJob.ACTIVE_STATUSES)
+    cutoff = list(finished.order_by('-created_at').values_list('created_at', flat=True)[keep:keep + 1])
+    if not cutoff:
+        return 0
+    deleted, _ = finished.filter(created_at__lte=cutoff[0]).delete()
+    return deleted
@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand, CommandError
+from ynab import config_cache
+from ynab.archive import DeltaArchive, archived_syncs
+from ynab.sync import BudgetSync
+import datetime
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Re-apply archived YNAB sync responses to the local tables without contacting YNAB'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'budget_id',
+            nargs='?',
+            help='Budget whose archive to replay (default: the primary budget)',
+        )
+        parser.add_argument(
+            '--since',
+            type=datetime.date.fromisoformat,
+            help='Only replay syncs archived on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--from-full',
+            action='store_true',
+            help='Start at the newest full download instead of the oldest retained sync',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            help='Replay this archived sync directory; may be given more than once',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List the archived syncs and exit',
+        )
+
+    def handle(self, *args, **options):
+        budget_id = options['budget_id']
+        if not budget_id:
+            config = config_cache.primary_configuration()
+            budget_id = config.budget_id if config else None
+        if not budget_id:
+            raise CommandError("No budget_id given and no primary budget is configured.")
+
+        if options['path']:
+            archives = [DeltaArchive(os.path.abspath(path)) for path in options['path']]
+        else:
+            archives = archived_syncs(budget_id, since=options['since'])
+            if options['from_full']:
+                fulls = [index for index, archive in enumerate(archives) if archive.is_full]
+                if not fulls:
+                    raise CommandError(f"No full download is archived for budget {budget_id}.")
+                archives = archives[fulls[-1]:]
+
+        if not archives:
+            self.stdout.write(f"No archived syncs for budget {budget_id}.")
+            return
+
+        if options['list']:
+            for archive in archives:
+                self.stdout.write(f"{os.path.basename(archive.path)}  {archive.size():>10} bytes  {', '.join(archive.names())}")
+            return
+
+        started = time.perf_counter()
+        for archive in archives:
+            syncer = BudgetSync(None, budget_id)
+            replay_started = time.perf_counter()
+            try:
+                server_knowledge = syncer.replay(archive)
+            except Exception as e:
+                raise CommandError(f"Replaying {archive.path} failed: {e}") from e
+            fields = syncer.metrics.as_fields()
+            self.stdout.write(
+                f"{os.path.basename(archive.path)}: server knowledge {server_knowledge}, "
+                f"{(time.perf_counter() - replay_started) * 1000:.0f} ms "
+                f"(parse {fields['parse_ms']} ms, write {fields['write_ms']} ms, propagation {fields['propagation_ms']} ms)"
+            )
+            for entity, stats in fields['entities'].items():
+                self.stdout.write(f"  {entity}: {stats['rows']} rows, {stats['created']} created, {stats['updated']} updated, {stats['write_ms']} ms")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Replayed {len(archives)} archived syncs in {(time.perf_counter() - started) * 1000:.0f} ms")
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from ynab.scheduler import SyncScheduler
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Run periodic incremental YNAB syncs on an adaptive cadence'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single scheduler tick and exit',
+        )
+        parser.add_argument(
+            '--min-interval',
+            type=int,
+            help='Seconds between syncs while changes are flowing (default: YNAB_SYNC_INTERVAL_MIN)',
+        )
+        parser.add_argument(
+            '--max-interval',
+            type=int,
+            help='Longest interval to back off to when deltas are empty (default: YNAB_SYNC_INTERVAL_MAX)',
+        )
+
+    def handle(self, *args, **options):
+        scheduler = SyncScheduler(
+            min_interval=options['min_interval'],
+            max_interval=options['max_interval'],
+        )
+
+        if options['once']:
+            delay = scheduler.tick()
+            self.stdout.write(self.style.SUCCESS(f"Scheduler tick completed; next sync due in {delay:.0f}s"))
+            return
+
+        self.stdout.write(
+            f"Starting YNAB sync scheduler ({scheduler.min_interval}s-{scheduler.max_interval}s). Press Ctrl+C to stop."
+        )
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("\nScheduler stopped")
@@ -23,61 +23,22 @@ class Command(BaseCommand):
             account_content_type = ContentType.objects.get_for_model(Account)
             ynab_account_content_type = ContentType.objects.get_for_model(YNABAccount)
 
-            links = Link.objects.filter(
+            link_count = Link.objects.filter(
                 core_content_type=account_content_type,
                 plugin_content_type=ynab_account_content_type
-            )
-
-            self.stdout.write(f"Found {links.count()} linked accounts to sync...")
+            ).count()
 
-            synced_count = 0
-            failed_count = 0
+            self.stdout.write(f"Found {link_count} linked accounts to sync...")
 
-            for link in links:
-                try:
-                    core_account = link.core_object
-                    ynab_account = link.plugin_object
-
-                    if core_account and ynab_account:
-                        # Use the sync_from_ynab method to update the core account
-                        success = core_account.sync_from_ynab(ynab_account)
-                        if success:
-                            synced_count += 1
-                            self.stdout.write(
-                                self.style.SUCCESS(
-                                    f"✓ Synced core account '{core_account.name}' from YNAB account '{ynab_account.name}'"
-                                )
-                            )
-                        else:
-                            failed_count += 1
-                            self.stdout.write(
-                                self.style.WARNING(
-                                    f"⚠ Failed to sync core account '{core_account.name}'"
-                                )
-                            )
-                    else:
-                        failed_count += 1
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f"✗ Link {link.id}: Missing core account or YNAB account"
-                            )
-                        )
-                except Exception as e:
-                    failed_count += 1
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"✗ Error syncing account link {link.id}: {str(e)}"
-                        )
-                    )
-                    continue
+            synced_count = Account.bulk_sync_from_ynab(force=options['force'])
 
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"\nSync completed: {synced_count} successful, {failed_count} failed"
+                    f"\nSync completed: {synced_count} updated, {link_count - synced_count} unchanged"
                 )
             )
 
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f"Error in sync process: {str(e)}")
-            )
\ No newline at end of file
+            )
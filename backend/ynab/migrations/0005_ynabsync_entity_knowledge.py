@@ -0,0 +1,18 @@
+# Generated manually for Finance Assistant
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ynab', '0004_sync_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ynabsync',
+            name='entity_knowledge',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
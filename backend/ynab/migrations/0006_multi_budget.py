@@ -0,0 +1,59 @@
+# Generated manually for Finance Assistant
+
+from django.db import migrations, models
+
+
+SCOPED_MODELS = ['categorygroup', 'category', 'payee', 'ynabaccount', 'transaction', 'subtransaction']
+
+
+def assign_primary_budget(apps, schema_editor):
+    """Existing data and knowledge belong to the budget configured before multi-budget support"""
+    YNABConfiguration = apps.get_model('ynab', 'YNABConfiguration')
+    YNABSync = apps.get_model('ynab', 'YNABSync')
+    config = YNABConfiguration.objects.filter(pk=1).first()
+    budget_id = config.budget_id if config and config.budget_id else None
+    if not budget_id:
+        return
+
+    YNABSync.objects.filter(pk=1, budget_id__isnull=True).update(budget_id=budget_id)
+    for model_name in SCOPED_MODELS:
+        apps.get_model('ynab', model_name).objects.filter(budget_id__isnull=True).update(budget_id=budget_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ynab', '0005_ynabsync_entity_knowledge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ynabconfiguration',
+            name='name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='ynabconfiguration',
+            name='enabled',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='ynabsync',
+            name='budget_id',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='syncjob',
+            name='budget_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ] + [
+        migrations.AddField(
+            model_name=model_name,
+            name='budget_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        )
+        for model_name in SCOPED_MODELS
+    ] + [
+        migrations.RunPython(assign_primary_budget, migrations.RunPython.noop),
+    ]
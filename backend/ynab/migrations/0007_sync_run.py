@@ -0,0 +1,40 @@
+# Generated manually for Finance Assistant
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ynab', '0006_multi_budget'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('budget_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('mode', models.CharField(blank=True, max_length=20, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], max_length=20)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('duration_ms', models.FloatField(default=0)),
+                ('fetch_ms', models.FloatField(default=0)),
+                ('parse_ms', models.FloatField(default=0)),
+                ('write_ms', models.FloatField(default=0)),
+                ('propagation_ms', models.FloatField(default=0)),
+                ('bytes_received', models.BigIntegerField(default=0)),
+                ('server_knowledge', models.BigIntegerField(blank=True, null=True)),
+                ('entities', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('job', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='run', to='ynab.syncjob')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['budget_id', '-started_at'], name='ynab_syncrun_budget_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated manually for Finance Assistant
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ynab', '0007_sync_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YNABRateLimit',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.DateTimeField()),
+                ('blocked_until', models.DateTimeField(blank=True, null=True)),
+                ('server_used', models.IntegerField(blank=True, null=True)),
+                ('server_limit', models.IntegerField(blank=True, null=True)),
+            ],
+        ),
+    ]
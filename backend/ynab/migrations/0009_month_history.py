@@ -0,0 +1,55 @@
+# Generated manually for Finance Assistant
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ynab', '0008_rate_limit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetMonth',
+            fields=[
+                ('id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('month', models.DateField()),
+                ('note', models.TextField(blank=True, null=True)),
+                ('income', models.IntegerField(default=0)),
+                ('budgeted', models.IntegerField(default=0)),
+                ('activity', models.IntegerField(default=0)),
+                ('to_be_budgeted', models.IntegerField(default=0)),
+                ('age_of_money', models.IntegerField(blank=True, null=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('budget_id', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('content_hash', models.CharField(blank=True, editable=False, max_length=32, null=True)),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['budget_id', 'month'], name='ynab_month_budget_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CategoryMonth',
+            fields=[
+                ('id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('month', models.DateField()),
+                ('budgeted', models.IntegerField(default=0)),
+                ('activity', models.IntegerField(default=0)),
+                ('balance', models.IntegerField(default=0)),
+                ('goal_target', models.IntegerField(blank=True, null=True)),
+                ('goal_under_funded', models.IntegerField(blank=True, null=True)),
+                ('goal_percentage_complete', models.IntegerField(blank=True, null=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('budget_id', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('content_hash', models.CharField(blank=True, editable=False, max_length=32, null=True)),
+                ('category', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='months', to='ynab.category')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['month', 'category'], name='ynab_catmonth_month_cat_idx'), models.Index(fields=['category', 'month'], name='ynab_catmonth_cat_month_idx')],
+            },
+        ),
+    ]
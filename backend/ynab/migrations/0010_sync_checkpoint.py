@@ -0,0 +1,18 @@
+# Generated manually for Finance Assistant
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ynab', '0009_month_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ynabsync',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
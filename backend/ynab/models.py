@@ -1,4 +1,5 @@
 from django.db import models
+import uuid
 
 # Create your models here.
 
@@ -7,6 +8,8 @@ class CategoryGroup(models.Model):
     name = models.CharField(max_length=255)
     hidden = models.BooleanField()
     deleted = models.BooleanField()
+    budget_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)  # YNAB budget the row was synced from
+    content_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)  # Fingerprint of the synced YNAB payload
 
     def __str__(self):
         return self.name
@@ -35,6 +38,8 @@ class Category(models.Model):
     goal_overall_funded = models.IntegerField(null=True, blank=True)
     goal_overall_left = models.IntegerField(null=True, blank=True)
     deleted = models.BooleanField()
+    budget_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)  # YNAB budget the row was synced from
+    content_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)  # Fingerprint of the synced YNAB payload
 
     def __str__(self):
         return self.name
@@ -44,6 +49,8 @@ class Payee(models.Model):
     name = models.CharField(max_length=255)
     transfer_account_id = models.CharField(max_length=255, null=True, blank=True)
     deleted = models.BooleanField()
+    budget_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)  # YNAB budget the row was synced from
+    content_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)  # Fingerprint of the synced YNAB payload
 
     def __str__(self):
         return self.name
@@ -67,15 +74,79 @@ class YNABAccount(models.Model):
     debt_minimum_payments = models.JSONField(default=dict, blank=True)
     debt_escrow_amounts = models.JSONField(default=dict, blank=True)
     deleted = models.BooleanField()
+    budget_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)  # YNAB budget the row was synced from
+    content_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)  # Fingerprint of the synced YNAB payload
 
     def __str__(self):
         return self.name
 
+class BudgetMonth(models.Model):
+    """
+    Local copy of a YNAB month summary, kept current by the sync so budget
+    history is read from the database instead of fetched from YNAB.
+    The id is "<budget_id>:<month>" because YNAB months have no id of their own.
+    """
+    id = models.CharField(max_length=255, primary_key=True)
+    month = models.DateField()
+    note = models.TextField(null=True, blank=True)
+    income = models.IntegerField(default=0)
+    budgeted = models.IntegerField(default=0)
+    activity = models.IntegerField(default=0)
+    to_be_budgeted = models.IntegerField(default=0)
+    age_of_money = models.IntegerField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+    budget_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)  # YNAB budget the row was synced from
+    content_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)  # Fingerprint of the synced YNAB payload
+
+    class Meta:
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['budget_id', 'month'], name='ynab_month_budget_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}"
+
+
+class CategoryMonth(models.Model):
+    """
+    One category's budgeted, activity and balance figures for one month.
+    The id is "<budget_id>:<month>:<category_id>".
+    """
+    id = models.CharField(max_length=255, primary_key=True)
+    month = models.DateField()
+    # Month rows can arrive before their category in a delta, so no constraint
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING, db_constraint=False, related_name='months')
+    budgeted = models.IntegerField(default=0)
+    activity = models.IntegerField(default=0)
+    balance = models.IntegerField(default=0)
+    goal_target = models.IntegerField(null=True, blank=True)
+    goal_under_funded = models.IntegerField(null=True, blank=True)
+    goal_percentage_complete = models.IntegerField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+    budget_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)  # YNAB budget the row was synced from
+    content_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)  # Fingerprint of the synced YNAB payload
+
+    class Meta:
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month', 'category'], name='ynab_catmonth_month_cat_idx'),
+            models.Index(fields=['category', 'month'], name='ynab_catmonth_cat_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} - {self.category_id}"
+
+
 class YNABSync(models.Model):
     """
     Stores the server_knowledge value from YNAB to allow for incremental syncs.
+    There is one row per budget, so switching budgets keeps each one's knowledge.
     """
+    budget_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
     server_knowledge = models.IntegerField(default=0)
+    entity_knowledge = models.JSONField(default=dict, blank=True)  # Per-entity server_knowledge for the delta endpoints
+    checkpoint = models.JSONField(default=dict, blank=True)  # Archive and committed phases of an unfinished sync, so a retry can resume
     last_synced = models.DateTimeField(null=True, blank=True)
 
     def update_sync_timestamp(self):
@@ -84,6 +155,116 @@ class YNABSync(models.Model):
         self.last_synced = timezone.now()
         self.save(update_fields=['last_synced'])
 
+    @classmethod
+    def for_budget(cls, budget_id):
+        """Knowledge row for a budget, created on first use"""
+        obj, _ = cls.objects.get_or_create(budget_id=budget_id)
+        return obj
+
+
+class SyncJob(models.Model):
+    """
+    A YNAB sync executed in the background, with per-phase progress.
+    Only one job per lock_key may be pending or running at a time.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    lock_key = models.CharField(max_length=255, default='ynab-sync')
+    budget_id = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    mode = models.CharField(max_length=20, null=True, blank=True)
+    phase = models.CharField(max_length=50, null=True, blank=True)  # Phase currently being written
+    progress = models.JSONField(default=dict, blank=True)  # e.g. {'accounts': {'status': 'done', 'created': 3, 'updated': 0}}
+    message = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['lock_key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='ynab_syncjob_single_flight',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Sync job {self.id} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    def record_progress(self, phase, status, **counts):
+        """Store the state of one sync phase and refresh the heartbeat"""
+        from django.utils import timezone
+        self.phase = phase
+        self.progress[phase] = {'status': status, **counts}
+        self.heartbeat_at = timezone.now()
+        self.save(update_fields=['phase', 'progress', 'heartbeat_at'])
+
+
+class SyncRun(models.Model):
+    """
+    Telemetry for one executed sync: where the time went (YNAB API, JSON
+    parsing, database writes, account propagation) and how much was written.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    job = models.OneToOneField(SyncJob, on_delete=models.CASCADE, null=True, blank=True, related_name='run')
+    budget_id = models.CharField(max_length=255, null=True, blank=True)
+    mode = models.CharField(max_length=20, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=SyncJob.STATUS_CHOICES)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    duration_ms = models.FloatField(default=0)
+    fetch_ms = models.FloatField(default=0)  # Waiting on the YNAB API, including the body download
+    parse_ms = models.FloatField(default=0)  # JSON decoding
+    write_ms = models.FloatField(default=0)  # Database writes of synced rows
+    propagation_ms = models.FloatField(default=0)  # Pushing balances to linked core accounts
+    bytes_received = models.BigIntegerField(default=0)
+    server_knowledge = models.BigIntegerField(null=True, blank=True)
+    entities = models.JSONField(default=dict, blank=True)  # e.g. {'payees': {'write_ms': 4.2, 'rows': 120, 'created': 3, 'updated': 1}}
+    error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['budget_id', '-started_at'], name='ynab_syncrun_budget_idx'),
+        ]
+
+    def __str__(self):
+        return f"Sync run {self.id} ({self.status}, {self.duration_ms:.0f} ms)"
+
+
+class YNABRateLimit(models.Model):
+    """
+    Token bucket for one YNAB access token, shared by every worker process.
+    The key is a hash of the token so the token itself is never stored twice.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField()
+    blocked_until = models.DateTimeField(null=True, blank=True)  # Set from Retry-After on a 429
+    server_used = models.IntegerField(null=True, blank=True)  # From the last X-Rate-Limit header, e.g. "36/200"
+    server_limit = models.IntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"YNAB rate limit {self.key[:8]} ({self.tokens:.1f} tokens)"
+
 
 class Transaction(models.Model):
     id = models.CharField(max_length=255, primary_key=True)
@@ -100,6 +281,8 @@ class Transaction(models.Model):
     transfer_transaction_id = models.CharField(max_length=255, null=True, blank=True)
     import_id = models.CharField(max_length=255, null=True, blank=True)
     deleted = models.BooleanField()
+    budget_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)  # YNAB budget the row was synced from
+    content_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)  # Fingerprint of the synced YNAB payload
 
     def __str__(self):
         return f'{self.date} - {self.amount}'
@@ -114,6 +297,8 @@ class Subtransaction(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
     transfer_account_id = models.CharField(max_length=255, null=True, blank=True)
     deleted = models.BooleanField()
+    budget_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)  # YNAB budget the row was synced from
+    content_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)  # Fingerprint of the synced YNAB payload
 
     def __str__(self):
         return f'{self.id} - {self.amount}'
@@ -122,13 +307,22 @@ class Subtransaction(models.Model):
 class YNABConfiguration(models.Model):
     """
     Stores the YNAB API Key and Budget ID for the addon.
+    Row pk=1 is the primary budget used by the UI; further rows add more budgets.
     """
+    name = models.CharField(max_length=255, blank=True, default='')
     api_key = models.CharField(max_length=255, null=True, blank=True)
     budget_id = models.CharField(max_length=255, null=True, blank=True)
+    enabled = models.BooleanField(default=True)
 
     def __str__(self):
         return f"YNAB Configuration"
 
+    @classmethod
+    def configured(cls):
+        """Enabled configurations that have both an API key and a budget ID"""
+        return cls.objects.filter(enabled=True).exclude(api_key__isnull=True).exclude(api_key='').exclude(
+            budget_id__isnull=True).exclude(budget_id='').order_by('pk')
+
 class CrossReference(models.Model):
     RECORD_TYPE_CHOICES = [
         ('accounts', 'Accounts'),
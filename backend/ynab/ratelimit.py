@@ -0,0 +1,160 @@
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import YNABRateLimit
+from .upsert import write_transaction
+import asyncio
+import hashlib
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when no request quota frees up within the allowed wait"""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"YNAB rate limit reached; retry in {retry_after:.0f}s")
+
+
+def bucket_key(api_key):
+    """Stable, non-reversible key for an access token"""
+    return hashlib.blake2b((api_key or '').encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _capacity():
+    return float(settings.YNAB_RATE_LIMIT_PER_HOUR)
+
+
+def _refill(bucket, now):
+    """Top the bucket up for the time elapsed since it was last touched"""
+    elapsed = max((now - bucket.updated_at).total_seconds(), 0)
+    bucket.tokens = min(_capacity(), bucket.tokens + elapsed * _capacity() / 3600)
+    bucket.updated_at = now
+
+
+def _locked_bucket(key, now):
+    bucket, _ = YNABRateLimit.objects.select_for_update().get_or_create(
+        key=key, defaults={'tokens': _capacity(), 'updated_at': now}
+    )
+    _refill(bucket, now)
+    return bucket
+
+
+def try_acquire(api_key):
+    """Take one token if available; otherwise return the seconds until one is"""
+    now = timezone.now()
+    with write_transaction():
+        bucket = _locked_bucket(bucket_key(api_key), now)
+        if bucket.blocked_until and bucket.blocked_until > now:
+            wait = (bucket.blocked_until - now).total_seconds()
+        elif bucket.tokens >= 1:
+            bucket.tokens -= 1
+            wait = 0
+        else:
+            wait = (1 - bucket.tokens) * 3600 / _capacity()
+        bucket.save()
+    return wait
+
+
+def acquire(api_key, max_wait=None):
+    """
+    Block until the shared bucket for ``api_key`` has quota for one request.
+    Raises ``RateLimitExceeded`` if that would take longer than ``max_wait``.
+    """
+    max_wait = settings.YNAB_RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+    deadline = time.monotonic() + max_wait
+    while True:
+        wait = try_acquire(api_key)
+        if wait <= 0:
+            return
+        if time.monotonic() + wait > deadline:
+            raise RateLimitExceeded(wait)
+        logger.info(f"YNAB request quota exhausted; waiting {wait:.1f}s")
+        time.sleep(wait + random.uniform(0, 0.5))
+
+
+async def aacquire(api_key, max_wait=None):
+    """Async ``acquire``: waits on the event loop instead of blocking a thread"""
+    max_wait = settings.YNAB_RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+    deadline = time.monotonic() + max_wait
+    while True:
+        wait = await sync_to_async(try_acquire)(api_key)
+        if wait <= 0:
+            return
+        if time.monotonic() + wait > deadline:
+            raise RateLimitExceeded(wait)
+        logger.info(f"YNAB request quota exhausted; waiting {wait:.1f}s")
+        await asyncio.sleep(wait + random.uniform(0, 0.5))
+
+
+def observe_response(api_key, response):
+    """Reconcile the bucket with YNAB's X-Rate-Limit header ("used/limit") and Retry-After"""
+    header = response.headers.get('X-Rate-Limit')
+    retry_after = retry_after_seconds(response) if response.status_code == 429 else None
+    if not header and retry_after is None:
+        return
+
+    now = timezone.now()
+    with write_transaction():
+        bucket = _locked_bucket(bucket_key(api_key), now)
+        if header:
+            try:
+                used, limit = (int(part) for part in header.split('/', 1))
+                bucket.server_used, bucket.server_limit = used, limit
+                # Other clients of the same token count against the quota too
+                bucket.tokens = min(bucket.tokens, float(max(limit - used, 0)))
+            except ValueError:
+                logger.debug(f"Ignoring malformed X-Rate-Limit header: {header}")
+        if retry_after is not None:
+            # Everyone waits out the block; the bucket itself is left alone so
+            # requests resume as soon as it lifts
+            bucket.blocked_until = now + timedelta(seconds=retry_after)
+        bucket.save()
+
+
+def retry_after_seconds(response, default=60):
+    """Seconds to wait according to a Retry-After header (delta-seconds or HTTP date)"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return default
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max((parsedate_to_datetime(value) - timezone.now()).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """Exponential backoff with full jitter for retry ``attempt`` (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def quota(api_key):
+    """Current view of the shared bucket for ``api_key``"""
+    now = timezone.now()
+    bucket = YNABRateLimit.objects.filter(key=bucket_key(api_key)).first()
+    if bucket is None:
+        return {
+            'limit': int(_capacity()),
+            'remaining': int(_capacity()),
+            'blocked_until': None,
+            'server_used': None,
+            'server_limit': None,
+        }
+    _refill(bucket, now)
+    return {
+        'limit': int(_capacity()),
+        'remaining': int(bucket.tokens),
+        'blocked_until': bucket.blocked_until if bucket.blocked_until and bucket.blocked_until > now else None,
+        'server_used': bucket.server_used,
+        'server_limit': bucket.server_limit,
+    }
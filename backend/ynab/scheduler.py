@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from . import config_cache
+from .jobs import start_budget_sync_jobs, prune_finished_jobs, lock_key_for
+from .models import SyncJob, YNABSync
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_scheduler_thread = None
+_scheduler_lock = threading.Lock()
+
+
+class SyncScheduler:
+    """
+    Keeps the local YNAB tables warm by running delta syncs on an adaptive cadence.
+
+    Each tick syncs every configured budget that is due from its stored
+    ``YNABSync.server_knowledge``. YNAB only advances the knowledge value when
+    budget data changes, so an unchanged value means the delta was empty and
+    that budget's interval backs off towards ``max_interval``; any change
+    snaps it back to ``min_interval``.
+    """
+
+    def __init__(self, min_interval=None, max_interval=None, backoff_factor=None):
+        self.min_interval = min_interval or settings.YNAB_SYNC_INTERVAL_MIN
+        self.max_interval = max(max_interval or settings.YNAB_SYNC_INTERVAL_MAX, self.min_interval)
+        self.backoff_factor = backoff_factor or settings.YNAB_SYNC_BACKOFF_FACTOR
+        self.intervals = {}
+
+    def interval_for(self, budget_id):
+        return self.intervals.get(budget_id, self.min_interval)
+
+    def _back_off(self, budget_id):
+        self.intervals[budget_id] = min(self.interval_for(budget_id) * self.backoff_factor, self.max_interval)
+
+    def seconds_until_due(self, budget_id):
+        """Seconds until the budget's next sync is due, counting syncs started by anyone else"""
+        last_synced = YNABSync.objects.filter(budget_id=budget_id).values_list('last_synced', flat=True).first()
+        if last_synced is None:
+            return 0
+        elapsed = (timezone.now() - last_synced).total_seconds()
+        return max(self.interval_for(budget_id) - elapsed, 0)
+
+    def _knowledge(self, budget_ids):
+        return dict(YNABSync.objects.filter(budget_id__in=budget_ids).values_list('budget_id', 'server_knowledge'))
+
+    def tick(self):
+        """Run delta syncs for the budgets that are due and return the seconds to sleep before the next tick"""
+        close_old_connections()
+        try:
+            budget_ids = list(dict.fromkeys(config.budget_id for config in config_cache.configured_configurations()))
+            if not budget_ids:
+                logger.debug("YNAB not configured; scheduler idle")
+                return self.max_interval
+
+            # Manual syncs and schedulers in other workers also count as a tick
+            waits = {budget_id: self.seconds_until_due(budget_id) for budget_id in budget_ids}
+            due = [budget_id for budget_id, remaining in waits.items() if remaining <= 0]
+            if not due:
+                return min(waits.values())
+
+            knowledge_before = self._knowledge(due)
+            claimed = start_budget_sync_jobs(due, background=False)
+            knowledge_after = self._knowledge(due)
+
+            for job, created in claimed:
+                budget_id = job.budget_id
+                if not created:
+                    logger.debug(f"Sync job {job.id} already running for {budget_id}; scheduler skipping it")
+                    waits[budget_id] = self.min_interval
+                    continue
+
+                if job.status != SyncJob.STATUS_SUCCEEDED:
+                    logger.warning(f"Scheduled sync {job.id} for {budget_id} failed: {job.message}")
+                    self._back_off(budget_id)
+                elif knowledge_after.get(budget_id) != knowledge_before.get(budget_id):
+                    self.intervals[budget_id] = self.min_interval
+                else:
+                    self._back_off(budget_id)
+                waits[budget_id] = self.interval_for(budget_id)
+                logger.info(
+                    f"Scheduled sync for {budget_id} finished (server_knowledge "
+                    f"{knowledge_before.get(budget_id)} -> {knowledge_after.get(budget_id)}); "
+                    f"next in {waits[budget_id]:.0f}s"
+                )
+                prune_finished_jobs(lock_key=lock_key_for(budget_id))
+
+            return min(waits.values())
+        except Exception:
+            logger.error("YNAB sync scheduler tick failed", exc_info=True)
+            return self.min_interval
+        finally:
+            close_old_connections()
+
+    def run_forever(self, stop_event=None):
+        """Tick until ``stop_event`` is set"""
+        stop_event = stop_event or threading.Event()
+        logger.info(f"YNAB sync scheduler started (interval {self.min_interval}s-{self.max_interval}s)")
+        while not stop_event.is_set():
+            delay = self.tick()
+            stop_event.wait(delay)
+
+
+def start_scheduler_thread():
+    """Start the scheduler in a daemon thread once per process; returns the thread"""
+    global _scheduler_thread
+    with _scheduler_lock:
+        if _scheduler_thread is None or not _scheduler_thread.is_alive():
+            _scheduler_thread = threading.Thread(
+                target=SyncScheduler().run_forever, name="ynab-sync-scheduler", daemon=True
+            )
+            _scheduler_thread.start()
+    return _scheduler_thread
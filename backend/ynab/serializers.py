@@ -1,13 +1,14 @@
 from rest_framework import serializers
 from .models import (
-    CategoryGroup, Category, Payee, YNABAccount,
-    Transaction, Subtransaction, YNABConfiguration, ColumnConfiguration
+    CategoryGroup, Category, Payee, YNABAccount, BudgetMonth, CategoryMonth,
+    Transaction, Subtransaction, YNABConfiguration, ColumnConfiguration, SyncJob, SyncRun
 )
+from api.links import MODEL_TO_PATH, BatchedLinksMixin, resolve_plugin_links
 
 class YNABConfigurationSerializer(serializers.ModelSerializer):
     class Meta:
         model = YNABConfiguration
-        fields = ["id", "api_key", "budget_id"]
+        fields = ["id", "name", "api_key", "budget_id", "enabled"]
         read_only_fields = ["id"]
 
     def to_representation(self, instance):
@@ -27,6 +28,33 @@ class ColumnConfigurationSerializer(serializers.ModelSerializer):
         data['id'] = str(data['id'])
         return data
 
+class SyncJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SyncJob
+        fields = ["id", "budget_id", "status", "mode", "phase", "progress", "message", "created_at", "started_at", "finished_at", "heartbeat_at"]
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['id'] = str(data['id'])
+        return data
+
+class SyncRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SyncRun
+        fields = [
+            "id", "job", "budget_id", "mode", "status", "started_at", "finished_at", "duration_ms",
+            "fetch_ms", "parse_ms", "write_ms", "propagation_ms", "bytes_received", "server_knowledge",
+            "entities", "error",
+        ]
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['id'] = str(data['id'])
+        data['job'] = str(data['job']) if data['job'] else None
+        return data
+
 class SubtransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subtransaction
@@ -52,71 +80,34 @@ class TransactionSerializer(serializers.ModelSerializer):
         data['id'] = str(data['id'])
         return data
 
-class YNABAccountSerializer(serializers.ModelSerializer):
+class YNABAccountSerializer(BatchedLinksMixin, serializers.ModelSerializer):
     linked = serializers.SerializerMethodField()
     link_data = serializers.SerializerMethodField()
 
+    link_resolver = staticmethod(resolve_plugin_links)
+
     def get_linked(self, obj):
         """Check if this YNAB account is linked to any core record"""
-        from django.contrib.contenttypes.models import ContentType
-        from api.models import Link
-
-        content_type = ContentType.objects.get_for_model(YNABAccount)
-        link = Link.objects.filter(
-            plugin_content_type=content_type,
-            plugin_object_id=obj.id
-        ).first()
-
-        return link is not None
+        return self.resolved_link(obj) is not None
 
     def get_link_data(self, obj):
         """Get detailed link information including core record data"""
-        from django.contrib.contenttypes.models import ContentType
-        from api.models import Link
-
-        content_type = ContentType.objects.get_for_model(YNABAccount)
-        link = Link.objects.filter(
-            plugin_content_type=content_type,
-            plugin_object_id=obj.id
-        ).first()
-
-        if link:
-            # Check if core object still exists
-            try:
-                core_object = link.core_object
-                if core_object is None:
-                    # Core object was deleted but link wasn't cleaned up
-                    link.delete()
-                    return None
-            except Exception as e:
-                # Core object doesn't exist, clean up orphaned link
-                link.delete()
-                return None
-
-            # Map model names to frontend paths
-            model_to_path = {
-                'account': 'accounts',
-                'creditcard': 'credit-cards',
-                'asset': 'assets',
-                'liability': 'liabilities',
-                'category': 'categories',
-                'payee': 'payees',
-            }
-
-            core_model_name = link.core_content_type.model
-            frontend_path = model_to_path.get(core_model_name, core_model_name)
-
-            return {
-                'id': str(link.id),
-                'core_record': {
-                    'id': str(core_object.id),
-                    'name': core_object.name,
-                    'model': core_model_name,
-                    'path': frontend_path
-                }
+        resolved = self.resolved_link(obj)
+        if resolved is None:
+            return None
+
+        link, core_object = resolved
+        core_model_name = core_object.__class__.__name__.lower()
+
+        return {
+            'id': str(link.id),
+            'core_record': {
+                'id': str(core_object.id),
+                'name': core_object.name,
+                'model': core_model_name,
+                'path': MODEL_TO_PATH.get(core_model_name, core_model_name)
             }
-
-        return None
+        }
 
     class Meta:
         model = YNABAccount
@@ -159,6 +150,18 @@ class PayeeSerializer(serializers.ModelSerializer):
         data['id'] = str(data['id'])
         return data
 
+class BudgetMonthSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BudgetMonth
+        fields = ["month", "note", "income", "budgeted", "activity", "to_be_budgeted", "age_of_money", "deleted"]
+
+class CategoryMonthSerializer(serializers.ModelSerializer):
+    category_id = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = CategoryMonth
+        fields = ["month", "category_id", "budgeted", "activity", "balance", "goal_target", "goal_under_funded", "goal_percentage_complete", "deleted"]
+
 class YNABUserSerializer(serializers.Serializer):
     id = serializers.UUIDField()
 
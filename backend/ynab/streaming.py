@@ -0,0 +1,81 @@
+import ijson
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Entity arrays of the /budgets/{budget_id} payload that the sync writes, in the
+# order YNAB serializes them.
+STREAMED_ENTITIES = (
+    'accounts',
+    'payees',
+    'category_groups',
+    'categories',
+    'months',
+    'transactions',
+    'subtransactions',
+)
+
+
+class BudgetStream:
+    """
+    Incrementally parses a YNAB full-budget response and yields the entity
+    arrays in fixed-size batches, so the whole document never has to be held
+    in memory at once.
+
+    Iterating yields ``(entity, batch)`` tuples. ``server_knowledge`` is
+    populated once the parser reaches it, which is after the budget object.
+    """
+
+    BUDGET_PREFIX = 'data.budget'
+    SERVER_KNOWLEDGE_PREFIX = 'data.server_knowledge'
+
+    def __init__(self, fileobj, batch_size=500, entities=STREAMED_ENTITIES):
+        self.fileobj = fileobj
+        self.batch_size = batch_size
+        self.entities = set(entities)
+        self.server_knowledge = None
+        self.completed_entities = []
+
+    def _entity_for_array(self, prefix):
+        """Return the entity name when prefix is a top-level budget array we stream"""
+        if not prefix.startswith(f"{self.BUDGET_PREFIX}."):
+            return None
+        entity = prefix[len(self.BUDGET_PREFIX) + 1:]
+        return entity if entity in self.entities else None
+
+    def __iter__(self):
+        builder = None
+        item_prefix = None
+        entity = None
+        batch = []
+
+        for prefix, event, value in ijson.parse(self.fileobj, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == item_prefix and event == 'end_map':
+                    batch.append(builder.value)
+                    builder = None
+                    if len(batch) >= self.batch_size:
+                        yield entity, batch
+                        batch = []
+                continue
+
+            if event == 'start_array':
+                current = self._entity_for_array(prefix)
+                if current:
+                    entity = current
+                    item_prefix = f"{prefix}.item"
+            elif event == 'start_map' and prefix == item_prefix:
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif event == 'end_array' and entity and prefix == f"{self.BUDGET_PREFIX}.{entity}":
+                if batch:
+                    yield entity, batch
+                    batch = []
+                self.completed_entities.append(entity)
+                entity = None
+                item_prefix = None
+            elif prefix == self.SERVER_KNOWLEDGE_PREFIX and event == 'number':
+                self.server_knowledge = value
+
+        logger.debug(f"Budget stream finished: entities={self.completed_entities}, server_knowledge={self.server_knowledge}")
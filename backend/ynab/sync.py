@@ -0,0 +1,844 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, nullcontext
+from django.conf import settings
+from django.db import close_old_connections
+from .archive import ArchivingReader, DeltaArchive, BUDGET_DOCUMENT, MONTH_DETAIL_PREFIX, prune
+from .models import BudgetMonth, Category, CategoryGroup, CategoryMonth, Payee, YNABAccount, YNABSync, Subtransaction, Transaction
+from .streaming import BudgetStream
+from .upsert import supports_upsert, upsert_rows, merge_staged, fingerprint_item, write_transaction, FINGERPRINT_FIELD
+from .telemetry import SyncMetrics, MeteredReader
+from .ynab_client import YNABClient
+import json
+import os
+import shutil
+import tempfile
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Progress phases reported while a sync runs, in execution order.
+SYNC_PHASES = ('accounts', 'payees', 'categories', 'months', 'transactions', 'linked_accounts')
+
+# Which progress phase each streamed entity array, or the rows nested in one,
+# belongs to.
+ENTITY_PHASES = {
+    'accounts': 'accounts',
+    'payees': 'payees',
+    'category_groups': 'categories',
+    'categories': 'categories',
+    'months': 'months',
+    'category_months': 'months',
+    'transactions': 'transactions',
+    'subtransactions': 'transactions',
+}
+
+# Per-entity delta endpoints used by the 'entities' mode, mapped to the key
+# holding the rows in each response. Every endpoint accepts its own
+# last_knowledge_of_server.
+ENTITY_ENDPOINTS = {
+    'accounts': 'accounts',
+    'payees': 'payees',
+    'categories': 'category_groups',
+    'months': 'months',
+    'transactions': 'transactions',
+}
+
+# Entity name each model's write time and row counts are reported under.
+MODEL_ENTITIES = {
+    YNABAccount: 'accounts',
+    Payee: 'payees',
+    CategoryGroup: 'category_groups',
+    Category: 'categories',
+    BudgetMonth: 'months',
+    CategoryMonth: 'category_months',
+    Transaction: 'transactions',
+    Subtransaction: 'subtransactions',
+}
+
+# Budget documents up to this size are spooled in memory before they are
+# written; larger ones go to a temporary file.
+DOCUMENT_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+class BudgetSync:
+    """
+    Fetches a YNAB budget and writes it into the local ynab tables.
+
+    ``progress`` is called as ``progress(phase, status, **counts)`` whenever a
+    phase starts, advances or finishes, so callers such as the background job
+    runner can persist per-phase progress. Timings, payload size and row
+    counts are collected on ``metrics``.
+    """
+
+    def __init__(self, api_key, budget_id, mode=None, progress=None):
+        self.api_key = api_key
+        self.budget_id = budget_id
+        self.mode = mode or settings.YNAB_SYNC_MODE
+        self.progress = progress or (lambda phase, status, **counts: None)
+        self.metrics = SyncMetrics()
+        self.server_knowledge = None
+        self.client = YNABClient(api_key)
+        self.archive = None
+        self.sync_knowledge = None
+        self.checkpoint = {}
+        self.completed_phases = set()
+
+    def run(self):
+        """Run the sync against the stored server knowledge and return the summary message"""
+        sync_knowledge = YNABSync.for_budget(self.budget_id)
+        self.sync_knowledge = sync_knowledge
+        last_server_knowledge = sync_knowledge.server_knowledge
+
+        url = f"budgets/{self.budget_id}"
+        params = {}
+        if last_server_knowledge > 0:
+            if self.mode != 'entities' and self._needs_month_backfill():
+                # A delta only carries months changed since the last sync
+                logger.info(f"Month history for budget {self.budget_id} is empty; downloading the full budget once")
+            else:
+                params['last_knowledge_of_server'] = last_server_knowledge
+
+        if self.mode == 'entities':
+            results, server_knowledge = self._entity_sync(sync_knowledge, url)
+        else:
+            base = params.get('last_knowledge_of_server', 0)
+            if self._resume_document(base):
+                # A failed sync from the same base left its download behind
+                with self.archive.open(BUDGET_DOCUMENT) as archive_file:
+                    results, server_knowledge = self._write_stream(archive_file)
+            else:
+                self.archive = DeltaArchive.start(self.budget_id, base)
+                self._start_checkpoint('document', base)
+                if self.mode == 'stream':
+                    results, server_knowledge = self._stream_sync(url, params)
+                else:
+                    results, server_knowledge = self._full_sync(url, params)
+            # The budget document covers every entity, so they all catch up
+            sync_knowledge.entity_knowledge = {entity: server_knowledge for entity in ENTITY_ENDPOINTS}
+
+        # update_sync_timestamp() only writes last_synced, so persist the new
+        # knowledge explicitly or every sync would fall back to a full download
+        sync_knowledge.server_knowledge = server_knowledge
+        sync_knowledge.checkpoint = {}
+        sync_knowledge.save(update_fields=['server_knowledge', 'entity_knowledge', 'checkpoint'])
+        sync_knowledge.update_sync_timestamp()
+        self.server_knowledge = server_knowledge
+        if self.archive:
+            prune(self.budget_id)
+        if settings.YNAB_SYNC_SWEEP_LINKS:
+            # Rows this sync removed may have left links behind
+            from api.links import sweep_orphaned_links
+            sweep_orphaned_links()
+
+        accounts_synced, payees_synced, groups_synced, cats_synced, months_synced, trans_synced, subtrans_synced = results
+        return (
+            f"Sync successful! "
+            f"Accounts: {accounts_synced}, "
+            f"Payees: {payees_synced}, "
+            f"Category Groups: {groups_synced}, "
+            f"Categories: {cats_synced}, "
+            f"Months: {months_synced}, "
+            f"Transactions: {trans_synced}, "
+            f"Subtransactions: {subtrans_synced}."
+        )
+
+    def _full_sync(self, url, params):
+        """Download the whole budget document and sync it in one pass"""
+        with self.metrics.measure('fetch_ms'):
+            response = self.client.request('GET', url, params=params)
+            response.raise_for_status()
+            self.metrics.bytes_received += len(response.content)
+        if self._archive_body(BUDGET_DOCUMENT, response.content):
+            self._mark_downloaded()
+
+        with self.metrics.measure('parse_ms'):
+            data = response.json()['data']
+        budget_data = data['budget']
+        server_knowledge = data['server_knowledge']
+
+        logger.debug(
+            f"Budget payload: {len(budget_data.get('accounts', []))} accounts, "
+            f"{len(budget_data.get('payees', []))} payees, "
+            f"{len(budget_data.get('category_groups', []))} category groups, "
+            f"{len(budget_data.get('transactions', []))} transactions"
+        )
+
+        # Process Accounts
+        self.progress('accounts', 'running')
+        with write_transaction():
+            accounts_synced = self.sync_accounts(budget_data.get('accounts', []))
+            self._complete_phase('accounts')
+        self.progress('accounts', 'done', result=accounts_synced)
+
+        # Process Payees
+        self.progress('payees', 'running')
+        with write_transaction():
+            payees_synced = self.sync_payees(budget_data.get('payees', []))
+            self._complete_phase('payees')
+        self.progress('payees', 'done', result=payees_synced)
+
+        # Process Category Groups and Categories
+        self.progress('categories', 'running')
+        with write_transaction():
+            (groups_synced, cats_synced) = self.sync_categories(budget_data.get('category_groups', []), budget_data.get('categories', []))
+            self._complete_phase('categories')
+        self.progress('categories', 'done', result=f"{groups_synced}, {cats_synced}")
+
+        # Process Months and their per-category figures
+        self.progress('months', 'running')
+        with write_transaction():
+            months_synced = self.sync_months(budget_data.get('months', []))
+            self._complete_phase('months')
+        self.progress('months', 'done', result=months_synced)
+
+        # Process Transactions and Subtransactions
+        self.progress('transactions', 'running')
+        with write_transaction():
+            (trans_synced, subtrans_synced) = self.sync_transactions(budget_data.get('transactions', []))
+            self._complete_phase('transactions')
+        self.progress('transactions', 'done', result=f"{trans_synced}, {subtrans_synced}")
+
+        results = (accounts_synced, payees_synced, groups_synced, cats_synced, months_synced, trans_synced, subtrans_synced)
+        return results, server_knowledge
+
+    def _stream_sync(self, url, params):
+        """
+        Download the budget document into a spool file (and the archive), then
+        parse it incrementally and write each entity array in fixed-size
+        batches, keeping peak memory bounded. Nothing is written while the
+        response is still arriving, so the phase transactions never hold the
+        SQLite write lock across a network download.
+        """
+        with tempfile.SpooledTemporaryFile(max_size=DOCUMENT_SPOOL_BYTES) as document:
+            request_started = time.perf_counter()
+            with self.client.request('GET', url, params=params, stream=True) as response:
+                self.metrics.fetch_ms += (time.perf_counter() - request_started) * 1000
+                response.raise_for_status()
+                response.raw.decode_content = True
+
+                with self._archive_writer(BUDGET_DOCUMENT) as archive_file:
+                    reader = MeteredReader(response.raw, self.metrics)
+                    if archive_file is not None:
+                        reader = ArchivingReader(reader, archive_file)
+                    shutil.copyfileobj(reader, document, 64 * 1024)
+                # A retry from the same base can resume without downloading it again
+                if archive_file is not None and reader.archive_file is not None:
+                    self._mark_downloaded()
+
+            document.seek(0)
+            return self._write_stream(document)
+
+    def _write_stream(self, reader):
+        """Write a budget document read from a file-like object; returns ``(results, server_knowledge)``"""
+        totals = {entity: [0, 0] for entity in ENTITY_PHASES}
+        fk_ids = None
+
+        # Reads (network reads, when given a response) and writes are metered
+        # separately; the rest of the loop is attributed to parsing
+        loop_started = time.perf_counter()
+        fetch_before, write_before = self.metrics.fetch_ms, self.metrics.write_ms
+        stream = BudgetStream(reader, batch_size=settings.YNAB_SYNC_BATCH_SIZE)
+        phase = None
+        with ExitStack() as phase_transaction:
+            for entity, batch in stream:
+                if ENTITY_PHASES[entity] != phase:
+                    # Each phase commits as one transaction together with its checkpoint
+                    self._commit_phase(phase, phase_transaction)
+                    phase = ENTITY_PHASES[entity]
+                    if phase not in self.completed_phases:
+                        phase_transaction.enter_context(write_transaction())
+                if phase in self.completed_phases:
+                    continue
+
+                if entity == 'accounts':
+                    created, updated = self._write_accounts(batch)
+                elif entity == 'payees':
+                    created, updated = self._sync_model(Payee, batch)
+                elif entity == 'category_groups':
+                    for group_item in batch:
+                        group_item.pop('categories', None)
+                    created, updated = self._sync_model(CategoryGroup, batch)
+                elif entity == 'categories':
+                    created, updated = self._sync_model(Category, batch)
+                elif entity == 'months':
+                    created, updated, cm_created, cm_updated = self._write_months(batch)
+                    totals['category_months'][0] += cm_created
+                    totals['category_months'][1] += cm_updated
+                elif entity == 'transactions':
+                    # Accounts, payees and categories precede transactions in the payload
+                    if fk_ids is None:
+                        fk_ids = self._existing_fk_ids()
+                    valid_transactions, nested_subtransactions = self._prepare_transactions(batch, *fk_ids)
+                    created, updated = self._sync_model(Transaction, valid_transactions)
+                    if nested_subtransactions:
+                        st_created, st_updated = self._sync_model(Subtransaction, nested_subtransactions)
+                        totals['subtransactions'][0] += st_created
+                        totals['subtransactions'][1] += st_updated
+                elif entity == 'subtransactions':
+                    if fk_ids is None:
+                        fk_ids = self._existing_fk_ids()
+                    created, updated = self._sync_model(Subtransaction, self._prepare_subtransactions(batch, *fk_ids[1:]))
+
+                totals[entity][0] += created
+                totals[entity][1] += updated
+                logger.debug(f"Streamed {len(batch)} {entity}: {created} created, {updated} updated")
+                self._report_stream_phase(ENTITY_PHASES[entity], 'running', totals)
+            self._commit_phase(phase, phase_transaction)
+
+        loop_ms = (time.perf_counter() - loop_started) * 1000
+        self.metrics.parse_ms += max(
+            loop_ms - (self.metrics.fetch_ms - fetch_before) - (self.metrics.write_ms - write_before), 0
+        )
+
+        if stream.server_knowledge is None:
+            raise ValueError("YNAB budget response did not include server_knowledge")
+
+        # Mark every write phase finished, including ones with no rows in this delta
+        for phase in SYNC_PHASES[:-1]:
+            self._report_stream_phase(phase, 'done', totals)
+
+        # After syncing YNAB accounts, automatically sync linked core accounts
+        self._auto_sync_linked_accounts()
+
+        results = (
+            f"{totals['accounts'][0]} created, {totals['accounts'][1]} updated",
+            f"{totals['payees'][0]} created, {totals['payees'][1]} updated",
+            f"G: {totals['category_groups'][0]}c/{totals['category_groups'][1]}u",
+            f"C: {totals['categories'][0]}c/{totals['categories'][1]}u",
+            f"M: {totals['months'][0]}c/{totals['months'][1]}u, CM: {totals['category_months'][0]}c/{totals['category_months'][1]}u",
+            f"T: {totals['transactions'][0]}c/{totals['transactions'][1]}u",
+            f"ST: {totals['subtransactions'][0]}c/{totals['subtransactions'][1]}u",
+        )
+        logger.info(f"Streaming sync completed: {', '.join(results)}")
+        return results, int(stream.server_knowledge)
+
+    def _entity_sync(self, sync_knowledge, url):
+        """
+        Fetch the per-entity delta endpoints concurrently and write each one as
+        its response arrives. Transactions reference the other entities, so
+        they are written last. Each entity's server knowledge is stored as soon
+        as it is written, so a failure elsewhere does not refetch it.
+        """
+        knowledge = {
+            entity: sync_knowledge.entity_knowledge.get(entity, sync_knowledge.server_knowledge)
+            for entity in ENTITY_ENDPOINTS
+        }
+        if self._needs_month_backfill():
+            knowledge['months'] = 0
+        archived, resumed_archive = self._resume_entities(knowledge)
+        results = {}
+        fetched_transactions = None
+
+        with ThreadPoolExecutor(max_workers=settings.YNAB_SYNC_FETCH_WORKERS, thread_name_prefix='ynab-fetch') as executor:
+            futures = {
+                (
+                    executor.submit(self._load_archived_entity, resumed_archive, entity) if entity in archived
+                    else executor.submit(self._fetch_entity, url, entity, knowledge[entity])
+                ): entity
+                for entity in ENTITY_ENDPOINTS
+            }
+            for future in as_completed(futures):
+                entity = futures[future]
+                rows, entity_knowledge, timings = future.result()
+                # Requests overlap, so fetch time is the slowest one; parsing is summed
+                self.metrics.fetch_ms = max(self.metrics.fetch_ms, timings['fetch_ms'])
+                self.metrics.parse_ms += timings['parse_ms']
+                self.metrics.bytes_received += timings['bytes']
+                if entity == 'transactions':
+                    fetched_transactions = (rows, entity_knowledge)
+                    continue
+                results[entity] = self._write_entity(entity, rows, entity_knowledge)
+
+        rows, entity_knowledge = fetched_transactions
+        results['transactions'] = self._write_entity('transactions', rows, entity_knowledge)
+
+        self._auto_sync_linked_accounts()
+
+        accounts_synced = f"{results['accounts'][0]} created, {results['accounts'][1]} updated"
+        payees_synced = f"{results['payees'][0]} created, {results['payees'][1]} updated"
+        groups_synced, cats_synced = results['categories']
+        months_synced = results['months']
+        trans_synced, subtrans_synced = results['transactions']
+        logger.info(f"Entity sync completed with server knowledge {sync_knowledge.entity_knowledge}")
+
+        # The budget-wide knowledge is only as far along as the slowest entity
+        server_knowledge = min(sync_knowledge.entity_knowledge[entity] for entity in ENTITY_ENDPOINTS)
+        return (accounts_synced, payees_synced, groups_synced, cats_synced, months_synced, trans_synced, subtrans_synced), server_knowledge
+
+    def _fetch_entity(self, url, entity, last_knowledge):
+        """Download one entity's delta on a worker thread; only the rate limiter touches the database"""
+        params = {'last_knowledge_of_server': last_knowledge} if last_knowledge > 0 else {}
+        started = time.perf_counter()
+        try:
+            response = self.client.request('GET', f"{url}/{entity}", params=params)
+        finally:
+            close_old_connections()
+        response.raise_for_status()
+        self._archive_body(entity, response.content)
+        fetched = time.perf_counter()
+        data = response.json()['data']
+        timings = {
+            'fetch_ms': (fetched - started) * 1000,
+            'parse_ms': (time.perf_counter() - fetched) * 1000,
+            'bytes': len(response.content),
+        }
+        rows = data[ENTITY_ENDPOINTS[entity]]
+        if entity == 'months':
+            rows = self._fetch_month_details(url, rows, timings)
+        return rows, data['server_knowledge'], timings
+
+    def _fetch_month_details(self, url, months, timings):
+        """
+        The months delta only has summaries; swap the most recent changed months
+        for their detail, which carries the per-category figures.
+        """
+        limit = settings.YNAB_SYNC_MONTH_DETAIL_LIMIT
+        changed = sorted((item['month'] for item in months if not item.get('deleted')), reverse=True)
+        if len(changed) > limit:
+            logger.info(f"{len(changed)} months changed; fetching category figures for the latest {limit}")
+        details = {}
+        started = time.perf_counter()
+        try:
+            for month in changed[:limit]:
+                response = self.client.request('GET', f"{url}/months/{month}")
+                response.raise_for_status()
+                self._archive_body(f"{MONTH_DETAIL_PREFIX}{month}", response.content)
+                timings['bytes'] += len(response.content)
+                details[month] = response.json()['data']['month']
+        finally:
+            close_old_connections()
+        timings['fetch_ms'] += (time.perf_counter() - started) * 1000
+        return [details.get(item['month'], item) for item in months]
+
+    def _archive_writer(self, name):
+        if self.archive is None:
+            return nullcontext()
+        try:
+            return self.archive.writer(name)
+        except OSError as e:
+            logger.warning(f"Could not archive YNAB {name} response in {self.archive.path}: {e}")
+            return nullcontext()
+
+    def _archive_body(self, name, body):
+        return self.archive is not None and self.archive.write(name, body)
+
+    def _load_archived_entity(self, archive, entity):
+        """``_fetch_entity`` from an archived sync; month details come from the archive too"""
+        started = time.perf_counter()
+        with archive.open(entity) as archive_file:
+            data = json.load(archive_file)['data']
+        rows = data[ENTITY_ENDPOINTS[entity]]
+        if entity == 'months':
+            details = {}
+            for name in archive.names():
+                if name.startswith(MONTH_DETAIL_PREFIX):
+                    with archive.open(name) as archive_file:
+                        details[name[len(MONTH_DETAIL_PREFIX):]] = json.load(archive_file)['data']['month']
+            rows = [details.get(item['month'], item) for item in rows]
+        timings = {'fetch_ms': 0.0, 'parse_ms': (time.perf_counter() - started) * 1000, 'bytes': 0}
+        return rows, data['server_knowledge'], timings
+
+    def _start_checkpoint(self, kind, base, completed=(), downloaded=False):
+        """Record the sync in progress: its base knowledge, archive and finished phases"""
+        self.completed_phases = set(completed)
+        self.checkpoint = {
+            'kind': kind,
+            'base': base,
+            'archive': self.archive.path if self.archive else None,
+            'completed': list(completed),
+            'downloaded': downloaded,
+        }
+        self._save_checkpoint()
+
+    def _save_checkpoint(self):
+        if self.sync_knowledge is None:
+            # Replays don't touch the stored sync state
+            return
+        self.sync_knowledge.checkpoint = self.checkpoint
+        self.sync_knowledge.save(update_fields=['checkpoint'])
+
+    def _mark_downloaded(self):
+        self.checkpoint['downloaded'] = True
+        self._save_checkpoint()
+
+    def _complete_phase(self, phase):
+        """Checkpoint a finished phase; called inside the phase's transaction"""
+        self.completed_phases.add(phase)
+        self.checkpoint.setdefault('completed', []).append(phase)
+        self._save_checkpoint()
+
+    def _commit_phase(self, phase, phase_transaction):
+        if phase is not None and phase not in self.completed_phases:
+            self._complete_phase(phase)
+            phase_transaction.close()
+
+    def _previous_checkpoint(self, kind):
+        """The checkpoint a failed sync of this kind left behind, with its archive, or None"""
+        checkpoint = self.sync_knowledge.checkpoint or {}
+        path = checkpoint.get('archive')
+        if checkpoint.get('kind') != kind or not path or not os.path.isdir(path):
+            return None
+        return checkpoint
+
+    def _resume_document(self, base):
+        """
+        Resume a failed budget-document sync from the same base: its archived
+        download is written again, skipping the phases that had committed.
+        """
+        checkpoint = self._previous_checkpoint('document')
+        if checkpoint is None or checkpoint.get('base') != base or not checkpoint.get('downloaded'):
+            return False
+        self.archive = DeltaArchive(checkpoint['archive'])
+        self._start_checkpoint('document', base, completed=checkpoint.get('completed', []), downloaded=True)
+        logger.info(f"Resuming sync of budget {self.budget_id} from {self.archive.path}; already written: {sorted(self.completed_phases)}")
+        return True
+
+    def _resume_entities(self, knowledge):
+        """
+        Entities whose archived delta from a failed sync can be written instead
+        of fetched again: archived from the same knowledge and not yet written.
+        Returns them with the failed sync's archive to read them from. This
+        sync archives into a directory of its own, with copies of the reused
+        responses so it can be replayed on its own.
+        """
+        checkpoint = self._previous_checkpoint('entities')
+        archived = set()
+        previous = None
+        if checkpoint is not None:
+            previous = DeltaArchive(checkpoint['archive'])
+            names = previous.names()
+            archived = {
+                entity for entity in ENTITY_ENDPOINTS
+                if entity in names and entity not in checkpoint.get('completed', [])
+                and checkpoint.get('base', {}).get(entity) == knowledge[entity]
+            }
+        self.archive = DeltaArchive.start(self.budget_id, self.sync_knowledge.server_knowledge)
+        if archived:
+            logger.info(f"Resuming sync of budget {self.budget_id} from {previous.path}; reusing {sorted(archived)}")
+            if self.archive is not None:
+                for name in previous.names():
+                    entity = 'months' if name.startswith(MONTH_DETAIL_PREFIX) else name
+                    if entity in archived:
+                        self.archive.copy(previous, name)
+        self._start_checkpoint('entities', knowledge)
+        return archived, previous
+
+    def replay(self, archive):
+        """
+        Re-apply one archived sync through the normal writers without contacting
+        YNAB. Stored server knowledge is left alone; returns the knowledge the
+        archived responses carried.
+        """
+        names = archive.names()
+        if BUDGET_DOCUMENT in names:
+            with archive.open(BUDGET_DOCUMENT) as archive_file:
+                _, server_knowledge = self._write_stream(archive_file)
+            return server_knowledge
+
+        knowledge = []
+        for entity in ENTITY_ENDPOINTS:
+            if entity not in names:
+                continue
+            rows, server_knowledge, timings = self._load_archived_entity(archive, entity)
+            self.metrics.parse_ms += timings['parse_ms']
+            self._write_entity(entity, rows)
+            knowledge.append(server_knowledge)
+        self._auto_sync_linked_accounts()
+        return min(knowledge) if knowledge else None
+
+    def _write_entity(self, entity, rows, server_knowledge=None):
+        """
+        Write one entity's delta rows in a single transaction, which also
+        stores the entity's new server knowledge and checkpoint.
+        """
+        self.progress(entity, 'running')
+        with write_transaction():
+            if entity == 'accounts':
+                result = self._write_accounts(rows)
+                counts = {'created': result[0], 'updated': result[1]}
+            elif entity == 'payees':
+                result = self._sync_model(Payee, rows)
+                counts = {'created': result[0], 'updated': result[1]}
+            elif entity == 'categories':
+                categories = []
+                for group_item in rows:
+                    for cat_item in group_item.pop('categories', None) or []:
+                        cat_item.setdefault('category_group_id', group_item.get('id'))
+                        cat_item.setdefault('category_group_name', group_item.get('name'))
+                        categories.append(cat_item)
+                g_created, g_updated = self._sync_model(CategoryGroup, rows)
+                c_created, c_updated = self._sync_model(Category, categories)
+                result = (f"G: {g_created}c/{g_updated}u", f"C: {c_created}c/{c_updated}u")
+                counts = {'created': g_created + c_created, 'updated': g_updated + c_updated}
+            elif entity == 'months':
+                m_created, m_updated, cm_created, cm_updated = self._write_months(rows)
+                result = f"M: {m_created}c/{m_updated}u, CM: {cm_created}c/{cm_updated}u"
+                counts = {'created': m_created + cm_created, 'updated': m_updated + cm_updated}
+            else:
+                t_created, t_updated, st_created, st_updated = self._write_transactions(rows)
+                result = (f"T: {t_created}c/{t_updated}u", f"ST: {st_created}c/{st_updated}u")
+                counts = {'created': t_created + st_created, 'updated': t_updated + st_updated}
+            if server_knowledge is not None:
+                self._save_entity_knowledge(self.sync_knowledge, entity, server_knowledge)
+            self._complete_phase(entity)
+        self.progress(entity, 'done', **counts)
+        return result
+
+    def _save_entity_knowledge(self, sync_knowledge, entity, server_knowledge):
+        sync_knowledge.entity_knowledge[entity] = server_knowledge
+        sync_knowledge.save(update_fields=['entity_knowledge'])
+
+    def _report_stream_phase(self, phase, status, totals):
+        entities = [entity for entity, entity_phase in ENTITY_PHASES.items() if entity_phase == phase]
+        self.progress(
+            phase,
+            status,
+            created=sum(totals[entity][0] for entity in entities),
+            updated=sum(totals[entity][1] for entity in entities),
+        )
+
+    def _sync_model(self, model_class, data, id_field='id'):
+        # Scope every row to the budget it was synced from
+        for item_data in data:
+            item_data['budget_id'] = self.budget_id
+        with self.metrics.measure_write(MODEL_ENTITIES.get(model_class, model_class._meta.model_name), len(data)) as counts:
+            with write_transaction():
+                if settings.YNAB_SYNC_WRITER == 'upsert' and supports_upsert():
+                    created, updated = upsert_rows(model_class, data, id_field=id_field, chunk_size=settings.YNAB_SYNC_BATCH_SIZE)
+                else:
+                    created, updated = self._orm_sync_model(model_class, data, id_field=id_field)
+            counts.update(created=created, updated=updated)
+        return created, updated
+
+    def _orm_sync_model(self, model_class, data, id_field='id'):
+        existing_hashes = dict(model_class.objects.values_list(id_field, FINGERPRINT_FIELD))
+        to_create = []
+        to_update = []
+
+        # Get the set of valid field names, including the raw `_id` fields for foreign keys
+        model_fields = set()
+        for f in model_class._meta.get_fields():
+            model_fields.add(f.name)
+            if hasattr(f, 'attname'):
+                model_fields.add(f.attname)
+        model_fields.discard(FINGERPRINT_FIELD)
+
+        for item_data in data:
+            # Filter the dictionary to only include keys that are actual model fields
+            filtered_data = {k: v for k, v in item_data.items() if k in model_fields}
+
+            item_id = filtered_data.get(id_field)
+            if not item_id:
+                continue
+
+            content_hash = fingerprint_item(model_class, filtered_data)
+            if item_id in existing_hashes and existing_hashes[item_id] == content_hash:
+                # Nothing changed upstream since the last sync
+                continue
+
+            instance = model_class(**filtered_data)
+            instance.content_hash = content_hash
+
+            if item_id in existing_hashes:
+                to_update.append(instance)
+            else:
+                to_create.append(instance)
+
+        # Bulk operations
+        if to_create:
+            model_class.objects.bulk_create(to_create)
+
+        if to_update:
+            # Get only the concrete fields of the model to update them, excluding the primary key
+            fields_to_update = [f.name for f in model_class._meta.get_fields() if f.concrete and not f.primary_key]
+            model_class.objects.bulk_update(to_update, fields_to_update)
+
+        return len(to_create), len(to_update)
+
+    def _write_accounts(self, accounts_data):
+        """Create missing transfer payees, then sync the YNAB accounts themselves"""
+        transfer_payee_ids = {item.get('transfer_payee_id') for item in accounts_data if item.get('transfer_payee_id')}
+        existing_payee_ids = set(Payee.objects.filter(id__in=transfer_payee_ids).values_list('id', flat=True))
+        for item in accounts_data:
+            transfer_payee_id = item.get('transfer_payee_id')
+            if transfer_payee_id and transfer_payee_id not in existing_payee_ids:
+                Payee.objects.create(
+                    id=transfer_payee_id,
+                    name=f"Transfer : {item.get('name')}",
+                    deleted=False,
+                    budget_id=self.budget_id
+                )
+                existing_payee_ids.add(transfer_payee_id)
+
+        return self._sync_model(YNABAccount, accounts_data)
+
+    def sync_accounts(self, accounts_data):
+        created, updated = self._write_accounts(accounts_data)
+
+        # After syncing YNAB accounts, automatically sync linked core accounts
+        self._auto_sync_linked_accounts()
+
+        return f"{created} created, {updated} updated"
+
+    def _auto_sync_linked_accounts(self):
+        """Propagate the synced YNAB account values to every linked core account in one bulk step"""
+        from accounts.models import Account
+
+        self.progress('linked_accounts', 'running')
+        try:
+            with self.metrics.measure('propagation_ms'):
+                synced_count = Account.bulk_sync_from_ynab()
+            logger.info(f"Auto-sync completed: {synced_count} core accounts updated")
+            self.progress('linked_accounts', 'done', updated=synced_count)
+
+        except Exception as e:
+            logger.error(f"Error in auto-sync process: {str(e)}")
+
+    def sync_payees(self, payees_data):
+        created, updated = self._sync_model(Payee, payees_data)
+        return f"{created} created, {updated} updated"
+
+    def sync_categories(self, category_groups_data, categories_data):
+        # Sync category groups first
+        groups_to_sync = []
+        for group_item in category_groups_data:
+            # Remove categories from group data since we'll handle them separately
+            group_item.pop('categories', [])
+            groups_to_sync.append(group_item)
+
+        g_created, g_updated = self._sync_model(CategoryGroup, groups_to_sync)
+        c_created, c_updated = self._sync_model(Category, list(categories_data))
+
+        logger.info(f"Category sync results: Groups - {g_created} created, {g_updated} updated; Categories - {c_created} created, {c_updated} updated")
+        return (f"G: {g_created}c/{g_updated}u", f"C: {c_created}c/{c_updated}u")
+
+    def _needs_month_backfill(self):
+        """Whether this budget's month history has never been synced, e.g. after upgrading"""
+        return not BudgetMonth.objects.filter(budget_id=self.budget_id).exists()
+
+    def _write_months(self, months_data):
+        """Sync month summaries and the category figures nested in each month"""
+        month_rows = []
+        category_rows = []
+        for month_item in months_data:
+            month = month_item['month']
+            for cat_item in month_item.pop('categories', None) or []:
+                category_rows.append({
+                    **cat_item,
+                    'id': f"{self.budget_id}:{month}:{cat_item['id']}",
+                    'month': month,
+                    'category_id': cat_item['id'],
+                })
+            month_rows.append({**month_item, 'id': f"{self.budget_id}:{month}"})
+
+        m_created, m_updated = self._sync_model(BudgetMonth, month_rows)
+        cm_created, cm_updated = self._sync_model(CategoryMonth, category_rows)
+        return m_created, m_updated, cm_created, cm_updated
+
+    def sync_months(self, months_data):
+        m_created, m_updated, cm_created, cm_updated = self._write_months(months_data)
+        return f"M: {m_created}c/{m_updated}u, CM: {cm_created}c/{cm_updated}u"
+
+    def _existing_fk_ids(self):
+        """Pre-fetch the account, payee and category ids used to validate transaction foreign keys"""
+        return (
+            set(YNABAccount.objects.values_list('id', flat=True)),
+            set(Payee.objects.values_list('id', flat=True)),
+            set(Category.objects.values_list('id', flat=True)),
+        )
+
+    def _prepare_transactions(self, transactions_data, existing_account_ids, existing_payee_ids, existing_category_ids):
+        """Drop transactions for unknown accounts and null out dangling payee/category references"""
+        valid_transactions = []
+        all_subtransactions = []
+
+        for trans_item in transactions_data:
+            account_id = trans_item.get('account_id')
+            if not account_id or account_id not in existing_account_ids:
+                continue
+
+            payee_id = trans_item.get('payee_id')
+            if payee_id and payee_id not in existing_payee_ids:
+                trans_item['payee_id'] = None
+
+            category_id = trans_item.get('category_id')
+            if category_id and category_id not in existing_category_ids:
+                trans_item['category_id'] = None
+
+            subtransactions = trans_item.pop('subtransactions', [])
+            valid_transactions.append(trans_item)
+
+            for sub_item in subtransactions:
+                sub_item['transaction_id'] = trans_item.get('id')
+                all_subtransactions.append(sub_item)
+
+        all_subtransactions = self._nullify_missing_fks(all_subtransactions, existing_payee_ids, existing_category_ids)
+        return valid_transactions, all_subtransactions
+
+    def _nullify_missing_fks(self, subtransactions_data, existing_payee_ids, existing_category_ids):
+        for sub_item in subtransactions_data:
+            # Nullify missing FKs for subtransactions too
+            sub_payee_id = sub_item.get('payee_id')
+            if sub_payee_id and sub_payee_id not in existing_payee_ids:
+                sub_item['payee_id'] = None
+
+            sub_category_id = sub_item.get('category_id')
+            if sub_category_id and sub_category_id not in existing_category_ids:
+                sub_item['category_id'] = None
+        return subtransactions_data
+
+    def _prepare_subtransactions(self, subtransactions_data, existing_payee_ids, existing_category_ids):
+        """Validate top-level subtransactions (full-budget payload) against their parent transactions"""
+        transaction_ids = {item.get('transaction_id') for item in subtransactions_data if item.get('transaction_id')}
+        existing_transaction_ids = set(
+            Transaction.objects.filter(id__in=transaction_ids).values_list('id', flat=True)
+        )
+        valid_subtransactions = [
+            item for item in subtransactions_data
+            if item.get('transaction_id') in existing_transaction_ids
+        ]
+        return self._nullify_missing_fks(valid_subtransactions, existing_payee_ids, existing_category_ids)
+
+    def _use_staging(self, row_count):
+        threshold = settings.YNAB_SYNC_STAGING_THRESHOLD
+        return bool(threshold) and row_count >= threshold and settings.YNAB_SYNC_WRITER == 'upsert' and supports_upsert()
+
+    def _write_transactions(self, transactions_data):
+        """
+        Sync transactions with their nested subtransactions. Large deltas are
+        validated and merged in SQL through a staging table instead of in Python.
+        """
+        if not self._use_staging(len(transactions_data)):
+            # Pre-fetch for validation
+            valid_transactions, all_subtransactions = self._prepare_transactions(transactions_data, *self._existing_fk_ids())
+            t_created, t_updated = self._sync_model(Transaction, valid_transactions)
+            st_created, st_updated = self._sync_model(Subtransaction, all_subtransactions)
+            return t_created, t_updated, st_created, st_updated
+
+        subtransactions = []
+        for trans_item in transactions_data:
+            trans_item['budget_id'] = self.budget_id
+            for sub_item in trans_item.pop('subtransactions', None) or []:
+                sub_item['transaction_id'] = trans_item.get('id')
+                sub_item['budget_id'] = self.budget_id
+                subtransactions.append(sub_item)
+
+        chunk_size = settings.YNAB_SYNC_BATCH_SIZE
+        with write_transaction():
+            with self.metrics.measure_write('transactions', len(transactions_data)) as counts:
+                t_created, t_updated = merge_staged(
+                    Transaction, transactions_data, required=('account',), nullable=('payee', 'category'), chunk_size=chunk_size
+                )
+                counts.update(created=t_created, updated=t_updated)
+            with self.metrics.measure_write('subtransactions', len(subtransactions)) as counts:
+                st_created, st_updated = merge_staged(
+                    Subtransaction, subtransactions, required=('transaction',), nullable=('payee', 'category'), chunk_size=chunk_size
+                )
+                counts.update(created=st_created, updated=st_updated)
+        logger.info(f"Merged {len(transactions_data)} transactions through the staging table")
+        return t_created, t_updated, st_created, st_updated
+
+    def sync_transactions(self, transactions_data):
+        t_created, t_updated, st_created, st_updated = self._write_transactions(transactions_data)
+        return (f"T: {t_created}c/{t_updated}u", f"ST: {st_created}c/{st_updated}u")
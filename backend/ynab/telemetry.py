@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+import math
+import time
+
+# Timing columns stored on SyncRun, in milliseconds.
+TIMING_FIELDS = ('duration_ms', 'fetch_ms', 'parse_ms', 'write_ms', 'propagation_ms')
+
+
+class SyncMetrics:
+    """
+    Collects the timings, payload size and row counts of one sync.
+
+    Times are wall-clock milliseconds. ``entities`` holds per-entity write
+    time and row counts, e.g. ``{'payees': {'write_ms': 4.2, 'rows': 120,
+    'created': 3, 'updated': 1}}``.
+    """
+
+    def __init__(self):
+        self.fetch_ms = 0.0
+        self.parse_ms = 0.0
+        self.write_ms = 0.0
+        self.propagation_ms = 0.0
+        self.bytes_received = 0
+        self.entities = {}
+
+    @contextmanager
+    def measure(self, attr):
+        """Add the time spent in the block to one of the timing attributes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self, attr, getattr(self, attr) + (time.perf_counter() - start) * 1000)
+
+    @contextmanager
+    def measure_write(self, entity, rows):
+        """Time a write block and attribute it to an entity; the block sets ``counts`` on the yielded dict"""
+        counts = {}
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.write_ms += elapsed
+            stats = self.entities.setdefault(entity, {'write_ms': 0.0, 'rows': 0, 'created': 0, 'updated': 0})
+            stats['write_ms'] += elapsed
+            stats['rows'] += rows
+            stats['created'] += counts.get('created', 0)
+            stats['updated'] += counts.get('updated', 0)
+
+    def as_fields(self):
+        """SyncRun field values for these metrics"""
+        return {
+            'fetch_ms': round(self.fetch_ms, 1),
+            'parse_ms': round(self.parse_ms, 1),
+            'write_ms': round(self.write_ms, 1),
+            'propagation_ms': round(self.propagation_ms, 1),
+            'bytes_received': self.bytes_received,
+            'entities': {
+                entity: dict(stats, write_ms=round(stats['write_ms'], 1))
+                for entity, stats in self.entities.items()
+            },
+        }
+
+
+class MeteredReader:
+    """
+    Wraps a raw response stream to count bytes and time spent waiting on the
+    network, so a streaming parse can be split into fetch and parse time.
+    """
+
+    def __init__(self, raw, metrics):
+        self.raw = raw
+        self.metrics = metrics
+
+    def read(self, size=-1):
+        start = time.perf_counter()
+        chunk = self.raw.read(size)
+        self.metrics.fetch_ms += (time.perf_counter() - start) * 1000
+        self.metrics.bytes_received += len(chunk)
+        return chunk
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers, or None when empty"""
+    ordered = sorted(v for v in values if v is not None)
+    if not ordered:
+        return None
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
@@ -0,0 +1,282 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from django.db import connection, transaction
+import datetime
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Database vendors that understand INSERT ... ON CONFLICT (...) DO UPDATE.
+UPSERT_VENDORS = ('sqlite', 'postgresql')
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Column holding the per-row fingerprint of the synced YNAB payload.
+FINGERPRINT_FIELD = 'content_hash'
+
+
+def supports_upsert():
+    """Whether the active database backend can run the native upsert path"""
+    return connection.vendor in UPSERT_VENDORS
+
+
+@contextmanager
+def write_transaction():
+    """
+    Atomic block for sync writes. On SQLite the outermost block takes the
+    write lock up front (like ``BEGIN IMMEDIATE``, which Django 5.0 cannot
+    request): a deferred transaction that has already read fails at once
+    instead of waiting when another thread or worker is writing.
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("UPDATE django_migrations SET id = id WHERE 0")
+        yield
+
+
+def _data_fields(model_class):
+    """Concrete fields filled from the YNAB payload, primary key first"""
+    pk = model_class._meta.pk
+    return [pk] + [
+        f for f in model_class._meta.concrete_fields
+        if not f.primary_key and f.name != FINGERPRINT_FIELD
+    ]
+
+
+def _row_values(fields, item_data):
+    """Convert one YNAB dict into a tuple of database-ready values"""
+    values = []
+    for f in fields:
+        if f.attname in item_data:
+            value = item_data[f.attname]
+        elif f.name in item_data:
+            value = item_data[f.name]
+        else:
+            value = f.get_default()
+        values.append(f.get_db_prep_save(value, connection))
+    return tuple(values)
+
+
+def fingerprint(values):
+    """Stable content hash for a tuple of database-ready row values"""
+    return hashlib.blake2b(repr(values).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def fingerprint_item(model_class, item_data):
+    """Fingerprint a YNAB dict the same way the upsert path does"""
+    return fingerprint(_row_values(_data_fields(model_class), item_data))
+
+
+def _same_value(new_value, old_value):
+    """Compare a prepared value with one read back from the database"""
+    if new_value == old_value:
+        return True
+    # SQLite hands dates back as objects but they are written as ISO strings
+    if isinstance(old_value, datetime.date) and isinstance(new_value, str):
+        return str(old_value) == new_value
+    return False
+
+
+def _build_upsert_sql(model_class, fields):
+    qn = connection.ops.quote_name
+    table = qn(model_class._meta.db_table)
+    pk_column = qn(model_class._meta.pk.column)
+    columns = ", ".join(qn(f.column) for f in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    assignments = ", ".join(
+        f"{qn(f.column)} = excluded.{qn(f.column)}" for f in fields if not f.primary_key
+    )
+    return (
+        f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) "
+        f"ON CONFLICT ({pk_column}) DO UPDATE SET {assignments}"
+    )
+
+
+def _update_changed_columns(cursor, model_class, fields, changed):
+    """
+    Update rows whose fingerprint differs, writing only the columns whose
+    values actually changed. Rows are grouped by their set of changed columns
+    so each group is a single ``executemany``.
+    """
+    qn = connection.ops.quote_name
+    table = qn(model_class._meta.db_table)
+    pk_column = qn(model_class._meta.pk.column)
+    hash_column = qn(model_class._meta.get_field(FINGERPRINT_FIELD).column)
+
+    ids = [values[0] for values, _ in changed]
+    cursor.execute(
+        f"SELECT {', '.join(qn(f.column) for f in fields)} FROM {table} "
+        f"WHERE {pk_column} IN ({', '.join(['%s'] * len(ids))})",
+        ids,
+    )
+    current = {row[0]: row for row in cursor.fetchall()}
+
+    groups = defaultdict(list)
+    for values, row_hash in changed:
+        old = current.get(values[0])
+        if old is None:
+            continue
+        columns = tuple(i for i in range(1, len(fields)) if not _same_value(values[i], old[i]))
+        groups[columns].append(tuple(values[i] for i in columns) + (row_hash, values[0]))
+
+    for columns, params in groups.items():
+        assignments = ", ".join(f"{qn(fields[i].column)} = %s" for i in columns)
+        assignments = f"{assignments}, {hash_column} = %s" if assignments else f"{hash_column} = %s"
+        cursor.executemany(f"UPDATE {table} SET {assignments} WHERE {pk_column} = %s", params)
+
+
+def upsert_rows(model_class, data, id_field='id', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write YNAB dicts straight into the model's table, one chunk at a time.
+
+    Each row is reduced to a tuple of database-ready values plus a content
+    fingerprint. The chunk's stored fingerprints are read back in one query:
+    new rows go through ``INSERT ... ON CONFLICT DO UPDATE`` with
+    ``executemany``, rows whose fingerprint changed get a column-level
+    ``UPDATE``, and unchanged rows are not written at all.
+
+    Returns a ``(created, updated)`` tuple; ``updated`` only counts rows that
+    actually changed.
+    """
+    fields = _data_fields(model_class)
+    sql = _build_upsert_sql(model_class, fields + [model_class._meta.get_field(FINGERPRINT_FIELD)])
+    qn = connection.ops.quote_name
+    table = qn(model_class._meta.db_table)
+    pk_column = qn(model_class._meta.pk.column)
+    hash_column = qn(model_class._meta.get_field(FINGERPRINT_FIELD).column)
+
+    created = 0
+    updated = 0
+    unchanged = 0
+    chunk = []
+
+    def flush(cursor, rows):
+        ids = list({values[0] for values, _ in rows})
+        cursor.execute(
+            f"SELECT {pk_column}, {hash_column} FROM {table} "
+            f"WHERE {pk_column} IN ({', '.join(['%s'] * len(ids))})",
+            ids,
+        )
+        stored = dict(cursor.fetchall())
+
+        new_rows = [values + (row_hash,) for values, row_hash in rows if values[0] not in stored]
+        changed = [(values, row_hash) for values, row_hash in rows if values[0] in stored and stored[values[0]] != row_hash]
+
+        if new_rows:
+            cursor.executemany(sql, new_rows)
+        if changed:
+            _update_changed_columns(cursor, model_class, fields, changed)
+        return len(new_rows), len(changed), len(rows) - len(new_rows) - len(changed)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for item_data in data:
+            if not item_data.get(id_field):
+                continue
+            values = _row_values(fields, item_data)
+            chunk.append((values, fingerprint(values)))
+            if len(chunk) >= chunk_size:
+                c, u, n = flush(cursor, chunk)
+                created += c
+                updated += u
+                unchanged += n
+                chunk = []
+
+        if chunk:
+            c, u, n = flush(cursor, chunk)
+            created += c
+            updated += u
+            unchanged += n
+
+    logger.debug(f"Upserted {model_class.__name__}: {created} created, {updated} updated, {unchanged} unchanged")
+    return created, updated
+
+
+def _distinct_sql(left, right):
+    """Null-safe "values differ" comparison for the active backend"""
+    if connection.vendor == 'sqlite':
+        return f"{left} IS NOT {right}"
+    return f"{left} IS DISTINCT FROM {right}"
+
+
+def merge_staged(model_class, data, required=(), nullable=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Set-based alternative to ``upsert_rows`` for very large row sets.
+
+    Rows are bulk-loaded into a temporary staging table shaped like the
+    model's table. Rows whose ``required`` foreign keys point at no existing
+    row are deleted there, dangling ``nullable`` foreign keys are set to
+    NULL, and the rest is merged with one ``INSERT ... SELECT ... ON
+    CONFLICT DO UPDATE`` that only rewrites rows whose values differ. All of
+    that runs inside the database instead of row by row in Python.
+
+    Rows written this way have their fingerprint cleared, so a later
+    ``upsert_rows`` pass compares their columns and fingerprints them again.
+
+    Returns a ``(created, updated)`` tuple like ``upsert_rows``.
+    """
+    fields = _data_fields(model_class)
+    qn = connection.ops.quote_name
+    table = qn(model_class._meta.db_table)
+    stage = qn(f"stage_{model_class._meta.db_table}")
+    pk_column = qn(model_class._meta.pk.column)
+    hash_column = qn(model_class._meta.get_field(FINGERPRINT_FIELD).column)
+    columns = ", ".join(qn(f.column) for f in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+
+    def missing_target(name):
+        field = model_class._meta.get_field(name)
+        target = field.related_model._meta
+        column = qn(field.column)
+        return column, f"{column} NOT IN (SELECT {qn(target.pk.column)} FROM {qn(target.db_table)})"
+
+    differs = " OR ".join(
+        _distinct_sql(f"{table}.{qn(f.column)}", f"excluded.{qn(f.column)}") for f in fields if not f.primary_key
+    )
+    staged_differs = " OR ".join(
+        _distinct_sql(f"t.{qn(f.column)}", f"s.{qn(f.column)}") for f in fields if not f.primary_key
+    )
+    assignments = ", ".join(f"{qn(f.column)} = excluded.{qn(f.column)}" for f in fields if not f.primary_key)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {stage} AS SELECT {columns} FROM {table} WHERE 1 = 0")
+        chunk = []
+        for item_data in data:
+            if not item_data.get(fields[0].attname):
+                continue
+            chunk.append(_row_values(fields, item_data))
+            if len(chunk) >= chunk_size:
+                cursor.executemany(f"INSERT INTO {stage} ({columns}) VALUES ({placeholders})", chunk)
+                chunk = []
+        if chunk:
+            cursor.executemany(f"INSERT INTO {stage} ({columns}) VALUES ({placeholders})", chunk)
+
+        for name in required:
+            column, missing = missing_target(name)
+            cursor.execute(f"DELETE FROM {stage} WHERE {column} IS NULL OR {missing}")
+        for name in nullable:
+            column, missing = missing_target(name)
+            cursor.execute(f"UPDATE {stage} SET {column} = NULL WHERE {column} IS NOT NULL AND {missing}")
+
+        cursor.execute(f"SELECT COUNT(*) FROM {stage} WHERE {pk_column} NOT IN (SELECT {pk_column} FROM {table})")
+        created = cursor.fetchone()[0]
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {stage} s JOIN {table} t ON t.{pk_column} = s.{pk_column} WHERE {staged_differs}"
+        )
+        updated = cursor.fetchone()[0]
+
+        # "WHERE 1 = 1" keeps SQLite from parsing ON CONFLICT as a join constraint
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}, {hash_column}) "
+            f"SELECT {columns}, NULL FROM {stage} WHERE 1 = 1 "
+            f"ON CONFLICT ({pk_column}) DO UPDATE SET {assignments}, {hash_column} = NULL "
+            f"WHERE {differs}"
+        )
+        # The staging table is undone with the transaction if anything fails
+        cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+
+    logger.debug(f"Merged {model_class.__name__} through staging: {created} created, {updated} updated")
+    return created, updated
@@ -1,10 +1,12 @@
 from django.urls import path, include
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.routers import DefaultRouter
 from .views import (
-    CategoryGroupViewSet, CategoryViewSet, PayeeViewSet, YNABAccountViewSet,
-    TransactionViewSet, YNABConfigurationView, SyncView, YNABUserView,
-    YNABBudgetsView, YNABBudgetByIdView, YNABMonthsView, YNABAPIEndpointsView, CrossReferenceView, ColumnConfigurationView, AccountTypeMappingView
+    CategoryGroupViewSet, CategoryViewSet, PayeeViewSet, YNABAccountViewSet, BudgetMonthViewSet, CategoryMonthViewSet,
+    TransactionViewSet, YNABConfigurationView, YNABBudgetConfigurationViewSet, SyncView, SyncJobView, SyncRunsView, YNABQuotaView,
+    YNABBudgetByIdView, CrossReferenceView, ColumnConfigurationView, AccountTypeMappingView
 )
+from .async_views import YNABAPIEndpointsView, YNABBudgetsView, YNABMonthsView, YNABUserView
 
 router = DefaultRouter()
 router.register(r'category-groups', CategoryGroupViewSet)
@@ -12,6 +14,9 @@ router.register(r'categories', CategoryViewSet)
 router.register(r'payees', PayeeViewSet)
 # router.register(r'accounts', YNABAccountViewSet) # Replaced with manual routing for custom actions
 router.register(r'transactions', TransactionViewSet)
+router.register(r'budget-configs', YNABBudgetConfigurationViewSet)
+router.register(r'budget-months', BudgetMonthViewSet)
+router.register(r'category-months', CategoryMonthViewSet)
 
 account_list = YNABAccountViewSet.as_view({'get': 'list'})
 account_detail = YNABAccountViewSet.as_view({'get': 'retrieve'})
@@ -26,11 +31,14 @@ urlpatterns = [
     path('accounts/<uuid:pk>/unlink/', account_unlink, name='ynabaccount-unlink'),
     path('config/', YNABConfigurationView.as_view(), name='ynab-config'),
     path('sync/', SyncView.as_view(), name='ynab-sync'),
+    path('sync/jobs/<uuid:job_id>/', SyncJobView.as_view(), name='ynab-sync-job'),
+    path('sync/runs/', SyncRunsView.as_view(), name='ynab-sync-runs'),
+    path('quota/', YNABQuotaView.as_view(), name='ynab-quota'),
     path('user/', YNABUserView.as_view(), name='ynab-user'),
     path('budgets/', YNABBudgetsView.as_view(), name='ynab-budgets'),
     path('budgets/<uuid:budget_id>/', YNABBudgetByIdView.as_view(), name='ynab-budget-by-id'),
     path('months/', YNABMonthsView.as_view(), name='ynab-months'),
-    path('api-endpoints/', YNABAPIEndpointsView.as_view(), name='ynab-api-endpoints'),
+    path('api-endpoints/', csrf_exempt(YNABAPIEndpointsView.as_view()), name='ynab-api-endpoints'),
     path('cross-references/<str:record_type>/', CrossReferenceView.as_view(), name='ynab-cross-references'),
     path('column-configurations/', ColumnConfigurationView.as_view(), name='ynab-column-configurations'),
     path('account-type-mappings/', AccountTypeMappingView.as_view(), name='ynab-account-type-mappings'),
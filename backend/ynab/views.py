@@ -1,24 +1,56 @@
 from django.shortcuts import render, get_object_or_404
 from rest_framework import viewsets, views, status
 from rest_framework.response import Response
-from .models import Category, CategoryGroup, Payee, YNABAccount, YNABSync, Subtransaction, Transaction, YNABConfiguration, CrossReference, ColumnConfiguration, AccountTypeMapping
+from .models import BudgetMonth, Category, CategoryGroup, CategoryMonth, Payee, YNABAccount, YNABSync, Subtransaction, Transaction, YNABConfiguration, CrossReference, ColumnConfiguration, AccountTypeMapping, SyncJob, SyncRun
 from .serializers import (
     CategoryGroupSerializer, CategorySerializer, PayeeSerializer,
     YNABAccountSerializer, TransactionSerializer, YNABConfigurationSerializer,
-    YNABUserSerializer, YNABBudgetSerializer, ColumnConfigurationSerializer
+    YNABUserSerializer, YNABBudgetSerializer, ColumnConfigurationSerializer,
+    SyncJobSerializer, SyncRunSerializer, BudgetMonthSerializer, CategoryMonthSerializer
 )
 import os
-import requests
 import logging
 import json
+import time
+from django.conf import settings
 from rest_framework.decorators import action
 from .ynab_client import YNABClient
+from .ratelimit import RateLimitExceeded, bucket_key
+from . import config_cache
+from .jobs import start_sync_job, start_budget_sync_jobs, wait_for_sync_job
+from .telemetry import TIMING_FIELDS, percentile
 from accounts.models import Account
+from api.links import filter_plugin_linked
 
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
 
-class CategoryGroupViewSet(viewsets.ReadOnlyModelViewSet):
+class BudgetScopedMixin:
+    """
+    Restricts the queryset to one YNAB budget when ``?budget_id=`` is given.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        budget_id = self.request.query_params.get('budget_id')
+        if budget_id:
+            queryset = queryset.filter(budget_id=budget_id)
+        return queryset
+
+class LinkedFilterMixin:
+    """
+    Restricts the queryset to rows that are (``?linked=true``) or are not
+    (``?linked=false``) linked to a core record.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        linked = self.request.query_params.get('linked')
+        if linked is not None:
+            queryset = filter_plugin_linked(queryset, linked.lower() == 'true')
+        return queryset
+
+class CategoryGroupViewSet(BudgetScopedMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows YNAB category groups to be viewed or edited.
     """
@@ -31,7 +63,7 @@ class CategoryGroupViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response({'data': {'category_groups': serializer.data}})
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(LinkedFilterMixin, BudgetScopedMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows YNAB categories to be viewed or edited.
     """
@@ -39,26 +71,6 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CategorySerializer
     pagination_class = None
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        linked = self.request.query_params.get('linked')
-
-        if linked is not None:
-            from api.models import Link
-            from django.contrib.contenttypes.models import ContentType
-
-            content_type = ContentType.objects.get_for_model(Category)
-            linked_ids = Link.objects.filter(
-                plugin_content_type=content_type
-            ).values_list('plugin_object_id', flat=True)
-
-            if linked.lower() == 'true':
-                queryset = queryset.filter(id__in=linked_ids)
-            else:
-                queryset = queryset.exclude(id__in=linked_ids)
-
-        return queryset
-
     def list(self, request, *args, **kwargs):
         """
         Override list method to return categories with their group names.
@@ -68,14 +80,13 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 
         # Add category_group_name to each category
         categories_with_groups = []
-        for category_data in serializer.data:
-            category = queryset.get(id=category_data['id'])
+        for category, category_data in zip(queryset, serializer.data):
             category_data['category_group_name'] = category.category_group.name if category.category_group else ''
             categories_with_groups.append(category_data)
 
         return Response({'data': {'categories': categories_with_groups}})
 
-class PayeeViewSet(viewsets.ReadOnlyModelViewSet):
+class PayeeViewSet(LinkedFilterMixin, BudgetScopedMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows YNAB payees to be viewed or edited.
     """
@@ -83,32 +94,12 @@ class PayeeViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = PayeeSerializer
     pagination_class = None
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        linked = self.request.query_params.get('linked')
-
-        if linked is not None:
-            from api.models import Link
-            from django.contrib.contenttypes.models import ContentType
-
-            content_type = ContentType.objects.get_for_model(Payee)
-            linked_ids = Link.objects.filter(
-                plugin_content_type=content_type
-            ).values_list('plugin_object_id', flat=True)
-
-            if linked.lower() == 'true':
-                queryset = queryset.filter(id__in=linked_ids)
-            else:
-                queryset = queryset.exclude(id__in=linked_ids)
-
-        return queryset
-
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(queryset, many=True)
         return Response({'data': {'payees': serializer.data}})
 
-class YNABAccountViewSet(viewsets.ReadOnlyModelViewSet):
+class YNABAccountViewSet(LinkedFilterMixin, BudgetScopedMixin, viewsets.ReadOnlyModelViewSet):
     """
     A viewset for viewing and editing YNAB accounts.
     """
@@ -116,26 +107,6 @@ class YNABAccountViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = YNABAccountSerializer
     pagination_class = None
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        linked = self.request.query_params.get('linked')
-
-        if linked is not None:
-            from api.models import Link
-            from django.contrib.contenttypes.models import ContentType
-
-            content_type = ContentType.objects.get_for_model(YNABAccount)
-            linked_ids = Link.objects.filter(
-                plugin_content_type=content_type
-            ).values_list('plugin_object_id', flat=True)
-
-            if linked.lower() == 'true':
-                queryset = queryset.filter(id__in=linked_ids)
-            else:
-                queryset = queryset.exclude(id__in=linked_ids)
-
-        return queryset
-
     def list(self, request, *args, **kwargs):
         """
         Override list method to return the expected data structure.
@@ -206,7 +177,7 @@ class YNABAccountViewSet(viewsets.ReadOnlyModelViewSet):
 
         return Response(self.get_serializer(ynab_account).data)
 
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+class TransactionViewSet(BudgetScopedMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Transaction.objects.filter(deleted=False).order_by('-date')
     serializer_class = TransactionSerializer
     pagination_class = None
@@ -223,18 +194,71 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
             }
         })
 
+class MonthRangeMixin:
+    """
+    Filters month rows with ``?month=``, ``?month_from=`` and ``?month_to=``
+    (first-of-month dates, as YNAB writes them).
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        if params.get('month'):
+            queryset = queryset.filter(month=params['month'])
+        if params.get('month_from'):
+            queryset = queryset.filter(month__gte=params['month_from'])
+        if params.get('month_to'):
+            queryset = queryset.filter(month__lte=params['month_to'])
+        return queryset
+
+class BudgetMonthViewSet(MonthRangeMixin, BudgetScopedMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Month summaries from the local history the sync maintains.
+    """
+    queryset = BudgetMonth.objects.filter(deleted=False).order_by('-month')
+    serializer_class = BudgetMonthSerializer
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(queryset, many=True)
+        return Response({'data': {'months': serializer.data}})
+
+class CategoryMonthViewSet(MonthRangeMixin, BudgetScopedMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Per-category budgeted, activity and balance figures by month, filtered
+    with ``?category_id=`` and the month parameters.
+    """
+    queryset = CategoryMonth.objects.filter(deleted=False).order_by('-month', 'category_id')
+    serializer_class = CategoryMonthSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        category_id = self.request.query_params.get('category_id')
+        if category_id:
+            queryset = queryset.filter(category_id=category_id)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(queryset, many=True)
+        return Response({'data': {'category_months': serializer.data}})
+
 class YNABConfigurationView(views.APIView):
     """
     API endpoint for managing YNAB configuration.
     """
 
     def get(self, request, *args, **kwargs):
-        config, created = YNABConfiguration.objects.get_or_create(pk=1)
-        sync_knowledge, _ = YNABSync.objects.get_or_create(pk=1)
+        config = config_cache.primary_configuration()
+        if config is None:
+            config, created = YNABConfiguration.objects.get_or_create(pk=1)
+        sync_knowledge = YNABSync.objects.filter(budget_id=config.budget_id).first() if config.budget_id else None
 
         data = YNABConfigurationSerializer(config).data
         # Only include last_synced if it actually exists (not null)
-        if sync_knowledge.last_synced:
+        if sync_knowledge and sync_knowledge.last_synced:
             data['last_synced'] = sync_knowledge.last_synced
 
         return Response(data)
@@ -258,46 +282,60 @@ class YNABConfigurationView(views.APIView):
     def patch(self, request, *args, **kwargs):
         return self.put(request, *args, **kwargs)
 
-class YNABBudgetsView(views.APIView):
-    def get(self, request, *args, **kwargs):
-        # First try to get API key from headers (for direct API calls)
-        api_key = request.headers.get('X-YNAB-API-Key')
-
-        # If not in headers, try to get from database
-        if not api_key:
-            try:
-                config = YNABConfiguration.objects.first()
-                if config and config.api_key:
-                    api_key = config.api_key
-            except YNABConfiguration.DoesNotExist:
-                pass  # api_key remains None
-
-        if not api_key:
-            return Response({"error": "YNAB API key not configured."}, status=status.HTTP_400_BAD_REQUEST)
+class YNABBudgetConfigurationViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for managing the configuration of every synced budget.
+    The primary configuration (pk=1) is the one edited through ``config/``.
+    """
+    queryset = YNABConfiguration.objects.order_by('pk')
+    serializer_class = YNABConfigurationSerializer
+    pagination_class = None
 
-        try:
-            client = YNABClient(api_key)
-            budgets_response = client.get_budgets()
-
-            if budgets_response is not None:
-                serializer = YNABBudgetSerializer(budgets_response, many=True)
-                return Response({
-                    'data': {
-                        'budgets': serializer.data
-                    }
-                })
-            else:
-                # Assuming get_budgets returns None on failure before raising an exception
-                return Response({"error": "Failed to fetch budgets from YNAB."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(queryset, many=True)
+        last_synced = dict(
+            YNABSync.objects.filter(budget_id__in=[config.budget_id for config in queryset if config.budget_id])
+            .values_list('budget_id', 'last_synced')
+        )
+        data = serializer.data
+        for item in data:
+            item['last_synced'] = last_synced.get(item['budget_id'])
+        return Response(data)
 
-        except Exception as e:
-            logger.error(f"Error fetching YNAB budgets: {e}")
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    def destroy(self, request, *args, **kwargs):
+        if str(kwargs.get('pk')) == '1':
+            return Response(
+                {"error": "The primary budget configuration cannot be deleted."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().destroy(request, *args, **kwargs)
+
+def cached_response(request, payload, etag):
+    """Response carrying the cache entry's ETag, or 304 when the client already has it"""
+    if etag and etag in request.headers.get('If-None-Match', ''):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(payload)
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+def rate_limited_response(error):
+    """429 telling the client when the shared YNAB request quota frees up"""
+    retry_after = max(round(error.retry_after), 1)
+    response = Response(
+        {"error": str(error), "retry_after": retry_after},
+        status=status.HTTP_429_TOO_MANY_REQUESTS
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
 
 class YNABBudgetByIdView(views.APIView):
     def get(self, request, budget_id, *args, **kwargs):
         try:
-            config = YNABConfiguration.objects.first()
+            config = config_cache.first_configuration()
             if not config or not config.api_key:
                 return Response({"error": "YNAB API key not configured."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -305,475 +343,16 @@ class YNABBudgetByIdView(views.APIView):
             budget_response = client.get_budget_by_id(budget_id)
 
             if budget_response:
-                return Response(budget_response)
+                return cached_response(request, budget_response, client.last_etag)
             else:
                 return Response({"error": "Failed to fetch budget from YNAB."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        except RateLimitExceeded as e:
+            return rate_limited_response(e)
         except Exception as e:
             logger.error(f"Error fetching YNAB budget by ID: {e}")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class YNABMonthsView(views.APIView):
-    def get(self, request, *args, **kwargs):
-        # First try to get API key from headers (for direct API calls)
-        api_key = request.headers.get('X-YNAB-API-Key')
-
-        # If not in headers, try to get from database
-        if not api_key:
-            try:
-                config = YNABConfiguration.objects.first()
-                if config and config.api_key:
-                    api_key = config.api_key
-            except YNABConfiguration.DoesNotExist:
-                pass  # api_key remains None
-
-        if not api_key:
-            return Response({"error": "YNAB API key not configured."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Get budget_id from database
-        try:
-            config = YNABConfiguration.objects.first()
-            budget_id = config.budget_id if config else None
-        except YNABConfiguration.DoesNotExist:
-            budget_id = None
-
-        if not budget_id:
-            return Response({"error": "YNAB budget ID not configured."}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            client = YNABClient(api_key)
-            months_response = client.get_months(budget_id)
-
-            if months_response is not None:
-                return Response({
-                    'data': {
-                        'months': months_response
-                    }
-                })
-            else:
-                return Response({"error": "Failed to fetch months from YNAB."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        except Exception as e:
-            logger.error(f"Error fetching YNAB months: {e}")
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-class YNABUserView(views.APIView):
-    def get(self, request, *args, **kwargs):
-        # First try to get API key from headers (for direct API calls)
-        api_key = request.headers.get('X-YNAB-API-Key')
-
-        # If not in headers, try to get from database
-        if not api_key:
-            try:
-                config = YNABConfiguration.objects.get(pk=1)
-                api_key = config.api_key
-            except YNABConfiguration.DoesNotExist:
-                return Response({"message": "YNAB is not configured."}, status=status.HTTP_400_BAD_REQUEST)
-
-        if not api_key:
-            return Response({"message": "API key must be configured."}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            client = YNABClient(api_key)
-            user_data = client.get_user()
-            logger.info(f"YNAB User data retrieved: {user_data}")
-            return Response(user_data)
-
-        except requests.exceptions.HTTPError as e:
-            logger.error("YNAB API Error during User fetch", exc_info=True)
-            return Response({"message": f"YNAB API Error: {e.response.reason}"}, status=e.response.status_code)
-        except Exception as e:
-            logger.error("An unexpected error occurred during YNAB User fetch", exc_info=True)
-            return Response({"message": f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-class YNABAPIEndpointsView(views.APIView):
-    """
-    API endpoint for testing and exploring YNAB API endpoints.
-    """
-
-    def get(self, request, *args, **kwargs):
-        """Get available endpoints and their metadata"""
-        endpoints = {
-            "user": {
-                "title": "User",
-                "endpoints": [
-                    {
-                        "method": "GET",
-                        "path": "/user",
-                        "description": "Returns authenticated user information",
-                        "parameters": [],
-                        "variables": []
-                    }
-                ]
-            },
-            "budgets": {
-                "title": "Budgets",
-                "endpoints": [
-                    {
-                        "method": "GET",
-                        "path": "/budgets",
-                        "description": "Returns budgets list with summary information",
-                        "parameters": [],
-                        "variables": []
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}",
-                        "description": "Returns a single budget with all related entities",
-                        "parameters": ["last_knowledge_of_server"],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/settings",
-                        "description": "Returns settings for a budget",
-                        "parameters": [],
-                        "variables": ["budget_id"]
-                    }
-                ]
-            },
-            "accounts": {
-                "title": "Accounts",
-                "endpoints": [
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/accounts",
-                        "description": "Returns all accounts for the specified budget",
-                        "parameters": [],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "POST",
-                        "path": "/budgets/{budget_id}/accounts",
-                        "description": "Creates a new account",
-                        "parameters": ["account"],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/accounts/{account_id}",
-                        "description": "Returns a single account",
-                        "parameters": [],
-                        "variables": ["budget_id", "account_id"]
-                    }
-                ]
-            },
-            "categories": {
-                "title": "Categories",
-                "endpoints": [
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/categories",
-                        "description": "Returns all categories grouped by category group",
-                        "parameters": [],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/categories/{category_id}",
-                        "description": "Returns a single category",
-                        "parameters": [],
-                        "variables": ["budget_id", "category_id"]
-                    },
-                    {
-                        "method": "PATCH",
-                        "path": "/budgets/{budget_id}/categories/{category_id}",
-                        "description": "Updates a category",
-                        "parameters": ["category"],
-                        "variables": ["budget_id", "category_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/months/{month}/categories/{category_id}",
-                        "description": "Returns a specific category for a specific month",
-                        "parameters": [],
-                        "variables": ["budget_id", "month", "category_id"]
-                    },
-                    {
-                        "method": "PATCH",
-                        "path": "/budgets/{budget_id}/months/{month}/categories/{category_id}",
-                        "description": "Updates a category for a specific month",
-                        "parameters": ["category"],
-                        "variables": ["budget_id", "month", "category_id"]
-                    }
-                ]
-            },
-            "payees": {
-                "title": "Payees",
-                "endpoints": [
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/payees",
-                        "description": "Returns all payees",
-                        "parameters": [],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/payees/{payee_id}",
-                        "description": "Returns a single payee",
-                        "parameters": [],
-                        "variables": ["budget_id", "payee_id"]
-                    },
-                    {
-                        "method": "PATCH",
-                        "path": "/budgets/{budget_id}/payees/{payee_id}",
-                        "description": "Updates a payee",
-                        "parameters": ["payee"],
-                        "variables": ["budget_id", "payee_id"]
-                    }
-                ]
-            },
-            "payee_locations": {
-                "title": "Payee Locations",
-                "endpoints": [
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/payee_locations",
-                        "description": "Returns all payee locations",
-                        "parameters": [],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/payee_locations/{payee_location_id}",
-                        "description": "Returns a single payee location",
-                        "parameters": [],
-                        "variables": ["budget_id", "payee_location_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/payees/{payee_id}/payee_locations",
-                        "description": "Returns all payee locations for a specific payee",
-                        "parameters": [],
-                        "variables": ["budget_id", "payee_id"]
-                    }
-                ]
-            },
-            "months": {
-                "title": "Months",
-                "endpoints": [
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/months",
-                        "description": "Returns all budget months",
-                        "parameters": [],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/months/{month}",
-                        "description": "Returns a single budget month",
-                        "parameters": [],
-                        "variables": ["budget_id", "month"]
-                    }
-                ]
-            },
-            "transactions": {
-                "title": "Transactions",
-                "endpoints": [
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/transactions",
-                        "description": "Returns budget transactions",
-                        "parameters": ["since_date", "type", "last_knowledge_of_server"],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "POST",
-                        "path": "/budgets/{budget_id}/transactions",
-                        "description": "Creates a new transaction",
-                        "parameters": ["transaction"],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "PATCH",
-                        "path": "/budgets/{budget_id}/transactions",
-                        "description": "Updates multiple transactions",
-                        "parameters": ["transactions"],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "POST",
-                        "path": "/budgets/{budget_id}/transactions/import",
-                        "description": "Imports transactions from a file",
-                        "parameters": ["import_id", "transactions"],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/transactions/{transaction_id}",
-                        "description": "Returns a single transaction",
-                        "parameters": [],
-                        "variables": ["budget_id", "transaction_id"]
-                    },
-                    {
-                        "method": "PUT",
-                        "path": "/budgets/{budget_id}/transactions/{transaction_id}",
-                        "description": "Updates a single transaction",
-                        "parameters": ["transaction"],
-                        "variables": ["budget_id", "transaction_id"]
-                    },
-                    {
-                        "method": "DELETE",
-                        "path": "/budgets/{budget_id}/transactions/{transaction_id}",
-                        "description": "Deletes a transaction",
-                        "parameters": [],
-                        "variables": ["budget_id", "transaction_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/accounts/{account_id}/transactions",
-                        "description": "Returns transactions for a specific account",
-                        "parameters": ["since_date", "type", "last_knowledge_of_server"],
-                        "variables": ["budget_id", "account_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/categories/{category_id}/transactions",
-                        "description": "Returns transactions for a specific category",
-                        "parameters": ["since_date", "type", "last_knowledge_of_server"],
-                        "variables": ["budget_id", "category_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/payees/{payee_id}/transactions",
-                        "description": "Returns transactions for a specific payee",
-                        "parameters": ["since_date", "type", "last_knowledge_of_server"],
-                        "variables": ["budget_id", "payee_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/months/{month}/transactions",
-                        "description": "Returns transactions for a specific month",
-                        "parameters": ["since_date", "type", "last_knowledge_of_server"],
-                        "variables": ["budget_id", "month"]
-                    }
-                ]
-            },
-            "scheduled_transactions": {
-                "title": "Scheduled Transactions",
-                "endpoints": [
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/scheduled_transactions",
-                        "description": "Returns all scheduled transactions",
-                        "parameters": [],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "POST",
-                        "path": "/budgets/{budget_id}/scheduled_transactions",
-                        "description": "Creates a new scheduled transaction",
-                        "parameters": ["scheduled_transaction"],
-                        "variables": ["budget_id"]
-                    },
-                    {
-                        "method": "GET",
-                        "path": "/budgets/{budget_id}/scheduled_transactions/{scheduled_transaction_id}",
-                        "description": "Returns a single scheduled transaction",
-                        "parameters": [],
-                        "variables": ["budget_id", "scheduled_transaction_id"]
-                    },
-                    {
-                        "method": "PUT",
-                        "path": "/budgets/{budget_id}/scheduled_transactions/{scheduled_transaction_id}",
-                        "description": "Updates a scheduled transaction",
-                        "parameters": ["scheduled_transaction"],
-                        "variables": ["budget_id", "scheduled_transaction_id"]
-                    },
-                    {
-                        "method": "DELETE",
-                        "path": "/budgets/{budget_id}/scheduled_transactions/{scheduled_transaction_id}",
-                        "description": "Deletes a scheduled transaction",
-                        "parameters": [],
-                        "variables": ["budget_id", "scheduled_transaction_id"]
-                    }
-                ]
-            }
-        }
-
-        return Response(endpoints)
-
-    def post(self, request, *args, **kwargs):
-        """Make a YNAB API call"""
-        try:
-            config = YNABConfiguration.objects.get(pk=1)
-            api_key = config.api_key
-        except YNABConfiguration.DoesNotExist:
-            return Response({"error": "YNAB is not configured."}, status=status.HTTP_400_BAD_REQUEST)
-
-        if not api_key:
-            return Response({"error": "API key must be configured."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Get request data
-        method = request.data.get('method', 'GET')
-        endpoint = request.data.get('endpoint', '')
-        variables = request.data.get('variables', {})
-        parameters = request.data.get('parameters', {})
-        body = request.data.get('body', {})
-
-        # Build the URL
-        url = f"https://api.ynab.com/v1{endpoint}"
-
-        # Replace variables in the URL
-        for var_name, var_value in variables.items():
-            url = url.replace(f"{{{var_name}}}", str(var_value))
-
-        # Add query parameters
-        if parameters:
-            query_params = []
-            for key, value in parameters.items():
-                if value is not None and value != '':
-                    query_params.append(f"{key}={value}")
-            if query_params:
-                url += "?" + "&".join(query_params)
-
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-
-        try:
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=headers)
-            elif method.upper() == 'POST':
-                response = requests.post(url, headers=headers, json=body)
-            elif method.upper() == 'PUT':
-                response = requests.put(url, headers=headers, json=body)
-            elif method.upper() == 'PATCH':
-                response = requests.patch(url, headers=headers, json=body)
-            elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=headers)
-            else:
-                return Response({"error": f"Unsupported HTTP method: {method}"}, status=status.HTTP_400_BAD_REQUEST)
-
-            response.raise_for_status()
-
-            # Try to parse JSON response
-            try:
-                response_data = response.json()
-            except:
-                response_data = {"raw_text": response.text}
-
-            return Response({
-                "status": response.status_code,
-                "url": url,
-                "method": method.upper(),
-                "data": response_data
-            })
-
-        except requests.exceptions.HTTPError as e:
-            error_data = {"error": f"HTTP {e.response.status_code}: {e.response.reason}"}
-            try:
-                error_data["details"] = e.response.json()
-            except:
-                error_data["details"] = e.response.text
-
-            return Response(error_data, status=e.response.status_code)
-        except Exception as e:
-            return Response({"error": f"Request failed: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
 class CrossReferenceView(views.APIView):
     """
     API endpoint for managing cross-references for YNAB data.
@@ -782,7 +361,7 @@ class CrossReferenceView(views.APIView):
     def get(self, request, record_type, *args, **kwargs):
         """Get cross-references for a specific record type"""
         try:
-            cross_refs = CrossReference.objects.filter(record_type=record_type)
+            cross_refs = config_cache.cross_references(record_type)
             data = []
             for ref in cross_refs:
                 data.append({
@@ -837,7 +416,7 @@ class ColumnConfigurationView(views.APIView):
     def get(self, request, *args, **kwargs):
         """Get column configurations for all record types"""
         try:
-            configs = ColumnConfiguration.objects.all()
+            configs = config_cache.column_configurations()
             data = []
             for config in configs:
                 data.append({
@@ -900,7 +479,7 @@ class AccountTypeMappingView(views.APIView):
     def get(self, request, *args, **kwargs):
         """Get account type mappings"""
         try:
-            mappings = AccountTypeMapping.objects.all()
+            mappings = config_cache.account_type_mappings()
             data = []
             for mapping in mappings:
                 data.append({
@@ -947,13 +526,44 @@ class AccountTypeMappingView(views.APIView):
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class SyncView(views.APIView):
+    """
+    Starts a background YNAB sync, or attaches to the one already running.
+
+    Syncs the primary budget unless ``budget_id`` names another configured
+    budget, or is ``all`` to sync every enabled budget in parallel.
+
+    Answers 202 with the job straight away; poll ``sync/jobs/<id>/`` for
+    progress and the summary message. Pass ``wait=true`` to wait up to
+    ``YNAB_SYNC_WAIT_SECONDS`` for the job instead.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """Return the active sync job, or the most recent one"""
+        jobs = SyncJob.objects.all()
+        budget_id = request.query_params.get('budget_id')
+        if budget_id:
+            jobs = jobs.filter(budget_id=budget_id)
+        job = jobs.filter(status__in=SyncJob.ACTIVE_STATUSES).first() or jobs.first()
+        if job is None:
+            return Response({"job": None})
+        return Response({"job": SyncJobSerializer(job).data})
+
     def post(self, request, *args, **kwargs):
-        try:
-            config = YNABConfiguration.objects.get(pk=1)
-            api_key = config.api_key
-            budget_id = config.budget_id
-        except YNABConfiguration.DoesNotExist:
-            return Response({"message": "YNAB is not configured. Please configure YNAB in Settings before syncing."}, status=status.HTTP_200_OK)
+        budget_id = request.data.get('budget_id', request.query_params.get('budget_id'))
+        wait = str(request.data.get('wait', request.query_params.get('wait', ''))).lower() == 'true'
+        if budget_id == 'all':
+            return self._sync_all(request.data.get('mode'), wait)
+
+        if budget_id:
+            config = config_cache.configuration_for_budget(budget_id)
+            if config is None:
+                return Response({"error": f"Budget {budget_id} is not configured."}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            config = config_cache.primary_configuration()
+            if config is None:
+                return Response({"message": "YNAB is not configured. Please configure YNAB in Settings before syncing."}, status=status.HTTP_200_OK)
+        api_key = config.api_key
+        budget_id = config.budget_id
 
         logger.info(f"Attempting YNAB sync for budget_id: '{budget_id}' with api_key: '{api_key[:5] if api_key else 'None'}...'")
 
@@ -961,228 +571,104 @@ class SyncView(views.APIView):
             logger.info("Sync skipped: API key or budget ID is missing.")
             return Response({"message": "YNAB is not configured. Please configure API key and budget ID in Settings before syncing."}, status=status.HTTP_200_OK)
 
-        try:
-            sync_knowledge, _ = YNABSync.objects.get_or_create(pk=1)
-            last_server_knowledge = sync_knowledge.server_knowledge
-
-            url = f"https://api.ynab.com/v1/budgets/{budget_id}"
-            headers = {"Authorization": f"Bearer {api_key}"}
-            params = {}
-            if last_server_knowledge > 0:
-                params['last_knowledge_of_server'] = last_server_knowledge
-
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-
-            data = response.json()['data']
-            budget_data = data['budget']
-            server_knowledge = data['server_knowledge']
-
-            # Debug logging
-            logger.info(f"Budget data keys: {list(budget_data.keys())}")
-            logger.info(f"Category groups count: {len(budget_data.get('category_groups', []))}")
-            logger.info(f"Accounts count: {len(budget_data.get('accounts', []))}")
-            logger.info(f"Payees count: {len(budget_data.get('payees', []))}")
-            logger.info(f"Transactions count: {len(budget_data.get('transactions', []))}")
-
-            # Process Accounts
-            accounts_synced = self.sync_accounts(budget_data.get('accounts', []))
-
-            # Process Payees
-            payees_synced = self.sync_payees(budget_data.get('payees', []))
-
-            # Process Category Groups and Categories
-            (groups_synced, cats_synced) = self.sync_categories(budget_data.get('category_groups', []), budget_data.get('categories', []))
-
-            # Process Transactions and Subtransactions
-            (trans_synced, subtrans_synced) = self.sync_transactions(budget_data.get('transactions', []))
-
-            sync_knowledge.server_knowledge = server_knowledge
-            sync_knowledge.update_sync_timestamp()
-
-            message = (
-                f"Sync successful! "
-                f"Accounts: {accounts_synced}, "
-                f"Payees: {payees_synced}, "
-                f"Category Groups: {groups_synced}, "
-                f"Categories: {cats_synced}, "
-                f"Transactions: {trans_synced}, "
-                f"Subtransactions: {subtrans_synced}."
-            )
-            return Response({"message": message})
-
-        except requests.exceptions.HTTPError as e:
-            logger.error("YNAB API Error during sync", exc_info=True)
-            return Response({"message": f"YNAB API Error: {e.response.reason}"}, status=e.response.status_code)
-        except Exception as e:
-            logger.error("An unexpected error occurred during YNAB sync", exc_info=True)
-            return Response({"message": f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        job, created = start_sync_job(mode=request.data.get('mode'), budget_id=budget_id)
+        if not created:
+            logger.info(f"Sync job {job.id} already running, attaching to it")
 
-    def _sync_model(self, model_class, data, id_field='id'):
-        existing_ids = set(model_class.objects.values_list(id_field, flat=True))
-        to_create = []
-        to_update = []
+        if wait:
+            job = wait_for_sync_job(job, settings.YNAB_SYNC_WAIT_SECONDS)
 
-        # Get the set of valid field names, including the raw `_id` fields for foreign keys
-        model_fields = set()
-        for f in model_class._meta.get_fields():
-            model_fields.add(f.name)
-            if hasattr(f, 'attname'):
-                model_fields.add(f.attname)
+        data = SyncJobSerializer(job).data
+        if job.status == SyncJob.STATUS_SUCCEEDED:
+            return Response({"message": job.message, "job": data})
+        if job.status == SyncJob.STATUS_FAILED:
+            return Response({"message": job.message, "job": data}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({"message": "Sync is running in the background.", "job": data}, status=status.HTTP_202_ACCEPTED)
 
-        for item_data in data:
-            # Filter the dictionary to only include keys that are actual model fields
-            filtered_data = {k: v for k, v in item_data.items() if k in model_fields}
+    def _sync_all(self, mode, wait):
+        """Sync every enabled budget with bounded parallelism"""
+        budget_ids = list(dict.fromkeys(config.budget_id for config in config_cache.configured_configurations()))
+        if not budget_ids:
+            return Response({"message": "YNAB is not configured. Please configure API key and budget ID in Settings before syncing."}, status=status.HTTP_200_OK)
 
-            item_id = filtered_data.get(id_field)
-            if not item_id:
-                continue
+        jobs = [job for job, created in start_budget_sync_jobs(budget_ids, mode=mode)]
+        if wait:
+            deadline = time.monotonic() + settings.YNAB_SYNC_WAIT_SECONDS
+            jobs = [wait_for_sync_job(job, max(deadline - time.monotonic(), 0)) for job in jobs]
 
-            instance = model_class(**filtered_data)
+        data = SyncJobSerializer(jobs, many=True).data
+        if any(job.status == SyncJob.STATUS_FAILED for job in jobs):
+            response_status = status.HTTP_500_INTERNAL_SERVER_ERROR
+        elif any(job.is_active for job in jobs):
+            response_status = status.HTTP_202_ACCEPTED
+        else:
+            response_status = status.HTTP_200_OK
+        message = " ".join(f"[{job.budget_id}] {job.message or 'Sync is running in the background.'}" for job in jobs)
+        return Response({"message": message, "jobs": data}, status=response_status)
 
-            if item_id in existing_ids:
-                to_update.append(instance)
-            else:
-                to_create.append(instance)
-
-        # Bulk operations
-        if to_create:
-            model_class.objects.bulk_create(to_create)
-
-        if to_update:
-            # Get only the concrete fields of the model to update them, excluding the primary key
-            fields_to_update = [f.name for f in model_class._meta.get_fields() if f.concrete and not f.primary_key]
-            model_class.objects.bulk_update(to_update, fields_to_update)
-
-        return len(to_create), len(to_update)
-
-    def sync_accounts(self, accounts_data):
-        # ... (sync logic for transfer payees remains important)
-        existing_payee_ids = set(Payee.objects.values_list('id', flat=True))
-        for item in accounts_data:
-            transfer_payee_id = item.get('transfer_payee_id')
-            if transfer_payee_id and transfer_payee_id not in existing_payee_ids:
-                Payee.objects.create(
-                    id=transfer_payee_id,
-                    name=f"Transfer : {item.get('name')}",
-                    deleted=False
-                )
-                existing_payee_ids.add(transfer_payee_id)
 
-        created, updated = self._sync_model(YNABAccount, accounts_data)
+class SyncJobView(views.APIView):
+    """
+    API endpoint for polling the status and per-phase progress of a sync job.
+    """
 
-        # After syncing YNAB accounts, automatically sync linked core accounts
-        self._auto_sync_linked_accounts()
+    def get(self, request, job_id, *args, **kwargs):
+        job = get_object_or_404(SyncJob, pk=job_id)
+        return Response({"job": SyncJobSerializer(job).data})
 
-        return f"{created} created, {updated} updated"
 
-    def _auto_sync_linked_accounts(self):
-        """Automatically sync all linked core accounts when YNAB accounts are updated"""
-        from django.contrib.contenttypes.models import ContentType
-        from api.models import Link
-        from accounts.models import Account
+class SyncRunsView(views.APIView):
+    """
+    API endpoint returning recent sync telemetry and latency percentiles, to
+    tell whether slow syncs come from the YNAB API, JSON parsing or writes.
+    """
 
+    def get(self, request, *args, **kwargs):
         try:
-            # Get all links where core object is an Account and plugin object is a YNABAccount
-            account_content_type = ContentType.objects.get_for_model(Account)
-            ynab_account_content_type = ContentType.objects.get_for_model(YNABAccount)
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 500)
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        runs = SyncRun.objects.all()
+        budget_id = request.query_params.get('budget_id')
+        if budget_id:
+            runs = runs.filter(budget_id=budget_id)
+        runs = list(runs[:limit])
+
+        # Failed runs stop early, so they would skew the timing distribution
+        succeeded = [run for run in runs if run.status == SyncJob.STATUS_SUCCEEDED]
+        percentiles = {}
+        for field in TIMING_FIELDS + ('bytes_received',):
+            values = [getattr(run, field) for run in succeeded]
+            percentiles[field] = {f"p{pct}": percentile(values, pct) for pct in (50, 90, 99)}
 
-            links = Link.objects.filter(
-                core_content_type=account_content_type,
-                plugin_content_type=ynab_account_content_type
-            )
+        return Response({
+            "runs": SyncRunSerializer(runs, many=True).data,
+            "summary": {
+                "count": len(runs),
+                "failed": len(runs) - len(succeeded),
+                "percentiles": percentiles,
+            },
+        })
 
-            synced_count = 0
-            for link in links:
-                try:
-                    core_account = link.core_object
-                    ynab_account = link.plugin_object
-
-                    if core_account and ynab_account:
-                        # Use the sync_from_ynab method to update the core account
-                        success = core_account.sync_from_ynab(ynab_account)
-                        if success:
-                            synced_count += 1
-                            logger.info(f"Auto-synced core account {core_account.name} from YNAB account {ynab_account.name}")
-                        else:
-                            logger.warning(f"Failed to auto-sync core account {core_account.name}")
-                except Exception as e:
-                    logger.error(f"Error auto-syncing account link {link.id}: {str(e)}")
-                    continue
 
-            logger.info(f"Auto-sync completed: {synced_count} core accounts updated")
+class YNABQuotaView(views.APIView):
+    """
+    API endpoint reporting the remaining YNAB request quota for each configured
+    access token. Tokens are identified by a short hash, never the key itself.
+    """
 
-        except Exception as e:
-            logger.error(f"Error in auto-sync process: {str(e)}")
-
-    def sync_payees(self, payees_data):
-        created, updated = self._sync_model(Payee, payees_data)
-        return f"{created} created, {updated} updated"
-
-    def sync_categories(self, category_groups_data, categories_data):
-        logger.info(f"Starting sync_categories with {len(category_groups_data)} category groups and {len(categories_data)} categories")
-
-        # Sync category groups first
-        groups_to_sync = []
-        for group_item in category_groups_data:
-            logger.info(f"Processing group: {group_item.get('name', 'Unknown')} with ID: {group_item.get('id', 'Unknown')}")
-            # Remove categories from group data since we'll handle them separately
-            group_item.pop('categories', [])
-            groups_to_sync.append(group_item)
-
-        # Sync categories with their group relationships
-        all_categories_data = []
-        for cat_item in categories_data:
-            logger.info(f"Processing category: {cat_item.get('name', 'Unknown')} with ID: {cat_item.get('id', 'Unknown')} in group: {cat_item.get('category_group_name', 'Unknown')}")
-            all_categories_data.append(cat_item)
-
-        logger.info(f"Total categories to sync: {len(all_categories_data)}")
-        logger.info(f"Total groups to sync: {len(groups_to_sync)}")
-
-        g_created, g_updated = self._sync_model(CategoryGroup, groups_to_sync)
-        c_created, c_updated = self._sync_model(Category, all_categories_data)
-
-        logger.info(f"Category sync results: Groups - {g_created} created, {g_updated} updated; Categories - {c_created} created, {c_updated} updated")
-        return (f"G: {g_created}c/{g_updated}u", f"C: {c_created}c/{c_updated}u")
-
-    def sync_transactions(self, transactions_data):
-        # Pre-fetch for validation
-        existing_account_ids = set(YNABAccount.objects.values_list('id', flat=True))
-        existing_payee_ids = set(Payee.objects.values_list('id', flat=True))
-        existing_category_ids = set(Category.objects.values_list('id', flat=True))
-
-        valid_transactions = []
-        all_subtransactions = []
-
-        for trans_item in transactions_data:
-            account_id = trans_item.get('account_id')
-            if not account_id or account_id not in existing_account_ids:
-                continue
-
-            payee_id = trans_item.get('payee_id')
-            if payee_id and payee_id not in existing_payee_ids:
-                trans_item['payee_id'] = None
-
-            category_id = trans_item.get('category_id')
-            if category_id and category_id not in existing_category_ids:
-                trans_item['category_id'] = None
-
-            subtransactions = trans_item.pop('subtransactions', [])
-            valid_transactions.append(trans_item)
-
-            for sub_item in subtransactions:
-                sub_item['transaction_id'] = trans_item.get('id')
-                # Nullify missing FKs for subtransactions too
-                sub_payee_id = sub_item.get('payee_id')
-                if sub_payee_id and sub_payee_id not in existing_payee_ids:
-                    sub_item['payee_id'] = None
-
-                sub_category_id = sub_item.get('category_id')
-                if sub_category_id and sub_category_id not in existing_category_ids:
-                    sub_item['category_id'] = None
-                all_subtransactions.append(sub_item)
-
-        t_created, t_updated = self._sync_model(Transaction, valid_transactions)
-        st_created, st_updated = self._sync_model(Subtransaction, all_subtransactions)
-
-        return (f"T: {t_created}c/{t_updated}u", f"ST: {st_created}c/{st_updated}u")
\ No newline at end of file
+    def get(self, request, *args, **kwargs):
+        tokens = {}
+        for config in config_cache.configured_configurations():
+            entry = tokens.setdefault(config.api_key, {"budget_ids": []})
+            entry["budget_ids"].append(config.budget_id)
+
+        quotas = []
+        for api_key, entry in tokens.items():
+            quotas.append({
+                "token": bucket_key(api_key)[:12],
+                "budget_ids": entry["budget_ids"],
+                **YNABClient(api_key).quota(),
+            })
+        return Response({"quotas": quotas})
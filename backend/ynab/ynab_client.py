@@ -1,19 +1,106 @@
+from . import cache, ratelimit
+from .ratelimit import RateLimitExceeded
+from django.conf import settings
+from requests.adapters import HTTPAdapter
 import requests
+import threading
+import time
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Responses worth retrying after a pause.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    The keep-alive session shared by every YNAB call in this process, so
+    repeated calls reuse pooled TLS connections. It is rebuilt after a fork,
+    since pooled sockets must not be shared between gunicorn workers.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=settings.YNAB_HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=settings.YNAB_HTTP_POOL_SIZE,
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                # Budget documents are large JSON and compress very well
+                session.headers['Accept-Encoding'] = 'gzip, deflate'
+                _session, _session_pid = session, os.getpid()
+    return _session
+
+
 class YNABClient:
+    """
+    The single entry point for YNAB API traffic. Every request takes a token
+    from the bucket shared by all workers for this access token, and 429s,
+    5xx responses and connection errors are retried with jittered backoff.
+    """
     BASE_URL = "https://api.ynab.com/v1"
 
-    def __init__(self, api_key):
+    def __init__(self, api_key, max_wait=None):
         self.api_key = api_key
         self.headers = {"Authorization": f"Bearer {self.api_key}"}
+        self.max_wait = settings.YNAB_RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        self.last_etag = None
+
+    def url(self, endpoint):
+        if endpoint.startswith('http'):
+            return endpoint
+        return f"{self.BASE_URL}/{endpoint.lstrip('/')}"
+
+    def request(self, method, endpoint, **kwargs):
+        """
+        Send a request and return the ``requests.Response`` without raising for
+        its status, so callers can stream or proxy it. Raises
+        ``RateLimitExceeded`` if the quota does not free up within ``max_wait``.
+        """
+        url = self.url(endpoint)
+        headers = {**self.headers, **kwargs.pop('headers', {})}
+        kwargs.setdefault('timeout', (settings.YNAB_HTTP_CONNECT_TIMEOUT, settings.YNAB_HTTP_READ_TIMEOUT))
+        deadline = time.monotonic() + self.max_wait
+        attempt = 0
+        while True:
+            ratelimit.acquire(self.api_key, max_wait=max(deadline - time.monotonic(), 0))
+            try:
+                response = get_session().request(method, url, headers=headers, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= settings.YNAB_REQUEST_RETRIES:
+                    raise
+                delay = ratelimit.backoff_delay(attempt)
+                logger.warning(f"YNAB request to {url} failed to connect; retrying in {delay:.1f}s")
+            else:
+                ratelimit.observe_response(self.api_key, response)
+                if response.status_code not in RETRY_STATUSES or attempt >= settings.YNAB_REQUEST_RETRIES:
+                    return response
+                if response.status_code == 429:
+                    delay = ratelimit.retry_after_seconds(response) + ratelimit.backoff_delay(0)
+                else:
+                    delay = ratelimit.backoff_delay(attempt)
+                if time.monotonic() + delay > deadline:
+                    if response.status_code == 429:
+                        raise RateLimitExceeded(delay)
+                    return response
+                logger.warning(f"YNAB returned {response.status_code} for {url}; retrying in {delay:.1f}s")
+                response.close()
+            time.sleep(delay)
+            attempt += 1
 
     def _request(self, method, endpoint, **kwargs):
-        url = f"{self.BASE_URL}/{endpoint}"
+        url = self.url(endpoint)
         try:
-            response = requests.request(method, url, headers=self.headers, **kwargs)
+            response = self.request(method, url, **kwargs)
             response.raise_for_status()
             return response.json().get('data', {})
         except requests.exceptions.HTTPError as e:
@@ -24,18 +111,44 @@ class YNABClient:
             logger.error(f"An unexpected error occurred: {e}")
             raise
 
+    def quota(self):
+        return ratelimit.quota(self.api_key)
+
+    def _cached_get(self, kind, endpoint):
+        """GET through the metadata cache; the entry's ETag is kept on ``last_etag``"""
+        def fetch(validators):
+            headers = {}
+            if 'ETag' in validators:
+                headers['If-None-Match'] = validators['ETag']
+            if 'Last-Modified' in validators:
+                headers['If-Modified-Since'] = validators['Last-Modified']
+            response = self.request("GET", endpoint, headers=headers)
+            if response.status_code == 304 and headers:
+                return None
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                logger.error(f"YNAB API Error: {e.response.status_code} {e.response.reason} for URL: {response.url}")
+                raise
+            fresh = {name: response.headers[name] for name in ('ETag', 'Last-Modified') if name in response.headers}
+            return response.json().get('data', {}), fresh
+
+        entry = cache.cached_get(self.api_key, endpoint, kind, fetch)
+        self.last_etag = entry.etag
+        return entry.data
+
     def get_user(self):
-        data = self._request("GET", "user")
+        data = self._cached_get("user", "user")
         return data.get('user')
 
     def get_budgets(self):
-        data = self._request("GET", "budgets")
+        data = self._cached_get("budgets", "budgets")
         return data.get('budgets', [])
 
     def get_budget_by_id(self, budget_id):
-        data = self._request("GET", f"budgets/{budget_id}")
+        data = self._cached_get("budget", f"budgets/{budget_id}")
         return data.get('budget')
 
     def get_months(self, budget_id):
-        data = self._request("GET", f"budgets/{budget_id}/months")
-        return data.get('months', [])
\ No newline at end of file
+        data = self._cached_get("months", f"budgets/{budget_id}/months")
+        return data.get('months', [])
@@ -2,6 +2,7 @@ import React, { createContext, useContext, useState, useEffect } from "react";
 import { useMutation, useQueryClient } from "@tanstack/react-query";
 import axios from "axios";
 import { API_BASE_URL } from "../constants";
+import { runYnabSync } from "../ynabSync";
 
 interface YnabSyncContextType {
   syncNow: () => void;
@@ -78,8 +79,7 @@ export const YnabSyncProvider: React.FC<YnabSyncProviderProps> = ({
   const syncMutation = useMutation({
     mutationFn: async () => {
       setSyncStatus((prev) => ({ ...prev, isPending: true, error: null }));
-      const response = await axios.post(`${API_BASE_URL}/ynab/sync/`);
-      return response.data;
+      return await runYnabSync();
     },
     onSuccess: (data) => {
       // Update last synced timestamp
@@ -94,7 +94,8 @@ export const YnabSyncProvider: React.FC<YnabSyncProviderProps> = ({
       queryClient.invalidateQueries();
     },
     onError: (error: any) => {
-      const errorMessage = error.response?.data?.message || "Sync failed";
+      const errorMessage =
+        error.response?.data?.message || error.message || "Sync failed";
 
       // Don't treat "not configured" messages as errors
       if (
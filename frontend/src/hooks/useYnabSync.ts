@@ -2,6 +2,7 @@ import { useState, useEffect } from "react";
 import { useMutation, useQueryClient } from "@tanstack/react-query";
 import axios from "axios";
 import { API_BASE_URL } from "../constants";
+import { runYnabSync } from "../ynabSync";
 
 interface UseYnabSyncOptions {
   autoSyncOnMount?: boolean;
@@ -58,8 +59,7 @@ export const useYnabSync = (options: UseYnabSyncOptions = {}) => {
   const syncMutation = useMutation({
     mutationFn: async () => {
       setSyncStatus((prev) => ({ ...prev, isPending: true, error: null }));
-      const response = await axios.post(`${API_BASE_URL}/ynab/sync/`);
-      return response.data;
+      return await runYnabSync();
     },
     onSuccess: (data) => {
       // Update last synced timestamp
@@ -79,7 +79,8 @@ export const useYnabSync = (options: UseYnabSyncOptions = {}) => {
       }
     },
     onError: (error: any) => {
-      const errorMessage = error.response?.data?.message || "Sync failed";
+      const errorMessage =
+        error.response?.data?.message || error.message || "Sync failed";
       setSyncStatus((prev) => ({
         ...prev,
         isPending: false,
@@ -14,6 +14,7 @@ import { DataGrid } from "@mui/x-data-grid";
 import type { GridColDef } from "@mui/x-data-grid";
 import { Sync as SyncIcon } from "@mui/icons-material";
 import { API_BASE_URL } from "@/constants";
+import { runYnabSync } from "@/ynabSync";
 import YNABConfigModal from "../../../components/YNABConfigModal";
 import PageHeader from "../../../components/PageHeader";
 import { useTheme } from "@mui/material/styles";
@@ -325,8 +326,8 @@ export default function CategoriesPage() {
   const handleSync = async () => {
     try {
       setSyncing(true);
-      const response = await axios.post(`${API_BASE_URL}/ynab/sync/`);
-      console.log("Sync response:", response.data);
+      const job = await runYnabSync();
+      console.log("Sync job:", job);
       // Refetch categories after sync
       await refetch();
     } catch (err: any) {
@@ -12,6 +12,7 @@ import { DataGrid } from "@mui/x-data-grid";
 import type { GridColDef } from "@mui/x-data-grid";
 import { Settings as SettingsIcon } from "@mui/icons-material";
 import { API_BASE_URL } from "@/constants";
+import { runYnabSync } from "@/ynabSync";
 import YNABConfigModal from "../../../components/YNABConfigModal";
 import PageHeader from "../../../components/PageHeader";
 import { useTheme } from "@mui/material/styles";
@@ -232,11 +233,9 @@ export default function MonthsPage() {
   const handleSyncYNAB = async () => {
     try {
       setSyncing(true);
-      const response = await axios.post(`${API_BASE_URL}/ynab/sync/`);
-      if (response.data.success) {
-        // Refetch months data after sync
-        await refetch();
-      }
+      await runYnabSync();
+      // Refetch months data after sync
+      await refetch();
     } catch (err: any) {
       console.error("Sync failed:", err);
       alert(`Sync failed: ${err.response?.data?.message || err.message}`);
@@ -43,6 +43,7 @@ import {
 import PageSection from "../components/PageSection";
 import LookupTable from "../components/lookups/LookupTable";
 import { SyncButton } from "../components/SyncButton";
+import { runYnabSync } from "../ynabSync";
 
 interface SettingGridProps {
   title: string;
@@ -500,7 +501,7 @@ export default function SettingsPage() {
   });
 
   const syncMutation = useMutation({
-    mutationFn: () => axios.post(`${API_BASE_URL}/ynab/sync/`),
+    mutationFn: runYnabSync,
     onSuccess: () => {
       queryClient.invalidateQueries(); // Invalidate all queries after sync
       setSnackbar({
@@ -524,6 +525,8 @@ export default function SettingsPage() {
       } else if (error.response?.status === 500) {
         errorMessage =
           "Sync failed: YNAB service is temporarily unavailable. Please try again later.";
+      } else if (error.message) {
+        errorMessage = `Sync Error: ${error.message}`;
       }
 
       setSnackbar({
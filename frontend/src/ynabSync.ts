@@ -0,0 +1,38 @@
+import axios from "axios";
+import { API_BASE_URL } from "./constants";
+
+const POLL_INTERVAL_MS = 1000;
+
+export interface YnabSyncJob {
+  id: string;
+  budget_id: string;
+  status: "pending" | "running" | "succeeded" | "failed";
+  phase: string | null;
+  message: string | null;
+}
+
+const isActive = (job: YnabSyncJob) =>
+  job.status === "pending" || job.status === "running";
+
+// Start a YNAB sync and poll its job until it finishes. The sync endpoint
+// answers straight away, so no request is held open for the whole sync.
+// Resolves with the finished job; rejects with the job's message if it failed.
+export async function runYnabSync(): Promise<YnabSyncJob | null> {
+  const response = await axios.post(`${API_BASE_URL}/ynab/sync/`);
+  let job: YnabSyncJob | null = response.data.job ?? null;
+  if (!job) {
+    // Not configured: there is no job, only a message
+    return null;
+  }
+
+  while (isActive(job)) {
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+    const poll = await axios.get(`${API_BASE_URL}/ynab/sync/jobs/${job.id}/`);
+    job = poll.data.job as YnabSyncJob;
+  }
+
+  if (job.status === "failed") {
+    throw new Error(job.message || "Sync failed");
+  }
+  return job;
+}